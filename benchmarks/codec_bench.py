@@ -0,0 +1,87 @@
+"""Bus payload codecs: size, encode and decode throughput per backend.
+
+Encodes fresh messages (so cached frames don't flatter any backend), then
+decodes the payloads back into validated models. For reference it also
+times ``model_construct`` on pre-parsed fields, the validation-free path
+the codec deliberately does not offer. Backends whose optional dependency
+is missing are skipped.
+
+Run with::
+
+    python benchmarks/codec_bench.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from collections.abc import Callable
+
+from monster_mash_chatroom.codec import (
+    available_backends,
+    decode_message,
+    encode_message,
+)
+from monster_mash_chatroom.models import AuthorKind, ChatMessage
+
+
+def messages(count: int) -> list[ChatMessage]:
+    return [
+        ChatMessage(
+            author="Wolfman",
+            role=AuthorKind.MONSTER,
+            content=f"Awooo number {index}! The moon is out tonight.",
+            persona="werewolf",
+            persona_emoji="🐺",
+            room=f"room-{index % 8}",
+            seq=index,
+        )
+        for index in range(count)
+    ]
+
+
+def _rate(count: int, run: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    run()
+    return count / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"{'backend':>8} {'bytes':>6} {'encode/s':>10} {'decode/s':>10}")
+    for backend in available_backends():
+        batch = messages(args.messages)
+        payloads: list[bytes] = []
+        encode = _rate(
+            len(batch),
+            lambda payloads=payloads, backend=backend, batch=batch: (
+                payloads.extend(encode_message(m, backend) for m in batch)
+            ),
+        )
+        decode = _rate(
+            len(payloads),
+            lambda payloads=payloads: [decode_message(p) for p in payloads],
+        )
+        size = sum(map(len, payloads)) / len(payloads)
+        print(
+            f"{backend.value:>8} {size:>6.0f} {encode:>10.0f} {decode:>10.0f}"
+        )
+
+    fields = [message.model_dump() for message in messages(args.messages)]
+    construct = _rate(
+        len(fields), lambda: [ChatMessage.model_construct(**f) for f in fields]
+    )
+    validate = _rate(
+        len(fields), lambda: [ChatMessage.model_validate(f) for f in fields]
+    )
+    print(
+        f"\nfrom dicts: model_validate {validate:.0f}/s, "
+        f"model_construct {construct:.0f}/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
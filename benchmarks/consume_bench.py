@@ -0,0 +1,152 @@
+"""Relay consumer throughput: per-record iteration against getmany() batches.
+
+Replays a recorded stream of Kafka records through a stand-in consumer (no
+broker needed) into ``KafkaEventBus``'s fan-out with a few subscribers per
+room. The per-record path mirrors the old ``async for record in consumer``
+loop; the batched path runs the real ``_consume_loop``.
+
+Run with::
+
+    python benchmarks/consume_bench.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from collections.abc import AsyncIterator
+
+from aiokafka import ConsumerRecord, TopicPartition
+
+from monster_mash_chatroom.config import KafkaBusSettings
+from monster_mash_chatroom.events import KafkaEventBus, _decode_record
+from monster_mash_chatroom.models import AuthorKind, ChatMessage
+
+TOPIC = "monster.chat"
+
+
+class _Drained(Exception):
+    """Raised by the stand-in consumer once the recording is exhausted."""
+
+
+class RecordedConsumer:
+    """Serves a fixed list of records the way AIOKafkaConsumer would."""
+
+    def __init__(self, records: list[ConsumerRecord]) -> None:
+        self._records = records
+        self._position = 0
+
+    async def getmany(
+        self, *partitions, timeout_ms: int = 0, max_records=None
+    ):
+        if self._position >= len(self._records):
+            raise _Drained
+        end = self._position + (max_records or len(self._records))
+        batch = self._records[self._position : end]
+        self._position += len(batch)
+        batches: dict[TopicPartition, list[ConsumerRecord]] = {}
+        for record in batch:
+            partition = TopicPartition(record.topic, record.partition)
+            batches.setdefault(partition, []).append(record)
+        return batches
+
+    async def __aiter__(self) -> AsyncIterator[ConsumerRecord]:
+        for record in self._records:
+            yield record
+
+
+def record_stream(
+    count: int, rooms: int, partitions: int
+) -> list[ConsumerRecord]:
+    records = []
+    offsets = [0] * partitions
+    for index in range(count):
+        room = f"room-{index % rooms}"
+        partition = hash(room) % partitions
+        message = ChatMessage(
+            author="Wolfman",
+            role=AuthorKind.MONSTER,
+            content=f"Awooo number {index}! The moon is out tonight.",
+            persona="werewolf",
+            persona_emoji="🐺",
+            room=room,
+        )
+        value = message.json_frame.encode("utf-8")
+        records.append(
+            ConsumerRecord(
+                TOPIC,
+                partition,
+                offsets[partition],
+                0,
+                0,
+                room.encode(),
+                value,
+                None,
+                len(room),
+                len(value),
+                [],
+            )
+        )
+        offsets[partition] += 1
+    return records
+
+
+def _bus(
+    rooms: int, subscribers: int, count: int, max_records: int
+) -> KafkaEventBus:
+    settings = KafkaBusSettings(
+        brokers=["recorded"], consume_max_records=max_records
+    )
+    bus = KafkaEventBus(settings, "bench", 200, subscriber_queue_size=count)
+    for room in range(rooms):
+        for _ in range(subscribers):
+            bus.open_subscription(f"room-{room}")
+    return bus
+
+
+async def per_record(
+    records: list[ConsumerRecord], bus: KafkaEventBus
+) -> None:
+    async for record in RecordedConsumer(records):
+        message = _decode_record(record)
+        if message is not None:
+            bus._rooms.deliver(message)
+
+
+async def batched(records: list[ConsumerRecord], bus: KafkaEventBus) -> None:
+    bus._consumer = RecordedConsumer(records)  # type: ignore[assignment]
+    try:
+        await bus._consume_loop()
+    except _Drained:
+        pass
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    records = record_stream(args.messages, args.rooms, partitions=6)
+    print(f"{'path':>12} {'max_records':>12} {'msgs/sec':>10}")
+    runs = [("per-record", per_record, 1)] + [
+        ("getmany", batched, size) for size in args.max_records
+    ]
+    for label, runner, size in runs:
+        bus = _bus(args.rooms, args.subscribers, args.messages, size)
+        started = time.perf_counter()
+        await runner(records, bus)
+        elapsed = time.perf_counter() - started
+        size_label = "-" if runner is per_record else str(size)
+        print(f"{label:>12} {size_label:>12} {len(records) / elapsed:>10.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--rooms", type=int, default=8)
+    parser.add_argument("--subscribers", type=int, default=50)
+    parser.add_argument(
+        "--max-records", type=int, nargs="+", default=[50, 500, 2000]
+    )
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Fan-out CPU cost per message against the number of WebSocket subscribers.
+
+Compares the old stream path (every subscriber runs ``model_dump`` and
+``json.dumps`` the way ``WebSocket.send_json`` does) with the shared frame
+path (``ChatMessage.json_frame`` encodes once, subscribers reuse it).
+
+Run with::
+
+    python benchmarks/fanout_bench.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from monster_mash_chatroom.models import AuthorKind, ChatMessage
+
+
+def _sample_message() -> ChatMessage:
+    return ChatMessage(
+        author="Dracula",
+        role=AuthorKind.MONSTER,
+        content="I vant to suck... the joy out of this party? Never! " * 2,
+        persona="vampire",
+        persona_emoji="🧛",
+    )
+
+
+def per_subscriber_encode(subscribers: int) -> None:
+    """Old behaviour: each socket serializes the message itself."""
+    message = _sample_message()
+    for _ in range(subscribers):
+        json.dumps(
+            message.model_dump(mode="json"),
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+
+
+def shared_frame(subscribers: int) -> None:
+    """New behaviour: the bus encodes once and every socket reuses it."""
+    message = _sample_message()
+    frames = [message.json_frame for _ in range(subscribers)]
+    assert len(frames) == subscribers
+
+
+def measure(func, subscribers: int, messages: int) -> float:
+    """Return CPU microseconds spent per published message."""
+    start = time.process_time()
+    for _ in range(messages):
+        func(subscribers)
+    elapsed = time.process_time() - start
+    return elapsed / messages * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument(
+        "--subscribers",
+        type=int,
+        nargs="+",
+        default=[1, 10, 100, 500, 2000],
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'subscribers':>12} {'before µs/msg':>15} "
+        f"{'after µs/msg':>14} {'speedup':>8}"
+    )
+    for count in args.subscribers:
+        before = measure(per_subscriber_encode, count, args.messages)
+        after = measure(shared_frame, count, args.messages)
+        print(
+            f"{count:>12} {before:>15.1f} {after:>14.1f} "
+            f"{before / after:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
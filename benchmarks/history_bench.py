@@ -0,0 +1,146 @@
+"""Memory per retained message and history replay speed: models vs records.
+
+Fills a history ring with messages decoded the way the relay receives them
+and measures the retained bytes per message with ``tracemalloc``, once
+holding ``ChatMessage`` models (the old ring) and once holding the compact
+``MessageRecord``s the bus keeps now, each with and without the cached
+JSON frame. Then times replaying a full ring to a reconnecting client
+(cold frames) and decoding a page read back from the on-disk log.
+
+Run with::
+
+    python benchmarks/history_bench.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+from collections import deque
+from collections.abc import Callable
+
+from monster_mash_chatroom.models import AuthorKind, ChatMessage, MessageRecord
+from monster_mash_chatroom.wire import json_batch
+
+PERSONAS = [("werewolf", "Wolfman", "🐺"), ("vampire", "Dracula", "🧛")]
+
+
+def payloads(count: int) -> list[bytes]:
+    """Bus payloads as they arrive: every message is decoded separately."""
+    frames = []
+    for index in range(count):
+        key, name, emoji = PERSONAS[index % len(PERSONAS)]
+        message = ChatMessage(
+            author=name,
+            role=AuthorKind.MONSTER,
+            content=f"Awooo number {index}! The moon is out tonight.",
+            persona=key,
+            persona_emoji=emoji,
+            room="crypt",
+            seq=index + 1,
+        )
+        frames.append(message.json_frame.encode("utf-8"))
+    return frames
+
+
+def retained_bytes(build: Callable[[], deque[object]]) -> tuple[float, deque]:
+    gc.collect()
+    tracemalloc.start()
+    ring = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / len(ring), ring
+
+
+def _rate(count: int, run: Callable[[], object], repeat: int = 15) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return count / best
+
+
+def replay_rate(ring: list, clear: Callable[[object], object]) -> float:
+    best = float("inf")
+    for _ in range(15):
+        for item in ring:
+            clear(item)
+        started = time.perf_counter()
+        json_batch(ring)
+        best = min(best, time.perf_counter() - started)
+    return len(ring) / best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+    frames = payloads(args.messages)
+
+    def models(cached: bool) -> deque[object]:
+        ring: deque[object] = deque(maxlen=len(frames))
+        for frame in frames:
+            message = ChatMessage.model_validate_json(frame)
+            if cached:
+                _ = message.json_frame
+            ring.append(message)
+        return ring
+
+    def records(cached: bool) -> deque[object]:
+        ring: deque[object] = deque(maxlen=len(frames))
+        for frame in frames:
+            record = MessageRecord.from_message(
+                ChatMessage.model_validate_json(frame)
+            )
+            if cached:
+                _ = record.json_frame
+            ring.append(record)
+        return ring
+
+    print(f"{'retained as':>28} {'bytes/msg':>10}")
+    rings = {}
+    for label, build in [
+        ("ChatMessage", lambda: models(False)),
+        ("ChatMessage + json frame", lambda: models(True)),
+        ("MessageRecord", lambda: records(False)),
+        ("MessageRecord + json frame", lambda: records(True)),
+    ]:
+        size, ring = retained_bytes(build)
+        rings[label] = ring
+        print(f"{label:>28} {size:>10.0f}")
+
+    # Replaying a ring whose frames were never encoded (no subscriber was
+    # watching when the messages arrived) to a reconnecting client
+    cold_models = [ChatMessage.model_validate_json(f) for f in frames]
+    cold_records = [MessageRecord.from_message(m) for m in cold_models]
+
+    print(f"\n{'replay':>28} {'msgs/sec':>10}")
+    for label, ring, clear in [
+        (
+            "ring of ChatMessage",
+            cold_models,
+            lambda m: m.__dict__.pop("json_frame", None),
+        ),
+        (
+            "ring of MessageRecord",
+            cold_records,
+            lambda r: setattr(r, "json_cache", None),
+        ),
+    ]:
+        print(f"{label:>28} {replay_rate(ring, clear):>10.0f}")
+    for label, decode in [
+        ("log page as ChatMessage", ChatMessage.model_validate_json),
+        ("log page as MessageRecord", MessageRecord.from_json),
+    ]:
+        rate = _rate(
+            len(frames), lambda decode=decode: [decode(f) for f in frames]
+        )
+        print(f"{label:>28} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Load test for POST /send in each publish-ack mode.
+
+Fires ``--messages`` requests with ``--concurrency`` in flight against a
+running server and reports messages/sec and latency percentiles for
+``ack=broker`` (wait for the Kafka commit) and ``ack=enqueue`` (answer once
+the message is in the producer batch).
+
+Start the app with the Kafka backend first, then run::
+
+    python benchmarks/send_load.py --url http://localhost:8000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_mode(
+    client: httpx.AsyncClient,
+    ack: str,
+    messages: int,
+    concurrency: int,
+) -> tuple[float, list[float]]:
+    """Send ``messages`` requests and return (elapsed seconds, latencies)."""
+    latencies: list[float] = []
+    remaining = iter(range(messages))
+
+    async def worker() -> None:
+        for index in remaining:
+            started = time.perf_counter()
+            response = await client.post(
+                "/send",
+                params={"ack": ack},
+                json={"author": "load-test", "content": f"boo #{index}"},
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=30
+    ) as client:
+        print(
+            f"{'mode':>8} {'msgs/sec':>10} {'p50 ms':>8} "
+            f"{'p99 ms':>8} {'max ms':>8}"
+        )
+        for ack in ("broker", "enqueue"):
+            elapsed, latencies = await run_mode(
+                client, ack, args.messages, args.concurrency
+            )
+            print(
+                f"{ack:>8} {len(latencies) / elapsed:>10.0f} "
+                f"{statistics.median(latencies) * 1000:>8.1f} "
+                f"{percentile(latencies, 0.99) * 1000:>8.1f} "
+                f"{max(latencies) * 1000:>8.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
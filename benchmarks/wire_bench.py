@@ -0,0 +1,102 @@
+"""Bytes per message and server CPU for each /stream wire format.
+
+Encodes a synthetic chat stream as JSON and as compact MessagePack
+records, each with and without permessage-deflate. Deflate keeps one
+compression context per socket (context takeover), so consecutive frames
+share a dictionary just like a real browser connection; unlike the base
+encodings it runs per socket, not once per message.
+
+Run with::
+
+    pip install msgpack
+    python benchmarks/wire_bench.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import zlib
+from collections.abc import Callable
+
+from monster_mash_chatroom.models import AuthorKind, ChatMessage
+from monster_mash_chatroom.personas import PERSONA_REGISTRY
+from monster_mash_chatroom.wire import WireFormat, encode_frame
+
+
+def _stream(count: int) -> list[ChatMessage]:
+    personas = list(PERSONA_REGISTRY.values())
+    rng = random.Random(13)
+    messages = []
+    human = None
+    for seq in range(1, count + 1):
+        if human is None or rng.random() < 0.3:
+            message = ChatMessage(
+                author="Human Visitor",
+                role=AuthorKind.HUMAN,
+                content=(
+                    f"Who goes there? Anyone awake at {seq} past midnight?"
+                ),
+            )
+            human = message
+        else:
+            persona = rng.choice(personas)
+            message = ChatMessage(
+                author=persona.display_name,
+                role=AuthorKind.MONSTER,
+                content=persona.format_demo_reply(human),
+                persona=persona.key,
+                persona_emoji=persona.emoji,
+            )
+        message.seq = seq
+        messages.append(message)
+    return messages
+
+
+def _deflater() -> Callable[[bytes], bytes]:
+    """Compress frames the way permessage-deflate does on one socket."""
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+
+    def deflate(frame: bytes) -> bytes:
+        data = compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        return data[:-4]  # drop the 00 00 ff ff sync marker, per RFC 7692
+
+    return deflate
+
+
+def measure(
+    messages: list[ChatMessage], wire_format: WireFormat, deflate: bool
+) -> tuple[float, float]:
+    """Return (bytes per message, CPU microseconds per message)."""
+    # Fresh copies so the cached frames are encoded inside the timed loop
+    fresh = [message.model_copy() for message in messages]
+    compress = _deflater() if deflate else None
+    total = 0
+    start = time.process_time()
+    for message in fresh:
+        frame = encode_frame([message], wire_format)
+        data = frame.encode("utf-8") if isinstance(frame, str) else frame
+        if compress is not None:
+            data = compress(data)
+        total += len(data)
+    elapsed = time.process_time() - start
+    return total / len(fresh), elapsed / len(fresh) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    args = parser.parse_args()
+    messages = _stream(args.messages)
+
+    print(f"{'format':>18} {'bytes/msg':>10} {'µs/msg':>8}")
+    for wire_format in WireFormat:
+        for deflate in (False, True):
+            label = wire_format.value + (" + deflate" if deflate else "")
+            size, cpu = measure(messages, wire_format, deflate)
+            print(f"{label:>18} {size:>10.1f} {cpu:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
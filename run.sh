@@ -124,14 +124,16 @@ if ${START_WORKERS}; then
     rm -f "${LOG_DIR}"/*.log
   fi
   echo "[workers] Starting persona workers (logs in ${LOG_DIR})" >&2
-  for name in "${WORKER_NAMES[@]}"; do
-    LOG_FILE="${LOG_DIR}/${name}.log"
-    "${PYTHON_BIN}" -m monster_mash_chatroom.agent_runner "${name}" \
-      >>"${LOG_FILE}" 2>&1 &
-    pid=$!
-    WORKER_PIDS+=("${pid}")
-    echo "  - ${name} (pid ${pid}) -> ${LOG_FILE}" >&2
-  done
+  # The supervisor shards the personas over WORKER_PROCESSES processes and
+  # restarts any that crash
+  PERSONAS=$(IFS=,; echo "${WORKER_NAMES[*]}")
+  LOG_FILE="${LOG_DIR}/personas.log"
+  "${PYTHON_BIN}" -m monster_mash_chatroom.supervisor --personas "${PERSONAS}" \
+    --workers "${WORKER_PROCESSES:-1}" --status-file "${LOG_DIR}/workers.json" \
+    >>"${LOG_FILE}" 2>&1 &
+  pid=$!
+  WORKER_PIDS+=("${pid}")
+  echo "  - ${PERSONAS} (supervisor pid ${pid}) -> ${LOG_FILE}" >&2
 fi
 
 cleanup() {
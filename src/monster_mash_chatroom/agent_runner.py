@@ -4,12 +4,20 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import json
 import logging
-from collections import deque
-from collections.abc import Sequence
+import os
+import statistics
+import time
+from collections import defaultdict, deque
+from collections.abc import Awaitable, Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from uuid import uuid4
 
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
-from aiokafka.admin import AIOKafkaAdminClient, NewTopic
+from aiokafka import AIOKafkaConsumer
+from aiokafka.admin import AIOKafkaAdminClient
 from aiokafka.errors import (
     IncompatibleBrokerVersion,
     KafkaError,
@@ -17,16 +25,34 @@ from aiokafka.errors import (
     UnknownTopicOrPartitionError,
 )
 
+from .codec import encode_delta, encode_message
 from .config import BusBackend, Settings, get_settings
-from .llm import generate_persona_reply
-from .models import AuthorKind, ChatMessage
+from .events import (
+    DELTA_HEADER,
+    build_producer,
+    build_topics,
+    decode_batches,
+    log_delivery_failure,
+)
+from .llm import (
+    backlog_depth,
+    breaker_stats,
+    generate_persona_reply,
+    limiter_stats,
+    prompt_stats,
+    reply_stats,
+    response_cache,
+    stream_persona_reply,
+)
+from .local_bus import LocalBusClient
+from .models import AuthorKind, ChatMessage, MessageRecord, ReplyDelta
 from .personas import PERSONA_REGISTRY, MonsterPersona
 
 logger = logging.getLogger(__name__)
 
 
 async def _ensure_topic(settings: Settings) -> None:
-    """Create the Kafka topic if it doesn't exist (no-op for in-memory mode)."""
+    """Create the Kafka topics if missing (no-op for in-memory mode)."""
     bus_settings = settings.bus
     if bus_settings.backend != BusBackend.KAFKA:
         logger.debug("Skipping topic ensure for backend=%s", bus_settings.backend)
@@ -37,16 +63,13 @@ async def _ensure_topic(settings: Settings) -> None:
         logger.debug("No Kafka brokers configured; skipping topic ensure")
         return
     admin = AIOKafkaAdminClient(bootstrap_servers=kafka_settings.brokers)
-    topic = NewTopic(
-        name=kafka_settings.topic,
-        num_partitions=1,
-        replication_factor=1,
-    )
     try:
-        await admin.create_topics([topic])
-        logger.info("Kafka topic '%s' created by worker", kafka_settings.topic)
-    except TopicAlreadyExistsError:
-        logger.debug("Kafka topic '%s' already exists", kafka_settings.topic)
+        for topic in build_topics(kafka_settings):
+            try:
+                await admin.create_topics([topic])
+                logger.info("Kafka topic '%s' created by worker", topic.name)
+            except TopicAlreadyExistsError:
+                logger.debug("Kafka topic '%s' already exists", topic.name)
     except IncompatibleBrokerVersion as exc:
         logger.debug(
             "Broker lacks create-topics API; topic must exist already: %s",
@@ -58,18 +81,455 @@ async def _ensure_topic(settings: Settings) -> None:
         await admin.close()
 
 
-async def run_persona_worker(persona: MonsterPersona, settings: Settings) -> None:
-    """Stream messages for a persona and publish replies when triggered.
+def _wants_reply(
+    persona: MonsterPersona,
+    message: MessageRecord,
+    backlog: Sequence[MessageRecord],
+) -> bool:
+    """Decide on arrival whether a persona answers a message."""
+    # Prevent monsters from responding to their own messages
+    # (without this, they'd get into infinite self-reply loops)
+    if _is_own(persona, message):
+        logger.debug(
+            "Skipping message from identical persona id=%s",
+            message.id,
+        )
+        return False
+    if not persona.should_respond(message, backlog):
+        logger.debug(
+            "Persona %s ignoring message id=%s",
+            persona.key,
+            message.id,
+        )
+        return False
+    return True
 
-    This is the heart of the monster behavior: each persona runs as a separate
-    process, consuming messages from Kafka and deciding whether to respond based
-    on triggers, probability, and recent conversation history.
+
+def _is_own(persona: MonsterPersona, message: MessageRecord) -> bool:
+    return (
+        message.role == AuthorKind.MONSTER and message.persona == persona.key
+    )
+
+
+async def _compose_reply(
+    persona: MonsterPersona,
+    message: MessageRecord,
+    backlog: Sequence[MessageRecord],
+    settings: Settings,
+    on_delta: DeltaSink | None = None,
+) -> ChatMessage:
+    """Write a persona's reply to a message, given the backlog it ends.
+
+    With ``on_delta`` the reply is streamed: every piece goes out as a
+    delta as soon as the model produces it, instead of after a typing delay.
     """
+    # Simulate the monster "reading" the message (makes responses feel natural)
+    read_delay = persona.reading_delay_seconds(message, backlog)
+    if read_delay > 0:
+        await asyncio.sleep(read_delay)
+    # Streamed pieces carry the id the finished reply is published under
+    reply_id = uuid4().hex
+    if on_delta is not None:
+        reply = await _stream_reply(
+            persona, reply_id, message.room, backlog, settings, on_delta
+        )
+    else:
+        reply = await generate_persona_reply(
+            persona,
+            list(backlog),
+            settings,
+        )
+        # Simulate "typing" time (longer messages = longer delay)
+        typing_delay = persona.typing_delay_seconds(reply)
+        if typing_delay > 0:
+            await asyncio.sleep(typing_delay)
+    response = ChatMessage(
+        id=reply_id,
+        author=persona.display_name,
+        role=AuthorKind.MONSTER,
+        persona=persona.key,
+        content=reply,
+        persona_emoji=persona.emoji or None,
+        room=message.room,
+    )
+    logger.info(
+        "%s replied to %s in room=%s",
+        persona.display_name,
+        message.author,
+        message.room,
+    )
+    return response
+
+
+async def _stream_reply(
+    persona: MonsterPersona,
+    reply_id: str,
+    room: str,
+    backlog: Sequence[MessageRecord],
+    settings: Settings,
+    on_delta: DeltaSink,
+) -> str:
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    pieces: list[str] = []
+
+    def delta(text: str = "", done: bool = False) -> ReplyDelta:
+        return ReplyDelta(
+            id=reply_id,
+            room=room,
+            author=persona.display_name,
+            persona=persona.key,
+            persona_emoji=persona.emoji or None,
+            index=len(pieces),
+            text=text,
+            done=done,
+        )
+
+    try:
+        async for piece in stream_persona_reply(
+            persona, list(backlog), settings
+        ):
+            await on_delta(delta(piece), loop.time() - started)
+            pieces.append(piece)
+    except asyncio.CancelledError:
+        if pieces:
+            # Let clients drop the half-written reply
+            await on_delta(delta(done=True), loop.time() - started)
+        raise
+    return "".join(pieces).strip()
+
+
+def _new_backlogs(depth: int) -> dict[str, deque[MessageRecord]]:
+    # Keep recent conversation history for context-aware responses, as
+    # deep as the largest prompt budget (see ``backlog_depth``) so prompt
+    # builders never lose context to a busy room; older messages are
+    # evicted. Each room is its own conversation, so backlogs are kept
+    # per room
+    return defaultdict(lambda: deque(maxlen=depth))
+
+
+PublishReply = Callable[[ChatMessage], Awaitable[None]]
+PublishDelta = Callable[[ReplyDelta], Awaitable[None]]
+# Gets each delta with the seconds since the persona started writing
+DeltaSink = Callable[[ReplyDelta, float], Awaitable[None]]
+
+
+@dataclass(slots=True)
+class _PendingReply:
+    task: asyncio.Task[None]
+    # Room arrival count when the reply was triggered
+    arrival: int
+
+
+@dataclass(slots=True)
+class _Burst:
+    """A room's messages inside one open debounce window."""
+
+    # Latest message and backlog; the reply is written against these
+    message: MessageRecord
+    backlog: tuple[MessageRecord, ...]
+    arrival: int
+    # Messages in the window that would each have triggered a reply
+    triggers: int
+    timer: asyncio.TimerHandle | None = None
+
+
+@dataclass(slots=True)
+class _PersonaReplies:
+    """One hosted persona's in-flight replies, at most one per room."""
+
+    persona: MonsterPersona
+    slots: asyncio.Semaphore
+    pending: dict[str, _PendingReply] = field(default_factory=dict)
+    bursts: dict[str, _Burst] = field(default_factory=dict)
+    # Seconds from starting to write a streamed reply to its first piece
+    first_token: deque[float] = field(
+        default_factory=lambda: deque(maxlen=256)
+    )
+    counters: dict[str, int] = field(
+        default_factory=lambda: dict.fromkeys(
+            (
+                "replied",
+                "superseded",
+                "stale",
+                "failed",
+                "debounced",
+                "llm_calls_avoided",
+            ),
+            0,
+        )
+    )
+
+
+class PersonaDispatcher:
+    """Decides per hosted persona whether to answer, and runs the replies.
+
+    Messages are converted and added to the room backlog once, however
+    many personas are hosted. Dispatch never awaits, so the consumer keeps
+    up however slow the LLM is. Replies run as tasks, at most
+    ``max_concurrent_replies`` at a time per persona. A persona's pending
+    reply in a room is cancelled when the persona decides to answer a newer
+    message there (it would be stale on arrival), or once
+    ``stale_after_messages`` newer messages have reached the room.
+
+    A trigger opens the persona's ``reply_debounce_seconds`` window for
+    its room. Everything arriving before the window closes is folded into
+    one decision and one reply against the latest message; each further
+    trigger in the window is an LLM call avoided.
+
+    With ``stream_replies`` on and a ``publish_delta`` given, replies are
+    streamed as deltas before the finished message is published, and the
+    time to each reply's first piece is tracked.
+    """
+
+    def __init__(
+        self,
+        personas: Sequence[MonsterPersona],
+        settings: Settings,
+        publish: PublishReply,
+        publish_delta: PublishDelta | None = None,
+    ) -> None:
+        self._settings = settings
+        self._publish = publish
+        self._publish_delta = (
+            publish_delta if settings.worker.stream_replies else None
+        )
+        self._backlogs = _new_backlogs(backlog_depth(settings))
+        self._arrivals: dict[str, int] = defaultdict(int)
+        limit = settings.worker.max_concurrent_replies
+        self._personas = [
+            _PersonaReplies(persona, asyncio.Semaphore(limit))
+            for persona in personas
+        ]
+
+    async def stop(self) -> None:
+        for replies in self._personas:
+            for burst in replies.bursts.values():
+                if burst.timer is not None:
+                    burst.timer.cancel()
+            replies.bursts.clear()
+        tasks = [
+            pending.task
+            for replies in self._personas
+            for pending in replies.pending.values()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Reply counters per hosted persona.
+
+        Streaming workers add ``first_token_ms``, the median time to the
+        first piece over recent replies.
+        """
+        report = {}
+        for replies in self._personas:
+            counters = {
+                **replies.counters,
+                "pending": len(replies.pending),
+                "debouncing": len(replies.bursts),
+            }
+            if replies.first_token:
+                counters["first_token_ms"] = round(
+                    statistics.median(replies.first_token) * 1000
+                )
+            report[replies.persona.key] = counters
+        return report
+
+    def remember(self, message: ChatMessage) -> MessageRecord:
+        """Add a message to its room backlog without replying to it."""
+        record = MessageRecord.from_message(message)
+        self._backlogs[record.room].append(record)
+        self._arrivals[record.room] += 1
+        return record
+
+    def dispatch(self, message: ChatMessage) -> None:
+        record = self.remember(message)
+        room = record.room
+        arrival = self._arrivals[room]
+        # Snapshot now, so a reply covers the conversation as it stood when
+        # its message arrived
+        backlog = tuple(self._backlogs[room])
+        stale_after = self._settings.worker.stale_after_messages
+        for replies in self._personas:
+            persona = replies.persona
+            respond = _wants_reply(persona, record, backlog)
+            burst = replies.bursts.get(room)
+            if burst is not None:
+                if not _is_own(persona, record):
+                    burst.message, burst.backlog = record, backlog
+                    burst.arrival = arrival
+                    burst.triggers += respond
+                    replies.counters["debounced"] += 1
+                continue
+            if respond and persona.reply_debounce_seconds > 0:
+                burst = _Burst(record, backlog, arrival, triggers=1)
+                burst.timer = asyncio.get_running_loop().call_later(
+                    persona.reply_debounce_seconds,
+                    self._close_burst,
+                    replies,
+                    room,
+                )
+                replies.bursts[room] = burst
+                continue
+            pending = replies.pending.get(room)
+            if pending is not None and not respond:
+                if arrival - pending.arrival >= stale_after:
+                    self._cancel(replies, room, "stale")
+            if respond:
+                self._start_reply(replies, record, backlog, arrival)
+
+    def _close_burst(self, replies: _PersonaReplies, room: str) -> None:
+        burst = replies.bursts.pop(room)
+        replies.counters["llm_calls_avoided"] += burst.triggers - 1
+        self._start_reply(replies, burst.message, burst.backlog, burst.arrival)
+
+    def _start_reply(
+        self,
+        replies: _PersonaReplies,
+        message: MessageRecord,
+        backlog: tuple[MessageRecord, ...],
+        arrival: int,
+    ) -> None:
+        if message.room in replies.pending:
+            self._cancel(replies, message.room, "superseded")
+        task = asyncio.create_task(self._reply(replies, message, backlog))
+        replies.pending[message.room] = _PendingReply(task, arrival)
+
+    def _cancel(
+        self, replies: _PersonaReplies, room: str, reason: str
+    ) -> None:
+        pending = replies.pending.pop(room)
+        pending.task.cancel()
+        replies.counters[reason] += 1
+        logger.debug(
+            "Persona %s dropped a %s reply in room=%s",
+            replies.persona.key,
+            reason,
+            room,
+        )
+
+    async def _reply(
+        self,
+        replies: _PersonaReplies,
+        message: MessageRecord,
+        backlog: tuple[MessageRecord, ...],
+    ) -> None:
+        try:
+            async with replies.slots:
+                response = await _compose_reply(
+                    replies.persona,
+                    message,
+                    backlog,
+                    self._settings,
+                    self._delta_sink(replies),
+                )
+                await self._publish(response)
+            replies.counters["replied"] += 1
+        except Exception:
+            # Keep the persona alive; one failed reply is not fatal
+            replies.counters["failed"] += 1
+            logger.exception(
+                "Persona %s failed to reply to id=%s",
+                replies.persona.key,
+                message.id,
+            )
+        finally:
+            pending = replies.pending.get(message.room)
+            if pending is not None and pending.task is asyncio.current_task():
+                del replies.pending[message.room]
+
+    def _delta_sink(self, replies: _PersonaReplies) -> DeltaSink | None:
+        publish_delta = self._publish_delta
+        if publish_delta is None:
+            return None
+
+        async def sink(delta: ReplyDelta, elapsed: float) -> None:
+            if delta.index == 0:
+                replies.first_token.append(elapsed)
+            await publish_delta(delta)
+
+        return sink
+
+
+def _log_stats(dispatcher: PersonaDispatcher, settings: Settings) -> None:
+    for key, counters in dispatcher.stats().items():
+        logger.info("Persona %s replies: %s", key, counters)
+    cache = response_cache(settings)
+    if cache is not None:
+        logger.info("LLM response cache: %s", cache.stats())
+    for model, counters in limiter_stats().items():
+        logger.info("LLM limiter for %s: %s", model, counters)
+    logger.info("LLM hedging and deadlines: %s", reply_stats())
+    logger.info("LLM prompts: %s", prompt_stats())
+    for model, counters in breaker_stats().items():
+        logger.info("LLM circuit breaker for %s: %s", model, counters)
+
+
+async def _report_stats(
+    settings: Settings, name: str, dispatcher: PersonaDispatcher
+) -> None:
+    """Keep this worker's counters where /diagnostics reads them."""
+    config = settings.llm_breaker
+    if config.state_dir is None:
+        return
+    directory = Path(config.state_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}-{os.getpid()}.json"
+    staging = path.with_suffix(".tmp")
+    try:
+        while True:
+            cache = response_cache(settings)
+            report = {
+                "worker": name,
+                "pid": os.getpid(),
+                "updated_at": time.time(),
+                "personas": dispatcher.stats(),
+                "cache": cache.stats() if cache is not None else None,
+                "limiters": limiter_stats(),
+                "replies": reply_stats(),
+                "prompts": prompt_stats(),
+                "breakers": breaker_stats(),
+            }
+            staging.write_text(json.dumps(report))
+            staging.replace(path)
+            await asyncio.sleep(config.report_interval_seconds)
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def _worker_name(personas: Sequence[MonsterPersona]) -> str:
+    return "+".join(sorted(persona.key for persona in personas))
+
+
+def consumer_group(namespace: str, persona_keys: Iterable[str]) -> str:
+    """Kafka consumer group of every worker hosting exactly these personas.
+
+    Replicas of one worker share the group, so Kafka splits the topic's
+    partitions (and with them the rooms) between them.
+    """
+    return f"{namespace}.{'+'.join(sorted(persona_keys))}"
+
+
+async def run_personas(
+    personas: Sequence[MonsterPersona], settings: Settings
+) -> None:
+    """Host several personas on one bus connection and one decode per message.
+
+    Each persona used to need its own process, consumer and consumer group;
+    here they share all of it and only their reply decisions run apart.
+    """
+    name = _worker_name(personas)
     bus_settings = settings.bus
+    if bus_settings.backend == BusBackend.LOCAL:
+        await _run_local_worker(personas, settings)
+        return
     if bus_settings.backend != BusBackend.KAFKA:
         logger.warning(
-            "Persona %s worker disabled: message bus backend '%s' is not " "Kafka",
-            persona.key,
+            "Persona worker %s disabled: message bus backend '%s' is not "
+            "shared between processes",
+            name,
             bus_settings.backend,
         )
         return
@@ -77,15 +537,17 @@ async def run_persona_worker(persona: MonsterPersona, settings: Settings) -> Non
     kafka_settings = bus_settings.kafka
     if not kafka_settings.brokers:
         logger.warning(
-            "Persona %s worker disabled: no Kafka brokers configured",
-            persona.key,
+            "Persona worker %s disabled: no Kafka brokers configured",
+            name,
         )
         return
-    producer = AIOKafkaProducer(bootstrap_servers=kafka_settings.brokers)
+    producer = build_producer(kafka_settings)
     consumer = AIOKafkaConsumer(
         kafka_settings.topic,
         bootstrap_servers=kafka_settings.brokers,
-        group_id=f"{bus_settings.namespace}.{persona.key}",
+        group_id=consumer_group(
+            bus_settings.namespace, (persona.key for persona in personas)
+        ),
         auto_offset_reset="latest",
     )
     await _ensure_topic(settings)
@@ -108,97 +570,167 @@ async def run_persona_worker(persona: MonsterPersona, settings: Settings) -> Non
             await _ensure_topic(settings)
     else:
         logger.error(
-            "Persona %s could not subscribe to topic '%s' after retries",
-            persona.key,
+            "Persona worker %s could not subscribe to topic '%s' "
+            "after retries",
+            name,
             kafka_settings.topic,
         )
         await producer.stop()
         return
-    logger.info("Worker started for persona=%s", persona.key)
+
+    async def publish(response: ChatMessage) -> None:
+        # Enqueue without waiting for the broker round trip; the batch is
+        # flushed within linger_ms and again on shutdown
+        delivery = await producer.send(
+            kafka_settings.topic,
+            encode_message(response, bus_settings.codec),
+            key=response.room.encode("utf-8"),
+        )
+        delivery.add_done_callback(log_delivery_failure)
+
+    async def publish_delta(delta: ReplyDelta) -> None:
+        # Deltas are disposable, so nobody waits for or checks delivery.
+        # They get their own topic so they neither eat into the chat
+        # topic's warm-up depth nor reach the persona consumers
+        await producer.send(
+            kafka_settings.deltas_topic,
+            encode_delta(delta, bus_settings.codec),
+            key=delta.room.encode("utf-8"),
+            headers=[DELTA_HEADER],
+        )
+
+    dispatcher = PersonaDispatcher(personas, settings, publish, publish_delta)
+    reporter = asyncio.create_task(_report_stats(settings, name, dispatcher))
+    logger.info("Worker started for personas=%s", name)
     try:
-        # Keep recent conversation history for context-aware responses
-        # Limited to 20 messages to:
-        # 1. Prevent unbounded memory growth
-        # 2. Keep LLM context window manageable
-        # 3. Focus on recent conversation (older messages auto-evicted)
-        backlog = deque[ChatMessage](maxlen=20)
-        async for record in consumer:
-            payload = record.value.decode("utf-8")
-            message = ChatMessage.model_validate_json(payload)
-            backlog.append(message)
-            # Prevent monsters from responding to their own messages
-            # (without this, they'd get into infinite self-reply loops)
-            if message.role == AuthorKind.MONSTER and message.persona == persona.key:
-                logger.debug(
-                    "Skipping message from identical persona id=%s",
-                    message.id,
-                )
-                continue
-            # Create immutable snapshot for thread-safe decision making
-            # Prevents backlog changes during async should_respond() evaluation
-            backlog_snapshot = tuple(backlog)
-            if not persona.should_respond(message, backlog_snapshot):
-                logger.debug(
-                    "Persona %s ignoring message id=%s",
-                    persona.key,
-                    message.id,
-                )
-                continue
-            context = list(backlog)
-            # Simulate the monster "reading" the message (makes responses feel natural)
-            read_delay = persona.reading_delay_seconds(message, backlog_snapshot)
-            if read_delay > 0:
-                await asyncio.sleep(read_delay)
-            reply = await generate_persona_reply(
-                persona,
-                context,
-                settings,
-            )
-            response = ChatMessage(
-                author=persona.display_name,
-                role=AuthorKind.MONSTER,
-                persona=persona.key,
-                content=reply,
-                persona_emoji=persona.emoji or None,
-            )
-            # Simulate "typing" time (longer messages = longer delay)
-            typing_delay = persona.typing_delay_seconds(reply)
-            if typing_delay > 0:
-                await asyncio.sleep(typing_delay)
-            await producer.send_and_wait(
-                kafka_settings.topic,
-                response.model_dump_json().encode("utf-8"),
-            )
-            logger.info(
-                "%s replied to %s",
-                persona.display_name,
-                message.author,
+        while True:
+            batches = await consumer.getmany(
+                timeout_ms=kafka_settings.consume_timeout_ms,
+                max_records=kafka_settings.consume_max_records,
             )
+            for message in decode_batches(batches):
+                dispatcher.dispatch(message)
     finally:
+        reporter.cancel()
+        await asyncio.gather(reporter, return_exceptions=True)
+        await dispatcher.stop()
         await consumer.stop()
         await producer.stop()
-        logger.info("Worker stopped for persona=%s", persona.key)
+        logger.info("Worker stopped for personas=%s", name)
+        _log_stats(dispatcher, settings)
+
+
+async def run_persona_worker(
+    persona: MonsterPersona, settings: Settings
+) -> None:
+    """Stream messages for a persona and publish replies when triggered.
+
+    This is the heart of the monster behavior: the persona consumes
+    messages from the bus (Kafka or the local Unix-socket broker) and
+    decides whether to respond based on triggers, probability, and recent
+    conversation history.
+    """
+    await run_personas([persona], settings)
+
+
+async def _run_local_worker(
+    personas: Sequence[MonsterPersona], settings: Settings
+) -> None:
+    """Persona loop on the local Unix-socket bus (may host the broker)."""
+    name = _worker_name(personas)
+    inbox: asyncio.Queue[ChatMessage] = asyncio.Queue()
+    client = LocalBusClient(
+        settings.bus.local,
+        settings.bus.history_limit,
+        inbox.put_nowait,
+        settings.bus.codec,
+    )
+    try:
+        await client.start()
+    except OSError as exc:
+        logger.warning("Persona worker %s disabled: %s", name, exc)
+        return
+
+    async def publish(response: ChatMessage) -> None:
+        delivery = await client.publish(response)
+        delivery.add_done_callback(log_delivery_failure)
+
+    dispatcher = PersonaDispatcher(
+        personas, settings, publish, client.publish_delta
+    )
+    started_at = datetime.now(timezone.utc)
+    reporter = asyncio.create_task(_report_stats(settings, name, dispatcher))
+    logger.info("Worker started for personas=%s on the local bus", name)
+    try:
+        while True:
+            message = await inbox.get()
+            if message.created_at < started_at:
+                # The broker replays retained history on connect; use it as
+                # context only, like Kafka's auto_offset_reset="latest"
+                dispatcher.remember(message)
+                continue
+            dispatcher.dispatch(message)
+    finally:
+        reporter.cancel()
+        await asyncio.gather(reporter, return_exceptions=True)
+        await dispatcher.stop()
+        await client.stop()
+        logger.info("Worker stopped for personas=%s", name)
+        _log_stats(dispatcher, settings)
+
+
+def _persona_list(value: str) -> list[str]:
+    keys = [key.strip() for key in value.split(",") if key.strip()]
+    unknown = sorted(set(keys) - PERSONA_REGISTRY.keys())
+    if not keys or unknown:
+        raise argparse.ArgumentTypeError(
+            f"expected a comma-separated list of {sorted(PERSONA_REGISTRY)}, "
+            f"got {value!r}"
+        )
+    return list(dict.fromkeys(keys))
 
 
 def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
-    """Parse command-line arguments to select which monster persona to run."""
+    """Parse command-line arguments to select which monster personas to run."""
     parser = argparse.ArgumentParser(description="Run a monster persona worker")
-    parser.add_argument("persona", choices=sorted(PERSONA_REGISTRY.keys()))
+    selection = parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument(
+        "persona", nargs="?", choices=sorted(PERSONA_REGISTRY.keys())
+    )
+    selection.add_argument(
+        "--personas",
+        type=_persona_list,
+        metavar="KEY,KEY",
+        help="host several personas in this process",
+    )
+    selection.add_argument(
+        "--all", action="store_true", help="host every persona in this process"
+    )
     return parser.parse_args(argv)
 
 
+def selected_personas(args: argparse.Namespace) -> list[MonsterPersona]:
+    if args.all:
+        return list(PERSONA_REGISTRY.values())
+    keys = args.personas or [args.persona]
+    return [PERSONA_REGISTRY[key] for key in keys]
+
+
 async def main_async(argv: Sequence[str] | None = None) -> None:
     """Async entry point that runs the selected persona worker."""
     args = parse_args(argv)
     settings = get_settings()
-    persona = PERSONA_REGISTRY[args.persona]
-    await run_persona_worker(persona, settings)
+    await run_personas(selected_personas(args), settings)
 
 
 def main() -> None:
     """CLI entry point for running a monster persona worker process."""
     logging.basicConfig(level=logging.INFO)
-    asyncio.run(main_async())
+    try:
+        asyncio.run(main_async())
+    except KeyboardInterrupt:
+        # SIGINT is how the supervisor stops a worker; shutdown already ran
+        pass
 
 
 if __name__ == "__main__":
@@ -4,26 +4,38 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
+import json
 import logging
+import time
+from collections.abc import Sequence
 from pathlib import Path
 
 from fastapi import (
     Depends,
     FastAPI,
     HTTPException,
+    Query,
     Request,
     WebSocket,
     WebSocketDisconnect,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.websockets import WebSocketState
 
-from .config import get_settings
-from .events import EventBus, build_event_bus
-from .models import ChatMessage, SendMessageRequest
+from .config import CircuitBreakerSettings, PublishAck, get_settings
+from .events import EventBus, SubscriberOverflow, build_event_bus
+from .models import (
+    DEFAULT_ROOM,
+    ROOM_PATTERN,
+    ChatMessage,
+    MessageRecord,
+    SendMessageRequest,
+    StreamNotice,
+)
+from .wire import encode_frame, json_batch, negotiate
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +43,28 @@ _BASE_DIR = Path(__file__).resolve().parent
 templates = Jinja2Templates(directory=str(_BASE_DIR / "templates"))
 
 
+# Application close code for subscribers the ``close`` slow-subscriber policy
+# disconnects; the page reconnects with ?since= right away to resync
+RESYNC_CLOSE_CODE = 4008
+
+
+def _worker_reports(config: CircuitBreakerSettings) -> list[dict]:
+    """The reports the persona workers keep fresh in ``state_dir``."""
+    if config.state_dir is None:
+        return []
+    # Reports a worker stopped refreshing (it crashed) are left out
+    cutoff = time.time() - 3 * config.report_interval_seconds
+    reports = []
+    for path in sorted(Path(config.state_dir).glob("*.json")):
+        try:
+            report = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # removed while listing
+        if report.get("updated_at", 0) >= cutoff:
+            reports.append(report)
+    return reports
+
+
 def create_app() -> FastAPI:
     """Build the FastAPI application with wiring for the chatroom backend."""
 
@@ -88,6 +122,8 @@ def create_app() -> FastAPI:
             {
                 "request": request,
                 "demo_mode": settings.demo_mode,
+                "default_room": DEFAULT_ROOM,
+                "resync_close_code": RESYNC_CLOSE_CODE,
                 # UI customization (can be overridden via env vars or config)
                 "app_title": "Monster Mash Chatroom",
                 "app_emoji": "🎃",
@@ -122,32 +158,121 @@ def create_app() -> FastAPI:
     @application.post("/send", response_model=ChatMessage)
     async def send_message(
         request: SendMessageRequest,
+        ack: PublishAck | None = None,
         bus: EventBus = Depends(get_bus),  # noqa: B008
-    ) -> JSONResponse:
+    ) -> Response:
         message = request.to_chat_message()
-        await bus.publish(message)
+        settings = getattr(application.state, "settings", get_settings())
+        ack_mode = ack or settings.bus.kafka.publish_ack
+        delivery = await bus.enqueue(message)
+        # "broker" waits for the commit; "enqueue" answers as soon as the
+        # message sits in the producer batch (failures are still logged)
+        if ack_mode == PublishAck.BROKER:
+            await delivery
         logger.debug("Message published by %s with id=%s", message.author, message.id)
-        return JSONResponse(content=message.model_dump(mode="json"))
+        return Response(message.json_frame, media_type="application/json")
+
+    @application.get("/history", response_model=list[ChatMessage])
+    async def history(
+        room: str = Query(DEFAULT_ROOM, pattern=ROOM_PATTERN),
+        before: int | None = Query(None, ge=0),
+        limit: int = Query(50, ge=1, le=500),
+        bus: EventBus = Depends(get_bus),  # noqa: B008
+    ) -> Response:
+        """Page backwards through a room, oldest message first.
+
+        Pass the ``seq`` of the oldest message already shown as ``before``
+        to fetch the previous page; older pages come from the on-disk log.
+        """
+        messages = await bus.get_history(room, before=before, limit=limit)
+        return Response(
+            content=json_batch(messages), media_type="application/json"
+        )
+
+    @application.get("/diagnostics")
+    async def diagnostics(bus: EventBus = Depends(get_bus)) -> dict:  # noqa: B008
+        """Expose fan-out counters and the persona workers' reports."""
+        settings = getattr(application.state, "settings", get_settings())
+        return {
+            "bus": bus.stats(),
+            "workers": await asyncio.to_thread(
+                _worker_reports, settings.llm_breaker
+            ),
+        }
 
     @application.websocket("/stream")
     async def stream(
         websocket: WebSocket,
+        room: str = Query(DEFAULT_ROOM, pattern=ROOM_PATTERN),
+        since: int | None = Query(None, ge=-1),
         bus: EventBus = Depends(get_bus),  # noqa: B008
     ) -> None:
-        await websocket.accept()
-        logger.info("WebSocket client connected")
-        history = await bus.get_recent()
-        for record in history:
-            await websocket.send_json(record.model_dump(mode="json"))
+        # Clients pick a wire format via Sec-WebSocket-Protocol; the bus
+        # caches each format's encoding per message
+        subprotocol, wire_format = negotiate(
+            websocket.scope.get("subprotocols", [])
+        )
+        await websocket.accept(subprotocol=subprotocol)
+        logger.info(
+            "WebSocket client connected to room=%s since=%s format=%s",
+            room,
+            since,
+            wire_format.value,
+        )
+
+        async def send(items: Sequence[MessageRecord | StreamNotice]) -> None:
+            frame = encode_frame(items, wire_format)
+            if isinstance(frame, bytes):
+                await websocket.send_bytes(frame)
+            else:
+                await websocket.send_text(frame)
 
         connection_closed = False
         try:
-            async for message in bus.subscribe():
-                await websocket.send_json(message.model_dump(mode="json"))
-                logger.debug(
-                    "WebSocket dispatched message id=%s persona=%s",
-                    message.id,
-                    message.persona,
+            with bus.open_subscription(room, since=since) as subscription:
+                # A resuming client only gets what it missed, in one frame
+                if subscription.truncated:
+                    oldest = (
+                        subscription.backlog[0].seq
+                        if subscription.backlog
+                        else None
+                    )
+                    notice = StreamNotice(
+                        type="history_truncated",
+                        room=room,
+                        since=since,
+                        oldest_seq=oldest,
+                    )
+                    await send([notice])
+                if subscription.backlog:
+                    await send(subscription.backlog)
+                stream_settings = getattr(
+                    application.state, "settings", get_settings()
+                ).stream
+                if not stream_settings.frame_batching:
+                    async for item in subscription:
+                        # Frames are encoded once per message by the bus
+                        # and shared by every connected socket
+                        await send([item])
+                linger = stream_settings.batch_linger_ms / 1000
+                while stream_settings.frame_batching:
+                    # A burst costs one send per socket instead of one per
+                    # message; a lone JSON message still goes out unwrapped
+                    batch = await subscription.next_batch(
+                        stream_settings.batch_max_messages,
+                        stream_settings.batch_max_bytes,
+                        linger,
+                    )
+                    await send(batch)
+        except SubscriberOverflow:
+            logger.info(
+                "WebSocket too slow for room=%s; closing to resync", room
+            )
+            connection_closed = True
+            with contextlib.suppress(RuntimeError):
+                await websocket.close(
+                    code=RESYNC_CLOSE_CODE,
+                    reason="Too slow; resync with since",
                 )
         except WebSocketDisconnect:
             logger.info("WebSocket disconnected")
@@ -0,0 +1,95 @@
+"""Bus payload codecs for chat messages: stdlib json, orjson and MessagePack.
+
+Every process encodes with its configured backend, but payloads describe
+themselves (JSON objects start with ``{``, compact MessagePack records with
+an array header), so any process decodes what any other wrote and a
+deployment can switch codecs one process at a time. Streamed reply deltas
+travel marked apart from messages (a Kafka header, a local bus frame kind),
+so consumers that ignore them never decode them.
+
+Decoding always validates: pydantic-core is quicker than building models
+with ``model_construct``, so skipping validation would buy nothing.
+"""
+
+from __future__ import annotations
+
+try:  # pragma: no cover - optional dependency import
+    import orjson  # type: ignore[import-untyped]
+except ImportError:  # pragma: no cover - optional dependency missing
+    orjson = None  # type: ignore[assignment]
+
+from .config import CodecBackend
+from .models import ChatMessage, ReplyDelta
+from .wire import msgpack, unpack_message
+
+
+def available_backends() -> list[CodecBackend]:
+    """Backends whose optional dependency is installed."""
+    backends = [CodecBackend.JSON]
+    if orjson is not None:
+        backends.append(CodecBackend.ORJSON)
+    if msgpack is not None:
+        backends.append(CodecBackend.MSGPACK)
+    return backends
+
+
+def encode_message(message: ChatMessage, backend: CodecBackend) -> bytes:
+    """Encode a message as a bus payload with the given backend."""
+    if backend == CodecBackend.MSGPACK and msgpack is not None:
+        return message.msgpack_frame
+    if backend == CodecBackend.ORJSON and orjson is not None:
+        return orjson.dumps(
+            {
+                "id": message.id,
+                "author": message.author,
+                "role": message.role.value,
+                "content": message.content,
+                "persona": message.persona,
+                "persona_emoji": message.persona_emoji,
+                "room": message.room,
+                "seq": message.seq,
+                "created_at": message.created_at,
+            }
+        )
+    # The cached frame is shared with WebSocket fan-out, so JSON is free
+    # whenever the message is also sent to sockets
+    return message.json_frame.encode("utf-8")
+
+
+def decode_message(data: bytes) -> ChatMessage:
+    """Decode a payload written by any backend.
+
+    Raises ``ValueError`` (pydantic's ``ValidationError`` included) for
+    payloads that are malformed or fail validation.
+    """
+    if data[:1] == b"{":
+        # pydantic-core parses and validates in one pass, which beats any
+        # json.loads/orjson.loads + model_validate pairing
+        return ChatMessage.model_validate_json(data)
+    if msgpack is None:
+        raise ValueError("Binary payload but msgpack is not installed")
+    try:
+        fields = unpack_message(data)
+    except Exception as exc:  # msgpack raises several unrelated types
+        raise ValueError(f"Malformed MessagePack payload: {exc}") from exc
+    return ChatMessage.model_validate(fields)
+
+
+def encode_delta(delta: ReplyDelta, backend: CodecBackend) -> bytes:
+    """Encode a reply delta; the bus marks these apart from messages."""
+    if backend == CodecBackend.MSGPACK and msgpack is not None:
+        return delta.msgpack_frame
+    return delta.json_frame.encode("utf-8")
+
+
+def decode_delta(data: bytes) -> ReplyDelta:
+    """Decode a delta payload from any backend (raises ``ValueError``)."""
+    if data[:1] == b"{":
+        return ReplyDelta.model_validate_json(data)
+    if msgpack is None:
+        raise ValueError("Binary payload but msgpack is not installed")
+    try:
+        fields = msgpack.unpackb(data)
+    except Exception as exc:  # msgpack raises several unrelated types
+        raise ValueError(f"Malformed MessagePack payload: {exc}") from exc
+    return ReplyDelta.model_validate(fields)
@@ -6,15 +6,57 @@ import json
 import os
 from enum import Enum
 from functools import lru_cache
-from typing import Annotated
+from typing import Annotated, Any
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from pydantic_settings import BaseSettings
 
 
 class BusBackend(str, Enum):
     IN_MEMORY = "in-memory"
     KAFKA = "kafka"
+    # Unix-socket broker shared by every process on one machine
+    LOCAL = "local"
+
+
+class CodecBackend(str, Enum):
+    """Encoding of bus payloads (Kafka records, local bus frames)."""
+
+    JSON = "json"
+    # Same JSON on the wire, encoded by orjson when installed; decoding
+    # is pydantic's own JSON parser for every JSON payload either way
+    ORJSON = "orjson"
+    # Compact positional records, needs msgpack
+    MSGPACK = "msgpack"
+
+
+class PublishAck(str, Enum):
+    """When POST /send may answer: after broker commit or after enqueue."""
+
+    BROKER = "broker"
+    ENQUEUE = "enqueue"
+
+
+class RelayMode(str, Enum):
+    """How each web-tier instance consumes the chat topic for its sockets."""
+
+    # Every partition assigned manually, no consumer group (default)
+    ASSIGN = "assign"
+    # One throwaway consumer group per instance, offsets never committed
+    INSTANCE_GROUP = "instance-group"
+    # Single group shared by all instances (partitions split between them)
+    SHARED_GROUP = "shared-group"
+
+
+class SlowSubscriberPolicy(str, Enum):
+    """What the fan-out does when a WebSocket client's queue is full."""
+
+    # Discard the oldest queued message to make room for the new one
+    DROP_OLDEST = "drop-oldest"
+    # Replace the queued messages with one "you missed N messages" notice
+    COALESCE = "coalesce"
+    # Disconnect the client with a close code that tells it to resync
+    CLOSE = "close"
 
 
 class KafkaBusSettings(BaseModel):
@@ -23,6 +65,55 @@ class KafkaBusSettings(BaseModel):
         Field(default_factory=list),
     ]
     topic: str = "monster.chat"
+    # Rooms are keyed onto partitions, so more partitions spread rooms
+    # across brokers and consumers. Only applies when creating the topic.
+    partitions: int = 6
+    replication_factor: int = 1
+    # Producer batching: sends are pipelined and grouped for up to
+    # ``linger_ms`` or until a batch reaches ``max_batch_size`` bytes.
+    linger_ms: int = 5
+    max_batch_size: int = 16384
+    compression_type: str | None = None
+    acks: int | str = 1
+    publish_ack: PublishAck = PublishAck.BROKER
+    # Relay and persona consumers pull up to ``consume_max_records`` per
+    # getmany() call, waiting at most ``consume_timeout_ms`` for a batch
+    consume_max_records: int = 500
+    consume_timeout_ms: int = 100
+    relay_mode: RelayMode = RelayMode.ASSIGN
+    # Rebuild history rings from the topic tail on startup, reading at most
+    # ``warmup_depth`` records per partition (default: history_limit) and
+    # giving up after ``warmup_deadline_seconds``
+    history_warmup: bool = True
+    warmup_deadline_seconds: float = 5.0
+    warmup_depth: int | None = None
+    # Identifies this web instance in instance-group mode; defaults to
+    # hostname and pid so replicas never collide
+    instance_id: str | None = None
+
+    @field_validator("compression_type", mode="before")
+    @classmethod
+    def normalize_compression(cls, value: str | None) -> str | None:
+        if value is None:
+            return None
+        cleaned = str(value).strip().lower()
+        if cleaned in ("", "none"):
+            return None
+        if cleaned not in ("gzip", "snappy", "lz4", "zstd"):
+            raise ValueError(f"Unsupported compression codec: {value}")
+        return cleaned
+
+    @field_validator("acks", mode="before")
+    @classmethod
+    def normalize_acks(cls, value: int | str) -> int | str:
+        if isinstance(value, str):
+            cleaned = value.strip().lower()
+            if cleaned in ("all", "-1"):
+                return "all"
+            value = int(cleaned)
+        if value not in (0, 1):
+            raise ValueError("acks must be 0, 1 or 'all'")
+        return value
 
     @field_validator("brokers", mode="before")
     @classmethod
@@ -51,6 +142,11 @@ class KafkaBusSettings(BaseModel):
                 cleaned.append(trimmed)
         return cleaned
 
+    @property
+    def deltas_topic(self) -> str:
+        """Live-only topic for reply deltas; only the relay reads it."""
+        return f"{self.topic}.deltas"
+
     @field_validator("topic", mode="before")
     @classmethod
     def default_topic(cls, value: str | None) -> str:
@@ -62,11 +158,48 @@ class KafkaBusSettings(BaseModel):
         return "monster.chat"
 
 
+class LocalBusSettings(BaseModel):
+    """Single-host broker for running several API and persona workers."""
+
+    # The broker host holds an fcntl lock on ``<socket_path>.lock``
+    socket_path: str = "data/bus.sock"
+    # How long start-up and publishes wait for a (re-elected) broker
+    connect_timeout: float = 5.0
+    # Frames buffered per connection before the broker drops it
+    client_queue_size: int = 10000
+    # A new broker holds publishes this long so every surviving process
+    # can report the last seqs it saw before numbering resumes; covers the
+    # clients' reconnect backoff, which tops out at one second
+    failover_settle_seconds: float = Field(default=1.2, ge=0)
+
+
+class HistoryLogSettings(BaseModel):
+    """On-disk message log used to page through older room history."""
+
+    enabled: bool = False
+    directory: str = "data/history"
+    segment_bytes: int = 8 * 1024 * 1024
+    # Every Nth record of a segment gets a sparse index entry
+    index_interval: int = 64
+    # Per-room budgets; 0 disables the limit
+    retention_bytes: int = 256 * 1024 * 1024
+    retention_seconds: float = 7 * 24 * 3600
+
+
 class MessageBusSettings(BaseModel):
     backend: BusBackend = BusBackend.IN_MEMORY
     history_limit: int = 200
+    # Messages buffered per WebSocket client (default: history_limit)
+    subscriber_queue_size: int | None = None
+    slow_subscriber_policy: SlowSubscriberPolicy = (
+        SlowSubscriberPolicy.COALESCE
+    )
+    # Encoding for bus payloads; every process decodes all of them
+    codec: CodecBackend = CodecBackend.JSON
     namespace: str = "monster-mash-chatroom"
     kafka: KafkaBusSettings = Field(default_factory=KafkaBusSettings)
+    local: LocalBusSettings = Field(default_factory=LocalBusSettings)
+    history_log: HistoryLogSettings = Field(default_factory=HistoryLogSettings)
 
     @field_validator("namespace", mode="before")
     @classmethod
@@ -78,6 +211,17 @@ class MessageBusSettings(BaseModel):
             return fallback.strip()
         return value
 
+    @model_validator(mode="after")
+    def single_writer_history_log(self) -> MessageBusSettings:
+        # Every uvicorn worker on the local bus would append each message
+        # to the same segment files, each tracking only its own writes
+        if self.backend == BusBackend.LOCAL and self.history_log.enabled:
+            raise ValueError(
+                "BUS__HISTORY_LOG__ENABLED is not supported with "
+                "BUS__BACKEND=local: its processes would share one log"
+            )
+        return self
+
     @field_validator("history_limit", mode="before")
     @classmethod
     def coerce_history_limit(cls, value: int | str | None) -> int | str | None:
@@ -91,13 +235,108 @@ class MessageBusSettings(BaseModel):
         return value
 
 
+class StreamSettings(BaseModel):
+    """WebSocket send path for /stream."""
+
+    # Drain whatever is queued for a socket and send it as one array frame
+    frame_batching: bool = True
+    batch_max_messages: int = 64
+    # Soft cap on the encoded size of one batched frame
+    batch_max_bytes: int = 64 * 1024
+    # Extra wait for stragglers after the first message; 0 only takes what
+    # is already queued, so an idle room never adds latency
+    batch_linger_ms: float = 0.0
+
+
+class WorkerSettings(BaseModel):
+    """Reply pipeline of the persona workers."""
+
+    # Replies a persona works on at once, across rooms
+    max_concurrent_replies: int = Field(default=4, ge=1)
+    # Drop a pending reply once this many newer messages reached its room
+    stale_after_messages: int = Field(default=5, ge=1)
+    # Stream replies to the room token by token (no typing delay) and then
+    # commit the finished message
+    stream_replies: bool = False
+
+
+class SupervisorSettings(BaseModel):
+    """Process supervisor that runs and restarts the persona workers."""
+
+    # A crashed worker is restarted after this delay, doubled per crash in
+    # a row up to the maximum; a worker that ran that long resets it
+    restart_backoff_seconds: float = Field(default=1.0, gt=0)
+    restart_backoff_max_seconds: float = Field(default=60.0, gt=0)
+    # Workers get this long to flush and exit before being killed
+    shutdown_grace_seconds: float = 10.0
+    # Liveness and consumer lag are logged (and written out) this often
+    status_interval_seconds: float = Field(default=30.0, gt=0)
+
+
+class LLMCacheSettings(BaseModel):
+    """Replies cached by model and prompt; a repeated prompt skips the LLM."""
+
+    enabled: bool = True
+    max_entries: int = Field(default=1024, ge=1)
+    ttl_seconds: float = Field(default=3600.0, gt=0)
+    # SQLite file keeping cached replies across restarts (unset: memory only)
+    path: str | None = None
+
+
+class CircuitBreakerSettings(BaseModel):
+    """Per-model circuit breaker in front of the LLM calls of a worker."""
+
+    enabled: bool = True
+    # Failed calls in a row that open a model's breaker
+    failure_threshold: int = Field(default=3, ge=1)
+    # An open breaker refuses calls this long, then lets one probe through
+    cooldown_seconds: float = Field(default=30.0, gt=0)
+    # Workers write their counters and breakers' state here for
+    # GET /diagnostics every report interval (unset: not reported)
+    state_dir: str | None = "data/llm-breakers"
+    report_interval_seconds: float = Field(default=5.0, gt=0)
+
+
+class SummarySettings(BaseModel):
+    """Rolling summaries standing in for the older turns of long chats."""
+
+    enabled: bool = False
+    # A prompt holding more turns than this gets all but the newest
+    # ``keep_recent`` folded into its summary, in the background
+    after_messages: int = Field(default=16, ge=2)
+    keep_recent: int = Field(default=8, ge=1)
+    # Model writing the summaries (default: MODEL_ROUTING__DEFAULT_MODEL);
+    # "extractive" picks the telling sentences locally, without an LLM
+    model: str | None = None
+    max_tokens: int = Field(default=200, ge=32)
+
+
+class ModelLimits(BaseModel):
+    """Request budget of one model, shared by a worker's personas using it."""
+
+    # Token bucket: the sustained request rate, plus how many requests may
+    # start back to back after a quiet spell
+    requests_per_minute: float | None = Field(default=None, gt=0)
+    burst: int = Field(default=5, ge=1)
+    # Requests in flight at once (a streamed reply holds its slot throughout)
+    max_concurrent: int | None = Field(default=None, ge=1)
+    # Estimated tokens of a prompt (persona prompt plus as much recent
+    # conversation as fits); a cheap model's context can be kept small
+    max_prompt_tokens: int = Field(default=3000, ge=256)
+
+
 class ModelRouting(BaseModel):
     default_model: str = "gpt-4o-mini"
     persona_model_map: Annotated[dict[str, str], Field(default_factory=dict)]
+    # Per model name; models not listed get ``default_limits``
+    model_limits: Annotated[
+        dict[str, ModelLimits], Field(default_factory=dict)
+    ]
+    default_limits: ModelLimits = ModelLimits()
 
-    @field_validator("persona_model_map", mode="before")
+    @field_validator("persona_model_map", "model_limits", mode="before")
     @classmethod
-    def parse_json_map(cls, value: dict[str, str] | str) -> dict[str, str]:
+    def parse_json_map(cls, value: dict[str, Any] | str) -> dict[str, Any]:
         if isinstance(value, str) and value.strip():
             return json.loads(value)
         return value
@@ -106,11 +345,20 @@ class ModelRouting(BaseModel):
         mapping = dict(self.persona_model_map)
         return mapping.get(persona_key, self.default_model)
 
+    def limits_for(self, model: str) -> ModelLimits:
+        return self.model_limits.get(model, self.default_limits)
+
 
 class Settings(BaseSettings):
     bus: MessageBusSettings = MessageBusSettings()
+    stream: StreamSettings = StreamSettings()
+    worker: WorkerSettings = WorkerSettings()
+    supervisor: SupervisorSettings = SupervisorSettings()
     demo_mode: bool = True
     model_routing: ModelRouting = ModelRouting()
+    llm_cache: LLMCacheSettings = LLMCacheSettings()
+    llm_breaker: CircuitBreakerSettings = CircuitBreakerSettings()
+    llm_summary: SummarySettings = SummarySettings()
 
     class Config:
         env_prefix = ""
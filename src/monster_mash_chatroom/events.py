@@ -4,12 +4,20 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
-import json
 import logging
+import os
+import socket
 from collections import deque
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Callable, Iterable, Sequence
+from typing import Any
 
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from aiokafka import (
+    AIOKafkaConsumer,
+    AIOKafkaProducer,
+    ConsumerRebalanceListener,
+    ConsumerRecord,
+    TopicPartition,
+)
 from aiokafka.admin import AIOKafkaAdminClient, NewTopic
 from aiokafka.errors import (
     IncompatibleBrokerVersion,
@@ -18,11 +26,34 @@ from aiokafka.errors import (
     TopicAlreadyExistsError,
 )
 
-from .config import BusBackend, KafkaBusSettings, MessageBusSettings
-from .models import ChatMessage
+from .codec import decode_delta, decode_message, encode_message
+from .config import (
+    BusBackend,
+    CodecBackend,
+    HistoryLogSettings,
+    KafkaBusSettings,
+    LocalBusSettings,
+    MessageBusSettings,
+    RelayMode,
+    SlowSubscriberPolicy,
+)
+from .history_log import MessageLog
+from .local_bus import LocalBusClient
+from .models import (
+    DEFAULT_ROOM,
+    ChatMessage,
+    MessageRecord,
+    ReplyDelta,
+    StreamNotice,
+)
 
 logger = logging.getLogger(__name__)
 
+# Kafka record header marking a streamed reply delta rather than a message
+DELTA_HEADER = ("kind", b"delta")
+
+StreamItem = MessageRecord | StreamNotice | ReplyDelta
+
 
 class EventBus:
     """Abstract interface for publishing and subscribing to chat messages.
@@ -37,16 +68,459 @@ class EventBus:
     async def stop(self) -> None:  # pragma: no cover - interface hook
         raise NotImplementedError
 
-    async def publish(self, message: ChatMessage) -> None:  # pragma: no cover
+    async def publish(self, message: ChatMessage) -> None:
+        """Publish a message and wait until the backend has accepted it."""
+        delivery = await self.enqueue(message)
+        await delivery
+
+    async def enqueue(
+        self, message: ChatMessage
+    ) -> asyncio.Future[Any]:  # pragma: no cover - interface hook
+        """Hand a message to the backend and return its delivery future.
+
+        The coroutine returns once the message is queued for sending; the
+        future resolves when the backend confirms delivery.
+        """
+        raise NotImplementedError
+
+    async def subscribe(
+        self, room: str = DEFAULT_ROOM
+    ) -> AsyncGenerator[MessageRecord, None]:
+        raise NotImplementedError
+
+    async def get_recent(
+        self, room: str = DEFAULT_ROOM
+    ) -> list[MessageRecord]:  # pragma: no cover
         raise NotImplementedError
 
-    async def subscribe(self) -> AsyncGenerator[ChatMessage, None]:
+    async def get_history(
+        self,
+        room: str = DEFAULT_ROOM,
+        before: int | None = None,
+        limit: int = 50,
+    ) -> list[MessageRecord]:  # pragma: no cover - interface hook
+        """Page back through a room: ``limit`` messages below ``before``."""
         raise NotImplementedError
 
-    async def get_recent(self) -> list[ChatMessage]:  # pragma: no cover
+    @property
+    def warmup_complete(self) -> bool:
+        """Whether retained history was fully restored at startup."""
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        """Fan-out counters for diagnostics."""
+        return {}
+
+    def open_subscription(
+        self, room: str = DEFAULT_ROOM, since: int | None = None
+    ) -> Subscription:  # pragma: no cover - interface hook
+        """Subscribe to a room and capture what a resuming client missed.
+
+        ``since`` is the last sequence number the client saw; ``None``
+        means a fresh client that wants the whole retained history.
+        """
         raise NotImplementedError
 
 
+class SubscriberOverflow(Exception):
+    """Raised by a subscription the ``close`` policy dropped for lagging."""
+
+
+class Subscription:
+    """Live feed for one room plus the backlog a (re)connecting client missed.
+
+    The queue is registered and the backlog captured in the same step, so
+    nothing published in between is lost or delivered twice. Use it as a
+    context manager to unregister when the client goes away.
+
+    The queue is a plain deque the fan-out extends once per delivered
+    batch, with an event to wake the reader; ``capacity`` bounds it before
+    the slow-subscriber policy steps in.
+    """
+
+    def __init__(
+        self,
+        fan_out: RoomFanOut,
+        room: str,
+        capacity: int,
+        backlog: list[MessageRecord],
+        truncated: bool,
+    ) -> None:
+        self.room = room
+        self.backlog = backlog
+        # True when the client's gap reaches past the retained history
+        self.truncated = truncated
+        # Set by the ``close`` policy once the client fell too far behind
+        self.overflowed = False
+        self.capacity = capacity
+        self.queue: deque[StreamItem] = deque()
+        self._ready = asyncio.Event()
+        self._fan_out = fan_out
+
+    def __enter__(self) -> Subscription:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __aiter__(self) -> Subscription:
+        return self
+
+    async def __anext__(self) -> StreamItem:
+        while not self.queue:
+            if self.overflowed:
+                raise SubscriberOverflow(self.room)
+            self._ready.clear()
+            await self._ready.wait()
+        if self.overflowed:
+            raise SubscriberOverflow(self.room)
+        return self.queue.popleft()
+
+    def wake(self) -> None:
+        self._ready.set()
+
+    async def next_batch(
+        self, max_items: int, max_bytes: int, linger: float = 0.0
+    ) -> list[StreamItem]:
+        """Wait for the next item, then drain what else is queued behind it.
+
+        The batch stops at ``max_items`` or once the encoded frames reach
+        ``max_bytes``. A positive ``linger`` (seconds) gives a burst that
+        is still arriving a moment to land in the same batch.
+        """
+        first = await self.__anext__()
+        batch = [first]
+        size = len(first.json_frame)
+        queue = self.queue
+        if linger > 0 and len(queue) < max_items - 1:
+            await asyncio.sleep(linger)
+        while queue and len(batch) < max_items and size < max_bytes:
+            item = queue.popleft()
+            batch.append(item)
+            size += len(item.json_frame)
+        return batch
+
+    def close(self) -> None:
+        self._fan_out.remove_subscriber(self)
+
+
+class RoomFanOut:
+    """Per-room history rings and subscriber queues shared by the buses.
+
+    Delivered messages are kept as compact ``MessageRecord``s. Reply
+    deltas only pass through to the live queues, and only into those with
+    room to spare: they are superseded by the committed reply anyway, so
+    they never trigger the slow-subscriber policy. Subscribers are indexed
+    by room, so delivering a message only touches the queues of clients
+    watching that room. Fan-out is synchronous and
+    never awaits, which keeps the index consistent without a lock. A full
+    subscriber queue is handled by the configured slow-subscriber policy,
+    and every policy decision is counted for diagnostics.
+    """
+
+    def __init__(
+        self,
+        history_limit: int,
+        subscriber_queue_size: int,
+        message_log: MessageLog | None = None,
+        slow_subscriber_policy: SlowSubscriberPolicy = (
+            SlowSubscriberPolicy.COALESCE
+        ),
+    ) -> None:
+        self._history_limit = history_limit
+        # Optional on-disk log; the rings stay the hot tail in RAM
+        self._log = message_log
+        self._subscriber_queue_size = max(1, subscriber_queue_size)
+        self._policy = slow_subscriber_policy
+        # drop-oldest and coalesce count discarded messages, close counts
+        # disconnected subscribers
+        self._overflows: dict[str, int] = {
+            policy.value: 0 for policy in SlowSubscriberPolicy
+        }
+        self._deltas_dropped = 0
+        self._history: dict[str, deque[MessageRecord]] = {}
+        self._subscribers: dict[str, set[Subscription]] = {}
+        # Per-room sequence counters, used when the backend has none
+        self._last_seq: dict[str, int] = {}
+        # Every message of a room with seq above its horizon is retained;
+        # anything at or below it was evicted or never seen here
+        self._horizon: dict[str, int] = {}
+        if message_log is not None:
+            self._restore()
+
+    def _restore(self) -> None:
+        """Refill the rings from the log's tail after a restart.
+
+        Without this a client resuming before its room sees new traffic
+        would find an empty ring and no horizon, and lose the gap silently.
+        """
+        assert self._log is not None
+        for room in self._log.rooms():
+            tail = self._log.read_before(room, None, self._history_limit)
+            if not tail:
+                continue
+            self._history[room] = deque(tail, maxlen=self._history_limit)
+            self._horizon[room] = tail[0].seq - 1
+            self._last_seq[room] = tail[-1].seq
+
+    def history(self, room: str) -> list[MessageRecord]:
+        return list(self._history.get(room, ()))
+
+    def page(
+        self, room: str, before: int | None, limit: int
+    ) -> list[MessageRecord]:
+        """Return up to ``limit`` messages below ``before``, oldest first.
+
+        The RAM ring answers whatever it can; only the remainder is read
+        from the on-disk log.
+        """
+        hot = [
+            message
+            for message in self._history.get(room, ())
+            if before is None or message.seq < before
+        ]
+        if len(hot) >= limit or self._log is None:
+            return hot[-limit:] if limit else []
+        upper = hot[0].seq if hot else before
+        return self._log.read_before(room, upper, limit - len(hot)) + hot
+
+    def stats(self) -> dict[str, Any]:
+        """Subscriber counts and per-policy slow-subscriber counters."""
+        return {
+            "rooms": len(self._history),
+            "subscribers": sum(
+                len(subs) for subs in self._subscribers.values()
+            ),
+            "subscriber_queue_size": self._subscriber_queue_size,
+            "slow_subscriber_policy": self._policy.value,
+            "slow_subscriber_overflows": dict(self._overflows),
+            "deltas_dropped": self._deltas_dropped,
+        }
+
+    def close(self) -> None:
+        self.clear()
+        if self._log is not None:
+            self._log.close()
+
+    def open(self, room: str, since: int | None = None) -> Subscription:
+        """Register a subscriber and compute its replay in one step."""
+        history = self._history.get(room, ())
+        if since is None:
+            backlog = list(history)
+            truncated = False
+        elif since > self._room_last_seq(room):
+            # Numbering the client never saw: seq restarted (a restart of
+            # the in-memory bus), so it gets the whole ring from scratch
+            backlog = list(history)
+            truncated = True
+        else:
+            backlog = [message for message in history if message.seq > since]
+            truncated = since < self._horizon.get(room, since)
+        subscription = Subscription(
+            self, room, self._subscriber_queue_size, backlog, truncated
+        )
+        self.add_subscriber(subscription)
+        return subscription
+
+    def _room_last_seq(self, room: str) -> int:
+        last = self._last_seq.get(room)
+        if last is None and self._log is not None:
+            last = self._log.last_seq(room)
+        return last or 0
+
+    def add_subscriber(self, subscription: Subscription) -> None:
+        self._subscribers.setdefault(subscription.room, set()).add(
+            subscription
+        )
+
+    def remove_subscriber(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.room)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscribers[subscription.room]
+
+    def clear(self) -> None:
+        self._subscribers.clear()
+
+    def deliver(self, message: ChatMessage) -> None:
+        """Record one message in its room's history and push it to watchers."""
+        self.deliver_many([message])
+
+    def deliver_many(
+        self, messages: Sequence[ChatMessage | ReplyDelta]
+    ) -> None:
+        """Record a batch in the room histories and push it to watchers.
+
+        Messages without a sequence number (in-process publishing) get the
+        next one for their room; Kafka messages arrive with their offset.
+        Each room's ring, log and subscriber queues are touched once per
+        batch rather than once per message. Deltas in the batch keep their
+        place relative to the messages of their room.
+        """
+        by_room: dict[str, list[ChatMessage | ReplyDelta]] = {}
+        for message in messages:
+            by_room.setdefault(message.room, []).append(message)
+        for room, batch in by_room.items():
+            run: list[ChatMessage] = []
+            for item in batch:
+                if isinstance(item, ChatMessage):
+                    run.append(item)
+                    continue
+                if run:
+                    self._deliver_run(room, run)
+                    run = []
+                self.deliver_delta(item)
+            if run:
+                self._deliver_run(room, run)
+
+    def _deliver_run(self, room: str, run: list[ChatMessage]) -> None:
+        batch = self._record(room, run)
+        if batch:
+            self._fan_out(room, batch)
+
+    def deliver_delta(self, delta: ReplyDelta) -> None:
+        """Push a reply delta to the room's watchers without recording it."""
+        subscriptions = self._subscribers.get(delta.room)
+        if not subscriptions:
+            return
+        for subscription in subscriptions:
+            if len(subscription.queue) < subscription.capacity:
+                subscription.queue.append(delta)
+                subscription.wake()
+            else:
+                self._deltas_dropped += 1
+
+    def _record(
+        self, room: str, messages: list[ChatMessage]
+    ) -> list[MessageRecord]:
+        last = self._last_seq.get(room)
+        fresh: list[ChatMessage] = []
+        for message in messages:
+            if message.seq is None:
+                if last is None and self._log is not None:
+                    # Resume numbering after whatever survived on disk
+                    last = self._log.last_seq(room)
+                # Set on the model too, so the publisher sees its seq
+                message.seq = (last or 0) + 1
+            elif last is not None and message.seq <= last:
+                continue  # already restored from the log (Kafka warm-up)
+            last = message.seq
+            fresh.append(message)
+        if not fresh:
+            return []
+        batch = [MessageRecord.from_message(message) for message in fresh]
+        self._last_seq[room] = batch[-1].seq
+        history = self._history.get(room)
+        if history is None:
+            history = deque(maxlen=self._history_limit)
+            self._history[room] = history
+            self._horizon.setdefault(room, batch[0].seq - 1)
+        evicted = len(history) + len(batch) - self._history_limit
+        if evicted > 0:
+            # The newest message pushed out of the ring becomes the horizon
+            if evicted <= len(history):
+                self._horizon[room] = history[evicted - 1].seq
+            else:
+                self._horizon[room] = batch[evicted - len(history) - 1].seq
+        history.extend(batch)
+        if self._log is not None:
+            self._log.append_many(batch)
+        return batch
+
+    def _fan_out(self, room: str, batch: list[MessageRecord]) -> None:
+        subscriptions = self._subscribers.get(room)
+        if not subscriptions:
+            return
+        # Encode once up front; every subscriber sends the cached frames
+        for message in batch:
+            _ = message.json_frame
+        # Never block on a slow client; its queue overflows by policy instead.
+        # Slow means a backlog: a caught-up client takes a whole batch, even
+        # one larger than its queue
+        closed: list[Subscription] = []
+        for subscription in subscriptions:
+            queue = subscription.queue
+            if not queue or len(queue) + len(batch) <= subscription.capacity:
+                queue.extend(batch)
+            else:
+                fits = max(subscription.capacity - len(queue), 0)
+                queue.extend(batch[:fits])
+                if not self._overflow(subscription, batch[fits:]):
+                    closed.append(subscription)
+            # A closed subscriber's reader wakes up to see it overflowed
+            subscription.wake()
+        # Remove closed subscribers after iteration (not while looping)
+        for subscription in closed:
+            self.remove_subscriber(subscription)
+        if closed:
+            logger.info(
+                "Closed %d slow subscribers in room=%s", len(closed), room
+            )
+
+    def _overflow(
+        self, subscription: Subscription, batch: list[MessageRecord]
+    ) -> bool:
+        """Apply the slow-subscriber policy to what no longer fits the queue.
+
+        Returns False when the subscriber has to be disconnected.
+        """
+        queue = subscription.queue
+        if self._policy == SlowSubscriberPolicy.DROP_OLDEST:
+            queue.extend(batch)
+            dropped = len(queue) - subscription.capacity
+            for _ in range(dropped):
+                queue.popleft()
+            self._overflows[self._policy.value] += dropped
+            return True
+        if self._policy == SlowSubscriberPolicy.COALESCE:
+            # Fold everything queued plus the new batch into one notice;
+            # an earlier notice still in the queue is merged, not repeated
+            dropped = len(batch)
+            missed = len(batch)
+            since: int | None = None
+            for item in queue:
+                if isinstance(item, ReplyDelta):
+                    continue
+                if isinstance(item, StreamNotice):
+                    missed += item.count or 0
+                    skipped_from = item.since
+                else:
+                    dropped += 1
+                    missed += 1
+                    skipped_from = item.seq - 1
+                if since is None:
+                    since = skipped_from
+            if since is None:
+                since = batch[0].seq - 1
+            queue.clear()
+            queue.append(
+                StreamNotice(
+                    type="missed",
+                    room=subscription.room,
+                    since=since,
+                    count=missed,
+                )
+            )
+            self._overflows[self._policy.value] += dropped
+            return True
+        subscription.overflowed = True
+        self._overflows[self._policy.value] += 1
+        return False
+
+    async def stream(self, room: str) -> AsyncGenerator[MessageRecord, None]:
+        """Yield messages for one room until the consumer stops iterating.
+
+        Missed-message notices are skipped; under the ``close`` policy a
+        lagging consumer gets ``SubscriberOverflow`` instead of a stall.
+        """
+        with self.open(room) as subscription:
+            async for item in subscription:
+                if isinstance(item, MessageRecord):
+                    yield item
+
+
 class InMemoryEventBus(EventBus):
     """Fallback event bus when Kafka is unavailable."""
 
@@ -54,49 +528,59 @@ class InMemoryEventBus(EventBus):
         self,
         history_limit: int = 200,
         subscriber_queue_size: int | None = None,
+        message_log: MessageLog | None = None,
+        slow_subscriber_policy: SlowSubscriberPolicy = (
+            SlowSubscriberPolicy.COALESCE
+        ),
     ) -> None:
-        self._history: deque[ChatMessage] = deque(maxlen=history_limit)
         queue_size = subscriber_queue_size or history_limit or 1
-        self._subscriber_queue_size = max(1, queue_size)
-        self._subscribers: set[asyncio.Queue[ChatMessage]] = set()
+        self._rooms = RoomFanOut(
+            history_limit, queue_size, message_log, slow_subscriber_policy
+        )
 
     async def start(self) -> None:
         logger.warning("Starting InMemoryEventBus – Kafka connection unavailable")
 
     async def stop(self) -> None:
-        self._subscribers.clear()
+        self._rooms.close()
         logger.debug("InMemoryEventBus cleared subscribers on shutdown")
 
-    async def publish(self, message: ChatMessage) -> None:
-        self._history.append(message)
-        # Track slow/dead subscribers to prune them
-        # Prevents one slow client from blocking all others
-        dead: list[asyncio.Queue[ChatMessage]] = []
-        for queue in self._subscribers:
-            try:
-                queue.put_nowait(message)  # Non-blocking push
-            except asyncio.QueueFull:
-                dead.append(queue)  # Queue full = client too slow
-        if dead:
-            logger.debug("Pruned %d slow subscribers", len(dead))
-        # Remove slow subscribers after iteration (avoid modifying during loop)
-        for queue in dead:
-            self._subscribers.discard(queue)
-
-    async def subscribe(self) -> AsyncGenerator[ChatMessage, None]:
-        queue: asyncio.Queue[ChatMessage] = asyncio.Queue(
-            maxsize=self._subscriber_queue_size
+    async def enqueue(self, message: ChatMessage) -> asyncio.Future[Any]:
+        self._rooms.deliver(message)
+        # Delivery is immediate in-process, so the future is already done
+        delivery: asyncio.Future[Any] = (
+            asyncio.get_running_loop().create_future()
         )
-        self._subscribers.add(queue)
-        try:
-            while True:
-                yield await queue.get()
-        finally:
-            self._subscribers.discard(queue)
-            logger.debug("Subscriber removed from in-memory bus")
+        delivery.set_result(None)
+        return delivery
+
+    async def subscribe(
+        self, room: str = DEFAULT_ROOM
+    ) -> AsyncGenerator[MessageRecord, None]:
+        async for message in self._rooms.stream(room):
+            yield message
+        logger.debug("Subscriber removed from in-memory bus")
+
+    async def get_recent(
+        self, room: str = DEFAULT_ROOM
+    ) -> list[MessageRecord]:
+        return self._rooms.history(room)
+
+    async def get_history(
+        self,
+        room: str = DEFAULT_ROOM,
+        before: int | None = None,
+        limit: int = 50,
+    ) -> list[MessageRecord]:
+        return self._rooms.page(room, before, limit)
+
+    def open_subscription(
+        self, room: str = DEFAULT_ROOM, since: int | None = None
+    ) -> Subscription:
+        return self._rooms.open(room, since)
 
-    async def get_recent(self) -> list[ChatMessage]:
-        return list(self._history)
+    def stats(self) -> dict[str, Any]:
+        return self._rooms.stats()
 
 
 class KafkaEventBus(EventBus):
@@ -108,17 +592,28 @@ class KafkaEventBus(EventBus):
         namespace: str,
         history_limit: int,
         subscriber_queue_size: int | None,
+        message_log: MessageLog | None = None,
+        slow_subscriber_policy: SlowSubscriberPolicy = (
+            SlowSubscriberPolicy.COALESCE
+        ),
+        codec: CodecBackend = CodecBackend.JSON,
     ) -> None:
         self._settings = settings
+        self._codec = codec
         self._namespace = namespace
         self._producer: AIOKafkaProducer | None = None
         self._consumer: AIOKafkaConsumer | None = None
         self._consumer_task: asyncio.Task[None] | None = None
-        self._history: deque[ChatMessage] = deque(maxlen=history_limit)
-        self._subscriber_queues: set[asyncio.Queue[ChatMessage]] = set()
         queue_size = subscriber_queue_size or history_limit or 1
-        self._subscriber_queue_size = max(1, queue_size)
-        self._lock = asyncio.Lock()
+        self._rooms = RoomFanOut(
+            history_limit, queue_size, message_log, slow_subscriber_policy
+        )
+        self._history_limit = history_limit
+        # False until the history rings were rebuilt from the topic
+        self._warmup_complete = False
+        # Where the warm-up stopped reading each partition; a group-mode
+        # relay starts there once it is assigned the partition
+        self._resume_offsets: dict[TopicPartition, int] = {}
 
     async def start(self) -> None:
         logger.info("Starting KafkaEventBus – brokers=%s", self._settings.brokers)
@@ -126,22 +621,25 @@ class KafkaEventBus(EventBus):
             await asyncio.wait_for(self._ensure_topic(), timeout=10)
         except asyncio.TimeoutError as exc:
             raise KafkaConnectionError("Timed out while ensuring Kafka topic") from exc
-        self._producer = AIOKafkaProducer(bootstrap_servers=self._settings.brokers)
+        self._producer = build_producer(self._settings)
         try:
             await asyncio.wait_for(self._producer.start(), timeout=10)
         except (asyncio.TimeoutError, KafkaError, KafkaConnectionError) as exc:
             await self._producer.stop()
             self._producer = None
             raise KafkaConnectionError("Failed to start Kafka producer") from exc
-        self._consumer = AIOKafkaConsumer(
-            self._settings.topic,
-            bootstrap_servers=self._settings.brokers,
-            group_id=f"{self._namespace}.websocket-relay",
-            enable_auto_commit=True,
-            auto_offset_reset="latest",
-        )
+        self._consumer = self._build_relay_consumer()
         try:
             await asyncio.wait_for(self._consumer.start(), timeout=10)
+            if self._settings.relay_mode == RelayMode.ASSIGN:
+                await asyncio.wait_for(
+                    self._assign_all_partitions(
+                        self._consumer,
+                        self._settings.topic,
+                        self._settings.deltas_topic,
+                    ),
+                    timeout=10,
+                )
         except (asyncio.TimeoutError, KafkaError, KafkaConnectionError) as exc:
             await self._consumer.stop()
             self._consumer = None
@@ -149,8 +647,203 @@ class KafkaEventBus(EventBus):
                 await self._producer.stop()
                 self._producer = None
             raise KafkaConnectionError("Failed to start Kafka consumer") from exc
+        if self._settings.history_warmup:
+            await self._warm_up()
+            if self._settings.relay_mode != RelayMode.ASSIGN:
+                # Partitions assigned before the warm-up finished
+                self._resume_from_warm_up(self._consumer.assignment())
         self._consumer_task = asyncio.create_task(self._consume_loop())
 
+    @property
+    def warmup_complete(self) -> bool:
+        return self._warmup_complete
+
+    async def _warm_up(self) -> None:
+        """Rebuild the history rings from the topic before live tailing.
+
+        In assign mode the relay consumer itself is rewound, so live tailing
+        continues exactly where the warm-up stopped (even after a deadline
+        hit, the consume loop just carries on catching up). Group modes
+        cannot seek before the group assigns partitions, so a short-lived
+        group-less consumer reads the tail instead, and the relay starts
+        each partition where that consumer stopped once it is assigned it.
+        """
+        deadline = self._settings.warmup_deadline_seconds
+        if self._settings.relay_mode == RelayMode.ASSIGN:
+            assert self._consumer is not None
+            consumer = self._consumer
+        else:
+            consumer = AIOKafkaConsumer(
+                bootstrap_servers=self._settings.brokers,
+                group_id=None,
+                enable_auto_commit=False,
+            )
+        started = asyncio.get_running_loop().time()
+        try:
+            if consumer is not self._consumer:
+                await asyncio.wait_for(consumer.start(), timeout=deadline)
+                await asyncio.wait_for(
+                    self._assign_all_partitions(
+                        consumer, self._settings.topic
+                    ),
+                    timeout=deadline,
+                )
+            remaining = deadline - (
+                asyncio.get_running_loop().time() - started
+            )
+            restored = await asyncio.wait_for(
+                self._replay_tail(consumer), timeout=max(remaining, 0.001)
+            )
+        except (asyncio.TimeoutError, KafkaError) as exc:
+            logger.warning(
+                "History warm-up incomplete after %.1fs: %s",
+                deadline,
+                str(exc) or "deadline reached",
+            )
+        else:
+            self._warmup_complete = True
+            logger.info(
+                "History warm-up restored %d message(s) in %.2fs",
+                restored,
+                asyncio.get_running_loop().time() - started,
+            )
+        finally:
+            if consumer is not self._consumer:
+                await consumer.stop()
+
+    async def _replay_tail(self, consumer: AIOKafkaConsumer) -> int:
+        """Seek each partition back and bulk-read up to its current end.
+
+        Records past the end offsets were published during the warm-up.
+        They are delivered live, like the consume loop would, since the
+        consumer has moved past them already.
+        """
+        topic = self._settings.topic
+        partitions = [tp for tp in consumer.assignment() if tp.topic == topic]
+        depth = self._settings.warmup_depth or self._history_limit
+        end_offsets = await consumer.end_offsets(partitions)
+        begin_offsets = await consumer.beginning_offsets(partitions)
+        pending: set[TopicPartition] = set()
+        for partition in partitions:
+            end = end_offsets[partition]
+            start = max(begin_offsets[partition], end - depth)
+            self._resume_offsets[partition] = min(start, end)
+            if start < end:
+                consumer.seek(partition, start)
+                pending.add(partition)
+        restored = 0
+        while pending:
+            batches = await consumer.getmany(
+                *pending,
+                timeout_ms=200,
+                max_records=self._settings.consume_max_records,
+            )
+            warm: dict[TopicPartition, list[ConsumerRecord]] = {}
+            live: dict[TopicPartition, list[ConsumerRecord]] = {}
+            for partition, records in batches.items():
+                end = end_offsets[partition]
+                warm[partition] = [r for r in records if r.offset < end]
+                live[partition] = [r for r in records if r.offset >= end]
+                if records:
+                    self._resume_offsets[partition] = records[-1].offset + 1
+            messages = decode_batches(warm)
+            self._rooms.deliver_many(messages)
+            self._rooms.deliver_many(decode_events(live))
+            restored += len(messages)
+            for partition in list(pending):
+                if (
+                    await consumer.position(partition)
+                    >= end_offsets[partition]
+                ):
+                    pending.discard(partition)
+        return restored
+
+    def _resume_from_warm_up(
+        self, partitions: Iterable[TopicPartition]
+    ) -> None:
+        """Start newly assigned partitions right after the warm-up's reads.
+
+        Without this a group-mode relay would start from "latest" (missing
+        what arrived since the warm-up looked) or from committed offsets
+        (delivering the warmed-up messages a second time).
+        """
+        assert self._consumer is not None
+        for partition in partitions:
+            offset = self._resume_offsets.pop(partition, None)
+            if offset is not None:
+                self._consumer.seek(partition, offset)
+
+    def _build_relay_consumer(self) -> AIOKafkaConsumer:
+        """Create the consumer feeding this instance's WebSocket clients.
+
+        Every web replica must see the whole stream, so by default no
+        consumer group is used at all. The group modes are kept for setups
+        that rely on broker-side group tooling.
+        """
+        mode = self._settings.relay_mode
+        relay_group = f"{self._namespace}.websocket-relay"
+        if mode == RelayMode.ASSIGN:
+            # Partitions are assigned after start(); nothing is registered
+            # on the broker, so a crashed instance leaves nothing behind
+            return AIOKafkaConsumer(
+                bootstrap_servers=self._settings.brokers,
+                group_id=None,
+                enable_auto_commit=False,
+                auto_offset_reset="latest",
+            )
+        if mode == RelayMode.INSTANCE_GROUP:
+            instance_id = self._settings.instance_id or (
+                f"{socket.gethostname()}-{os.getpid()}"
+            )
+            # Offsets are never committed: a group without offsets is
+            # dropped by the coordinator as soon as its last member leaves
+            # or its session times out, so dead replicas don't linger
+            consumer = AIOKafkaConsumer(
+                bootstrap_servers=self._settings.brokers,
+                group_id=f"{relay_group}.{instance_id}",
+                enable_auto_commit=False,
+                auto_offset_reset="latest",
+            )
+        else:
+            consumer = AIOKafkaConsumer(
+                bootstrap_servers=self._settings.brokers,
+                group_id=relay_group,
+                enable_auto_commit=True,
+                auto_offset_reset="latest",
+            )
+        consumer.subscribe(
+            [self._settings.topic, self._settings.deltas_topic],
+            listener=_WarmUpResume(self._resume_from_warm_up),
+        )
+        return consumer
+
+    async def _assign_all_partitions(
+        self, consumer: AIOKafkaConsumer, *topics: str
+    ) -> None:
+        """Manually assign every partition of the topics, from the end."""
+        assignment: list[TopicPartition] = []
+        for topic in topics:
+            partitions: set[int] | None = None
+            for _attempt in range(20):
+                # topics() forces a metadata refresh for a group-less consumer
+                await consumer.topics()
+                partitions = consumer.partitions_for_topic(topic)
+                if partitions:
+                    break
+                await asyncio.sleep(0.25)
+            if not partitions:
+                raise KafkaConnectionError(
+                    f"No partitions found for topic '{topic}'"
+                )
+            assignment.extend(TopicPartition(topic, p) for p in partitions)
+        consumer.assign(assignment)
+        await consumer.seek_to_end(*assignment)
+        logger.info(
+            "KafkaEventBus relay assigned %d partition(s) of %s",
+            len(assignment),
+            ", ".join(f"'{topic}'" for topic in topics),
+        )
+
     async def stop(self) -> None:
         # Graceful shutdown: cancel task then wait for cleanup
         # suppress CancelledError since cancellation is intentional
@@ -164,92 +857,82 @@ class KafkaEventBus(EventBus):
         if self._producer:
             await self._producer.stop()
             self._producer = None
-        self._subscriber_queues.clear()
+        self._rooms.close()
 
-    async def publish(self, message: ChatMessage) -> None:
+    async def enqueue(self, message: ChatMessage) -> asyncio.Future[Any]:
         if not self._producer:
             raise RuntimeError("KafkaEventBus not started")
-        payload = message.model_dump(mode="json")
-        await self._producer.send_and_wait(
+        # send() only appends to the producer's batch accumulator; the
+        # broker round trip happens in the background per linger window.
+        # Keying by room keeps each room ordered on a single partition.
+        delivery = await self._producer.send(
             self._settings.topic,
-            json.dumps(payload).encode("utf-8"),
+            encode_message(message, self._codec),
+            key=message.room.encode("utf-8"),
         )
+        delivery.add_done_callback(log_delivery_failure)
         logger.debug(
-            "KafkaEventBus published message id=%s persona=%s",
+            "KafkaEventBus enqueued message id=%s persona=%s",
             message.id,
             message.persona,
         )
+        return delivery
 
-    async def subscribe(self) -> AsyncGenerator[ChatMessage, None]:
-        queue: asyncio.Queue[ChatMessage] = asyncio.Queue(
-            maxsize=self._subscriber_queue_size
-        )
-        async with self._lock:
-            self._subscriber_queues.add(queue)
-        try:
-            while True:
-                yield await queue.get()
-        finally:
-            async with self._lock:
-                self._subscriber_queues.discard(queue)
+    async def subscribe(
+        self, room: str = DEFAULT_ROOM
+    ) -> AsyncGenerator[MessageRecord, None]:
+        async for message in self._rooms.stream(room):
+            yield message
         logger.debug("Subscriber removed from Kafka fan-out queue")
 
-    async def get_recent(self) -> list[ChatMessage]:
-        return list(self._history)
+    async def get_recent(
+        self, room: str = DEFAULT_ROOM
+    ) -> list[MessageRecord]:
+        return self._rooms.history(room)
+
+    async def get_history(
+        self,
+        room: str = DEFAULT_ROOM,
+        before: int | None = None,
+        limit: int = 50,
+    ) -> list[MessageRecord]:
+        return self._rooms.page(room, before, limit)
+
+    def open_subscription(
+        self, room: str = DEFAULT_ROOM, since: int | None = None
+    ) -> Subscription:
+        return self._rooms.open(room, since)
+
+    def stats(self) -> dict[str, Any]:
+        # False while the rings may still miss the topic's recent tail
+        return {
+            **self._rooms.stats(),
+            "warmup_complete": self._warmup_complete,
+        }
 
     async def _consume_loop(self) -> None:
         assert self._consumer is not None
-        async for record in self._consumer:
-            try:
-                payload = json.loads(record.value.decode("utf-8"))
-                message = ChatMessage.model_validate(payload)
-            except ValueError as exc:
-                # Catch both JSON decode errors and Pydantic validation errors
-                # Log and skip malformed messages instead of crashing consumer
-                logger.exception("Failed to decode chat message", exc_info=exc)
-                continue
-            self._history.append(message)
-            await self._fan_out(message)
-            logger.debug(
-                "KafkaEventBus consumed message id=%s persona=%s",
-                message.id,
-                message.persona,
+        while True:
+            batches = await self._consumer.getmany(
+                timeout_ms=self._settings.consume_timeout_ms,
+                max_records=self._settings.consume_max_records,
             )
-
-    async def _fan_out(self, message: ChatMessage) -> None:
-        # Copy queue list under lock to avoid race conditions
-        # Release lock quickly to prevent blocking other operations
-        async with self._lock:
-            queues = list(self._subscriber_queues)
-        dead: list[asyncio.Queue[ChatMessage]] = []
-        for queue in queues:
-            try:
-                queue.put_nowait(message)
-            except asyncio.QueueFull:
-                dead.append(queue)
-        if dead:
-            # Re-acquire lock for cleanup to ensure thread safety
-            # Check membership before removal (queue might already be gone)
-            async with self._lock:
-                for queue in dead:
-                    if queue in self._subscriber_queues:
-                        self._subscriber_queues.remove(queue)
-            logger.debug("Removed %d back-pressured queues", len(dead))
+            events = decode_events(batches)
+            if events:
+                self._rooms.deliver_many(events)
+                logger.debug("KafkaEventBus consumed %d events", len(events))
 
     async def _ensure_topic(self) -> None:
-        """Create the Kafka topic when it does not already exist."""
+        """Create the chat and deltas topics when they do not exist yet."""
 
         admin = AIOKafkaAdminClient(bootstrap_servers=self._settings.brokers)
-        topic = NewTopic(
-            name=self._settings.topic,
-            num_partitions=1,
-            replication_factor=1,
-        )
         try:
-            await admin.create_topics([topic])
-            logger.info("Created Kafka topic '%s'", self._settings.topic)
-        except TopicAlreadyExistsError:
-            logger.debug("Kafka topic '%s' already exists", self._settings.topic)
+            for topic in build_topics(self._settings):
+                try:
+                    await admin.create_topics([topic])
+                    logger.info("Created Kafka topic '%s'", topic.name)
+                except TopicAlreadyExistsError:
+                    logger.debug("Kafka topic '%s' already exists", topic.name)
         except IncompatibleBrokerVersion as exc:
             logger.warning(
                 "Kafka broker lacks create-topics API; " "relying on auto-create: %s",
@@ -262,20 +945,238 @@ class KafkaEventBus(EventBus):
             await admin.close()
 
 
+class _WarmUpResume(ConsumerRebalanceListener):
+    """Rebalance hook handing assigned partitions to a resume callback."""
+
+    def __init__(
+        self, resume: Callable[[Iterable[TopicPartition]], None]
+    ) -> None:
+        self._resume = resume
+
+    async def on_partitions_revoked(self, revoked) -> None:
+        pass
+
+    async def on_partitions_assigned(self, assigned) -> None:
+        self._resume(assigned)
+
+
+class LocalEventBus(EventBus):
+    """Event bus shared by the processes of one machine over a Unix socket.
+
+    Lets uvicorn run with ``--workers N`` next to persona workers without
+    Kafka: one process hosts the broker (see ``local_bus``) and each keeps
+    its own history rings and subscriber queues fed from it.
+    """
+
+    def __init__(
+        self,
+        settings: LocalBusSettings,
+        history_limit: int,
+        subscriber_queue_size: int | None,
+        message_log: MessageLog | None = None,
+        slow_subscriber_policy: SlowSubscriberPolicy = (
+            SlowSubscriberPolicy.COALESCE
+        ),
+        codec: CodecBackend = CodecBackend.JSON,
+    ) -> None:
+        queue_size = subscriber_queue_size or history_limit or 1
+        self._rooms = RoomFanOut(
+            history_limit, queue_size, message_log, slow_subscriber_policy
+        )
+        self._client = LocalBusClient(
+            settings,
+            history_limit,
+            self._rooms.deliver,
+            codec,
+            on_delta=self._rooms.deliver_delta,
+        )
+
+    async def start(self) -> None:
+        await self._client.start()
+
+    async def stop(self) -> None:
+        await self._client.stop()
+        self._rooms.close()
+
+    async def enqueue(self, message: ChatMessage) -> asyncio.Future[Any]:
+        delivery = await self._client.publish(message)
+        delivery.add_done_callback(log_delivery_failure)
+        return delivery
+
+    async def subscribe(
+        self, room: str = DEFAULT_ROOM
+    ) -> AsyncGenerator[MessageRecord, None]:
+        async for message in self._rooms.stream(room):
+            yield message
+
+    async def get_recent(
+        self, room: str = DEFAULT_ROOM
+    ) -> list[MessageRecord]:
+        return self._rooms.history(room)
+
+    async def get_history(
+        self,
+        room: str = DEFAULT_ROOM,
+        before: int | None = None,
+        limit: int = 50,
+    ) -> list[MessageRecord]:
+        return self._rooms.page(room, before, limit)
+
+    def open_subscription(
+        self, room: str = DEFAULT_ROOM, since: int | None = None
+    ) -> Subscription:
+        return self._rooms.open(room, since)
+
+    def stats(self) -> dict[str, Any]:
+        return self._rooms.stats()
+
+
+def _decode_record(record: ConsumerRecord) -> ChatMessage | ReplyDelta | None:
+    """Decode a Kafka record into a sequenced chat message, or skip it."""
+    try:
+        if record.headers and DELTA_HEADER in record.headers:
+            return decode_delta(record.value)
+        message = decode_message(record.value)
+    except ValueError as exc:
+        # Catch both JSON decode errors and Pydantic validation errors
+        # Log and skip malformed messages instead of crashing consumer
+        logger.exception("Failed to decode chat message", exc_info=exc)
+        return None
+    # Offsets are monotonic per partition and each room is keyed onto one
+    # partition, so they double as per-room sequence numbers that agree
+    # across every web replica
+    message.seq = record.offset
+    return message
+
+
+def decode_batches(
+    batches: dict[TopicPartition, list[ConsumerRecord]],
+) -> list[ChatMessage]:
+    """Decode one getmany() result into sequenced messages, in one pass.
+
+    Reply deltas are skipped without being decoded.
+    """
+    return [
+        message
+        for records in batches.values()
+        for record in records
+        if not (record.headers and DELTA_HEADER in record.headers)
+        and (message := _decode_record(record)) is not None
+    ]
+
+
+def decode_events(
+    batches: dict[TopicPartition, list[ConsumerRecord]],
+) -> list[ChatMessage | ReplyDelta]:
+    """Like ``decode_batches``, keeping reply deltas in their place."""
+    return [
+        event
+        for records in batches.values()
+        for record in records
+        if (event := _decode_record(record)) is not None
+    ]
+
+
+def build_topics(settings: KafkaBusSettings) -> list[NewTopic]:
+    """The chat topic and the deltas topic beside it, as created on start."""
+    return [
+        NewTopic(
+            name=settings.topic,
+            num_partitions=settings.partitions,
+            replication_factor=settings.replication_factor,
+        ),
+        NewTopic(
+            name=settings.deltas_topic,
+            num_partitions=settings.partitions,
+            replication_factor=settings.replication_factor,
+            # Deltas are only useful while the reply is being written
+            topic_configs={"retention.ms": "60000"},
+        ),
+    ]
+
+
+def build_producer(settings: KafkaBusSettings) -> AIOKafkaProducer:
+    """Create a batching Kafka producer from the bus settings."""
+
+    return AIOKafkaProducer(
+        bootstrap_servers=settings.brokers,
+        linger_ms=settings.linger_ms,
+        max_batch_size=settings.max_batch_size,
+        compression_type=settings.compression_type,
+        acks=settings.acks,
+    )
+
+
+def log_delivery_failure(delivery: asyncio.Future) -> None:
+    """Surface broker failures for sends nobody is awaiting."""
+
+    if delivery.cancelled():
+        return
+    exc = delivery.exception()
+    if exc is not None:
+        logger.error("Message delivery failed: %s", exc)
+
+
+def build_message_log(settings: HistoryLogSettings) -> MessageLog | None:
+    """Open the on-disk history log when it is enabled."""
+
+    if not settings.enabled:
+        return None
+    logger.info("Persisting room history under %s", settings.directory)
+    return MessageLog(
+        settings.directory,
+        segment_bytes=settings.segment_bytes,
+        index_interval=settings.index_interval,
+        retention_bytes=settings.retention_bytes,
+        retention_seconds=settings.retention_seconds,
+    )
+
+
 async def build_event_bus(settings: MessageBusSettings) -> EventBus:
     """Create the configured event bus, with Kafka or in-memory fallback."""
 
-    queue_capacity = max(1, settings.history_limit)
+    queue_capacity = max(
+        1, settings.subscriber_queue_size or settings.history_limit
+    )
+    message_log = build_message_log(settings.history_log)
 
     if settings.backend == BusBackend.IN_MEMORY:
         bus = InMemoryEventBus(
             history_limit=settings.history_limit,
             subscriber_queue_size=queue_capacity,
+            message_log=message_log,
+            slow_subscriber_policy=settings.slow_subscriber_policy,
         )
         await bus.start()
         logger.info("Using in-memory event bus")
         return bus
 
+    if settings.backend == BusBackend.LOCAL:
+        bus = LocalEventBus(
+            settings.local,
+            history_limit=settings.history_limit,
+            subscriber_queue_size=queue_capacity,
+            message_log=message_log,
+            slow_subscriber_policy=settings.slow_subscriber_policy,
+            codec=settings.codec,
+        )
+        try:
+            await bus.start()
+            logger.info("Using local bus at %s", settings.local.socket_path)
+            return bus
+        except OSError as exc:
+            logger.warning(
+                "Local bus unavailable (%s); using in-memory bus", exc
+            )
+            fallback = InMemoryEventBus(
+                history_limit=settings.history_limit,
+                subscriber_queue_size=queue_capacity,
+                message_log=message_log,
+                slow_subscriber_policy=settings.slow_subscriber_policy,
+            )
+            await fallback.start()
+            return fallback
+
     if settings.backend == BusBackend.KAFKA:
         kafka_settings = settings.kafka
         if not kafka_settings.brokers:
@@ -285,6 +1186,8 @@ async def build_event_bus(settings: MessageBusSettings) -> EventBus:
             fallback = InMemoryEventBus(
                 history_limit=settings.history_limit,
                 subscriber_queue_size=queue_capacity,
+                message_log=message_log,
+                slow_subscriber_policy=settings.slow_subscriber_policy,
             )
             await fallback.start()
             return fallback
@@ -294,6 +1197,9 @@ async def build_event_bus(settings: MessageBusSettings) -> EventBus:
             namespace=settings.namespace,
             history_limit=settings.history_limit,
             subscriber_queue_size=queue_capacity,
+            message_log=message_log,
+            slow_subscriber_policy=settings.slow_subscriber_policy,
+            codec=settings.codec,
         )
         try:
             await bus.start()
@@ -307,6 +1213,8 @@ async def build_event_bus(settings: MessageBusSettings) -> EventBus:
             fallback = InMemoryEventBus(
                 history_limit=settings.history_limit,
                 subscriber_queue_size=queue_capacity,
+                message_log=message_log,
+                slow_subscriber_policy=settings.slow_subscriber_policy,
             )
             await fallback.start()
             return fallback
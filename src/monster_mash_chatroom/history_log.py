@@ -0,0 +1,300 @@
+"""Append-only on-disk message log backing paginated room history."""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import mmap
+import os
+import struct
+import time
+from collections import deque
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO
+
+from .models import MessageRecord
+
+logger = logging.getLogger(__name__)
+
+# Record header: payload length, sequence number, created_at in epoch ms
+_RECORD = struct.Struct(">Iqq")
+# Sparse index entry: sequence number, created_at in epoch ms, file offset
+_INDEX = struct.Struct(">qqQ")
+
+
+@dataclass(slots=True)
+class _Segment:
+    """One log file plus the sparse index pointing into it."""
+
+    base_seq: int
+    log_path: Path
+    index_path: Path
+    size: int = 0
+    records: int = 0
+    last_seq: int | None = None
+    # Parallel lists so lookups can bisect on seq without building tuples
+    index_seqs: list[int] = field(default_factory=list)
+    index_timestamps: list[int] = field(default_factory=list)
+    index_offsets: list[int] = field(default_factory=list)
+
+
+class MessageLog:
+    """Segmented append-only log of chat messages, one directory per room.
+
+    Each room directory holds ``<base_seq>.log`` segments with a sparse
+    ``.index`` next to them mapping every ``index_interval``-th record's
+    sequence number and timestamp to its byte offset. Reads mmap the
+    segment and decode only the records of the requested page, so paging
+    deep into history never loads a whole segment. Segments roll once they
+    reach ``segment_bytes``; the oldest ones are deleted when a room
+    exceeds ``retention_bytes`` or a segment's last write is older than
+    ``retention_seconds``.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        segment_bytes: int = 8 * 1024 * 1024,
+        index_interval: int = 64,
+        retention_bytes: int = 256 * 1024 * 1024,
+        retention_seconds: float = 7 * 24 * 3600,
+    ) -> None:
+        self._directory = Path(directory)
+        self._segment_bytes = max(1024, segment_bytes)
+        self._index_interval = max(1, index_interval)
+        self._retention_bytes = retention_bytes
+        self._retention_seconds = retention_seconds
+        self._segments: dict[str, list[_Segment]] = {}
+        # Append handles for each room's active segment (log, index)
+        self._writers: dict[str, tuple[BinaryIO, BinaryIO]] = {}
+        self._directory.mkdir(parents=True, exist_ok=True)
+        for room_dir in sorted(self._directory.iterdir()):
+            if room_dir.is_dir():
+                self._segments[room_dir.name] = self._load_room(room_dir)
+
+    def rooms(self) -> list[str]:
+        """Rooms with at least one stored segment."""
+        return [room for room, segments in self._segments.items() if segments]
+
+    def last_seq(self, room: str) -> int | None:
+        """Return the newest sequence number stored for a room."""
+        segments = self._segments.get(room)
+        if not segments:
+            return None
+        return segments[-1].last_seq
+
+    def append(self, message: MessageRecord) -> None:
+        """Append a sequenced message; replays of stored seqs are skipped."""
+        self.append_many([message])
+
+    def append_many(self, messages: Sequence[MessageRecord]) -> None:
+        """Append sequenced messages, flushing once at the end of the batch."""
+        rooms: set[str] = set()
+        for message in messages:
+            if message.seq is None:
+                raise ValueError("Only sequenced messages can be logged")
+            last = self.last_seq(message.room)
+            if last is not None and message.seq <= last:
+                continue
+            self._write(message)
+            rooms.add(message.room)
+        # Flush so mmap readers see the records; fsync is left to the OS
+        for room in rooms:
+            for handle in self._writers[room]:
+                handle.flush()
+
+    def read_before(
+        self, room: str, before: int | None, limit: int
+    ) -> list[MessageRecord]:
+        """Up to ``limit`` messages with seq below ``before``, oldest first."""
+        segments = self._segments.get(room, [])
+        page: deque[MessageRecord] = deque()
+        for segment in reversed(segments):
+            if len(page) >= limit:
+                break
+            if before is not None and segment.base_seq >= before:
+                continue
+            upper = page[0].seq if page else before
+            older = self._read_segment(segment, upper, limit - len(page))
+            page.extendleft(reversed(older))
+        return list(page)
+
+    def close(self) -> None:
+        """Close the append handles of every active segment."""
+        for log_file, index_file in self._writers.values():
+            log_file.close()
+            index_file.close()
+        self._writers.clear()
+
+    def enforce_retention(self, room: str) -> None:
+        """Drop the oldest closed segments past the size or age budget."""
+        segments = self._segments.get(room, [])
+        now = time.time()
+        while len(segments) > 1:
+            oldest = segments[0]
+            total = sum(segment.size for segment in segments)
+            too_big = 0 < self._retention_bytes < total
+            age = now - oldest.log_path.stat().st_mtime
+            too_old = 0 < self._retention_seconds < age
+            if not (too_big or too_old):
+                break
+            segments.pop(0)
+            oldest.log_path.unlink(missing_ok=True)
+            oldest.index_path.unlink(missing_ok=True)
+            logger.info(
+                "Dropped history segment room=%s base_seq=%d",
+                room,
+                oldest.base_seq,
+            )
+
+    def _active_segment(self, room: str, seq: int) -> _Segment:
+        segments = self._segments.setdefault(room, [])
+        if segments and segments[-1].size < self._segment_bytes:
+            return segments[-1]
+        room_dir = self._directory / room
+        room_dir.mkdir(parents=True, exist_ok=True)
+        # Zero-padded names keep segments in seq order when listed
+        stem = f"{seq:020d}"
+        segment = _Segment(
+            base_seq=seq,
+            log_path=room_dir / f"{stem}.log",
+            index_path=room_dir / f"{stem}.index",
+        )
+        segments.append(segment)
+        writers = self._writers.pop(room, None)
+        if writers is not None:
+            for handle in writers:
+                handle.close()
+        self.enforce_retention(room)
+        return segment
+
+    def _write(self, message: MessageRecord) -> None:
+        segment = self._active_segment(message.room, message.seq)
+        log_file, index_file = self._writer(message.room, segment)
+        payload = message.json_frame.encode("utf-8")
+        timestamp = int(message.created_at.timestamp() * 1000)
+        if segment.records % self._index_interval == 0:
+            index_file.write(_INDEX.pack(message.seq, timestamp, segment.size))
+            segment.index_seqs.append(message.seq)
+            segment.index_timestamps.append(timestamp)
+            segment.index_offsets.append(segment.size)
+        log_file.write(
+            _RECORD.pack(len(payload), message.seq, timestamp) + payload
+        )
+        segment.size += _RECORD.size + len(payload)
+        segment.records += 1
+        segment.last_seq = message.seq
+
+    def _writer(
+        self, room: str, segment: _Segment
+    ) -> tuple[BinaryIO, BinaryIO]:
+        writers = self._writers.get(room)
+        if writers is None:
+            writers = (
+                segment.log_path.open("ab"),
+                segment.index_path.open("ab"),
+            )
+            self._writers[room] = writers
+        return writers
+
+    def _read_segment(
+        self, segment: _Segment, before: int | None, limit: int
+    ) -> list[MessageRecord]:
+        """Decode the last ``limit`` records below ``before`` in a segment."""
+        if segment.size == 0 or limit <= 0:
+            return []
+        # Start enough sparse-index entries back to cover ``limit`` records
+        if before is None:
+            slot = len(segment.index_seqs)
+        else:
+            slot = bisect.bisect_left(segment.index_seqs, before)
+        entries_back = (
+            limit + self._index_interval - 1
+        ) // self._index_interval
+        slot = max(0, slot - 1 - entries_back)
+        offset = segment.index_offsets[slot] if segment.index_offsets else 0
+        # Walk headers only, then decode just the records on the page
+        spans: deque[tuple[int, int]] = deque(maxlen=limit)
+        with segment.log_path.open("rb") as log_file, mmap.mmap(
+            log_file.fileno(), segment.size, access=mmap.ACCESS_READ
+        ) as view:
+            while offset + _RECORD.size <= segment.size:
+                length, seq, _ = _RECORD.unpack_from(view, offset)
+                if before is not None and seq >= before:
+                    break
+                start = offset + _RECORD.size
+                spans.append((start, start + length))
+                offset = start + length
+            return [
+                MessageRecord.from_json(view[start:end])
+                for start, end in spans
+            ]
+
+    def _load_room(self, room_dir: Path) -> list[_Segment]:
+        segments: list[_Segment] = []
+        for log_path in sorted(room_dir.glob("*.log")):
+            segment = _Segment(
+                base_seq=int(log_path.stem),
+                log_path=log_path,
+                index_path=log_path.with_suffix(".index"),
+            )
+            if segment.index_path.exists():
+                raw = segment.index_path.read_bytes()
+                usable = len(raw) - len(raw) % _INDEX.size
+                for seq, timestamp, offset in _INDEX.iter_unpack(raw[:usable]):
+                    segment.index_seqs.append(seq)
+                    segment.index_timestamps.append(timestamp)
+                    segment.index_offsets.append(offset)
+            self._recover_tail(segment)
+            segments.append(segment)
+        self.enforce_retention(room_dir.name)
+        return segments
+
+    def _recover_tail(self, segment: _Segment) -> None:
+        """Find the segment's last record and cut off a torn trailing write."""
+        file_size = segment.log_path.stat().st_size
+        offset = segment.index_offsets[-1] if segment.index_offsets else 0
+        records = max(len(segment.index_offsets) - 1, 0) * self._index_interval
+        if file_size:
+            with segment.log_path.open("rb") as log_file, mmap.mmap(
+                log_file.fileno(), file_size, access=mmap.ACCESS_READ
+            ) as view:
+                while offset + _RECORD.size <= file_size:
+                    length, seq, _ = _RECORD.unpack_from(view, offset)
+                    end = offset + _RECORD.size + length
+                    if end > file_size:
+                        break
+                    segment.last_seq = seq
+                    records += 1
+                    offset = end
+        if offset != file_size:
+            logger.warning(
+                "Truncating torn history record in %s at byte %d",
+                segment.log_path,
+                offset,
+            )
+            os.truncate(segment.log_path, offset)
+        # An index entry is written just before its record, so entries at or
+        # past the recovered end point at records that never made it
+        stale = False
+        while segment.index_offsets and segment.index_offsets[-1] >= offset:
+            segment.index_seqs.pop()
+            segment.index_timestamps.pop()
+            segment.index_offsets.pop()
+            stale = True
+        if stale:
+            segment.index_path.write_bytes(
+                b"".join(
+                    _INDEX.pack(*entry)
+                    for entry in zip(
+                        segment.index_seqs,
+                        segment.index_timestamps,
+                        segment.index_offsets,
+                        strict=True,
+                    )
+                )
+            )
+        segment.size = offset
+        segment.records = records
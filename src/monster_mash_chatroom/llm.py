@@ -2,12 +2,33 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import hashlib
+import heapq
+import itertools
+import json
 import logging
 import random
-from collections.abc import Iterable
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+from enum import Enum, IntEnum
+from pathlib import Path
+from typing import Any
 
-from .config import ModelRouting, Settings, get_settings
-from .models import AuthorKind, ChatMessage
+from .config import (
+    CircuitBreakerSettings,
+    ModelLimits,
+    Settings,
+    get_settings,
+)
+from .models import AuthorKind, ChatMessage, MessageRecord
 from .personas import MonsterPersona
 
 logger = logging.getLogger(__name__)
@@ -31,24 +52,447 @@ else:  # pragma: no cover - executed when LiteLLM is available
     )
 
 
+class ResponseCache:
+    """LRU cache of LLM replies keyed by model and normalized prompt.
+
+    Entries expire ``ttl_seconds`` after they were stored. With a ``path``
+    every reply is also written to a SQLite file, so the cache survives
+    restarts: memory misses fall through to the file and warm the LRU.
+    The file is trimmed to the same entry budget, oldest first.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        path: str | Path | None = None,
+    ) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        # key -> (stored_at epoch seconds, reply), least recently used first
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._counters = dict.fromkeys(
+            ("hits", "misses", "disk_hits", "expired", "evictions"), 0
+        )
+        self._db: sqlite3.Connection | None = None
+        # Disk reads and writes run in worker threads
+        self._db_lock = threading.Lock()
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(
+                path, check_same_thread=False, isolation_level=None
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS replies ("
+                "key TEXT PRIMARY KEY, reply TEXT NOT NULL, "
+                "stored_at REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def key(model: str, messages: list[dict[str, str]]) -> str:
+        """Hash of the model and the prompt, ignoring whitespace changes."""
+        normalized = [
+            (message["role"], " ".join(message["content"].split()))
+            for message in messages
+        ]
+        payload = json.dumps([model, normalized], separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> str | None:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, reply = entry
+            if now - stored_at < self._ttl:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return reply
+            del self._entries[key]
+            self._counters["expired"] += 1
+        if self._db is not None:
+            row = await asyncio.to_thread(self._load, key, now - self._ttl)
+            if row is not None:
+                stored_at, reply = row
+                self._remember(key, stored_at, reply)
+                self._counters["hits"] += 1
+                self._counters["disk_hits"] += 1
+                return reply
+        self._counters["misses"] += 1
+        return None
+
+    async def put(self, key: str, reply: str) -> None:
+        stored_at = time.time()
+        self._remember(key, stored_at, reply)
+        if self._db is not None:
+            await asyncio.to_thread(self._store, key, reply, stored_at)
+
+    def stats(self) -> dict[str, int]:
+        return {**self._counters, "entries": len(self._entries)}
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def _remember(self, key: str, stored_at: float, reply: str) -> None:
+        self._entries[key] = (stored_at, reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _load(self, key: str, fresh_after: float) -> tuple[float, str] | None:
+        assert self._db is not None
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT stored_at, reply FROM replies "
+                "WHERE key = ? AND stored_at > ?",
+                (key, fresh_after),
+            ).fetchone()
+
+    def _store(self, key: str, reply: str, stored_at: float) -> None:
+        assert self._db is not None
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO replies VALUES (?, ?, ?)",
+                (key, reply, stored_at),
+            )
+            self._db.execute(
+                "DELETE FROM replies WHERE stored_at <= ? OR key IN ("
+                "SELECT key FROM replies ORDER BY stored_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (stored_at - self._ttl, self._max_entries),
+            )
+
+
+_response_caches: dict[tuple[int, float, str | None], ResponseCache] = {}
+
+
+def response_cache(settings: Settings) -> ResponseCache | None:
+    """Process-wide reply cache for these settings (None when disabled)."""
+    config = settings.llm_cache
+    if not config.enabled:
+        return None
+    key = (config.max_entries, config.ttl_seconds, config.path)
+    cache = _response_caches.get(key)
+    if cache is None:
+        cache = _response_caches[key] = ResponseCache(*key)
+    return cache
+
+
+class Priority(IntEnum):
+    """Queue order for model requests; lower goes first."""
+
+    # Replies to people keep the room feeling alive
+    HUMAN = 0
+    # Monsters answering monsters can wait out a busy spell
+    MONSTER = 1
+
+
+def _priority(history: list[MessageRecord]) -> Priority:
+    if history and history[-1].role == AuthorKind.HUMAN:
+        return Priority.HUMAN
+    return Priority.MONSTER
+
+
+class ModelLimiter:
+    """Token bucket and concurrency cap for one model, granted by priority.
+
+    A request starts when a bucket token and a concurrency slot are both
+    free; otherwise it queues behind every waiting request of a higher
+    priority and, within one priority, behind those that came first. How
+    long requests waited is recorded per priority.
+    """
+
+    def __init__(self, limits: ModelLimits) -> None:
+        rpm = limits.requests_per_minute
+        self._rate = rpm / 60 if rpm is not None else None
+        self._capacity = float(limits.burst)
+        self._tokens = self._capacity
+        self._refilled = time.monotonic()
+        self._max_concurrent = limits.max_concurrent
+        self._active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._arrivals = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._waits = {
+            priority: dict.fromkeys(
+                ("requests", "queued", "wait_ms_total", "wait_ms_max"), 0.0
+            )
+            for priority in Priority
+        }
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Priority) -> AsyncIterator[None]:
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._grant()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "active": self._active,
+            "waiting": sum(
+                not future.done() for _, _, future in self._waiters
+            ),
+            **{
+                priority.name.lower(): {
+                    name: round(value) for name, value in counters.items()
+                }
+                for priority, counters in self._waits.items()
+            },
+        }
+
+    async def _acquire(self, priority: Priority) -> None:
+        started = time.monotonic()
+        counters = self._waits[priority]
+        counters["requests"] += 1
+        if not self._waiters and self._try_take():
+            return
+        counters["queued"] += 1
+        future: asyncio.Future[None] = (
+            asyncio.get_running_loop().create_future()
+        )
+        heapq.heappush(self._waiters, (priority, next(self._arrivals), future))
+        self._grant()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the request was dropped: pass the slot on
+                self._active -= 1
+                self._grant()
+            raise
+        waited = (time.monotonic() - started) * 1000
+        counters["wait_ms_total"] += waited
+        counters["wait_ms_max"] = max(counters["wait_ms_max"], waited)
+
+    def _try_take(self) -> bool:
+        if (
+            self._max_concurrent is not None
+            and self._active >= self._max_concurrent
+        ):
+            return False
+        if self._rate is not None:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+        self._active += 1
+        return True
+
+    def _refill(self) -> None:
+        assert self._rate is not None
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._refilled) * self._rate
+        )
+        self._refilled = now
+
+    def _grant(self) -> None:
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                # Its request was cancelled while waiting
+                heapq.heappop(self._waiters)
+                continue
+            if not self._try_take():
+                break
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+        self._schedule_refill()
+
+    def _schedule_refill(self) -> None:
+        # A finishing request grants the next one itself; only a wait for
+        # the bucket needs a timer
+        if self._timer is not None or not self._waiters or self._rate is None:
+            return
+        if (
+            self._max_concurrent is not None
+            and self._active >= self._max_concurrent
+        ):
+            return
+        self._refill()
+        delay = max((1 - self._tokens) / self._rate, 0.0)
+        self._timer = asyncio.get_running_loop().call_later(
+            delay, self._on_refill
+        )
+
+    def _on_refill(self) -> None:
+        self._timer = None
+        self._grant()
+
+
+_model_limiters: dict[str, ModelLimiter] = {}
+
+
+def model_slot(
+    settings: Settings, model: str, priority: Priority
+) -> AbstractAsyncContextManager[None]:
+    """Wait for the model's rate and concurrency limits (if it has any)."""
+    limits = settings.model_routing.limits_for(model)
+    if limits.requests_per_minute is None and limits.max_concurrent is None:
+        return contextlib.nullcontext()
+    limiter = _model_limiters.get(model)
+    if limiter is None:
+        limiter = _model_limiters[model] = ModelLimiter(limits)
+    return limiter.slot(priority)
+
+
+def limiter_stats() -> dict[str, dict[str, Any]]:
+    """Concurrency and queue-wait counters of every limited model."""
+    return {
+        model: limiter.stats() for model, limiter in _model_limiters.items()
+    }
+
+
+class CircuitOpenError(LiteLLMException):  # type: ignore[misc, valid-type]
+    """Raised instead of calling a model whose breaker is open."""
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    # Calls fail fast until the cool-down is over
+    OPEN = "open"
+    # One probe call decides whether the model is back
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """Stops calling a model that keeps failing, then probes for recovery.
+
+    ``failure_threshold`` failed calls in a row open the breaker. After
+    ``cooldown_seconds`` it turns half-open and admits a single probe: a
+    success closes it again, a failure reopens it for another cool-down.
+    Cancelled calls (a lost hedge, an expired deadline) count as neither.
+    """
+
+    def __init__(self, settings: CircuitBreakerSettings) -> None:
+        self._threshold = settings.failure_threshold
+        self._cooldown = settings.cooldown_seconds
+        self._state = BreakerState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._counters = dict.fromkeys(("opened", "short_circuited"), 0)
+
+    @property
+    def state(self) -> BreakerState:
+        if (
+            self._state == BreakerState.OPEN
+            and time.monotonic() - self._opened_at >= self._cooldown
+        ):
+            self._state = BreakerState.HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (claims the probe when half-open)."""
+        state = self.state
+        if state == BreakerState.CLOSED:
+            return True
+        if state == BreakerState.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self._counters["short_circuited"] += 1
+        return False
+
+    @contextlib.contextmanager
+    def track(self) -> Iterator[None]:
+        """Record the outcome of the call made inside the block."""
+        try:
+            yield
+        except Exception:
+            self._probing = False
+            self._failures += 1
+            if (
+                self._state == BreakerState.HALF_OPEN
+                or self._failures >= self._threshold
+            ):
+                if self._state != BreakerState.OPEN:
+                    self._counters["opened"] += 1
+                self._state = BreakerState.OPEN
+                self._opened_at = time.monotonic()
+            raise
+        except BaseException:
+            self._probing = False
+            raise
+        self._probing = False
+        self._failures = 0
+        self._state = BreakerState.CLOSED
+
+    def stats(self) -> dict[str, Any]:
+        state = self.state
+        retry_in = None
+        if state == BreakerState.OPEN:
+            retry_in = round(
+                self._cooldown - (time.monotonic() - self._opened_at), 1
+            )
+        return {
+            "state": state.value,
+            "failures": self._failures,
+            "retry_in_seconds": retry_in,
+            **self._counters,
+        }
+
+
+_model_breakers: dict[str, CircuitBreaker] = {}
+
+
+def model_breaker(settings: Settings, model: str) -> CircuitBreaker | None:
+    """The worker's breaker for ``model`` (None when breakers are disabled)."""
+    if not settings.llm_breaker.enabled:
+        return None
+    breaker = _model_breakers.get(model)
+    if breaker is None:
+        breaker = _model_breakers[model] = CircuitBreaker(settings.llm_breaker)
+    return breaker
+
+
+def breaker_stats() -> dict[str, dict[str, Any]]:
+    """State and counters of every model's circuit breaker."""
+    return {
+        model: breaker.stats() for model, breaker in _model_breakers.items()
+    }
+
+
+@contextlib.contextmanager
+def _guarded(settings: Settings, model: str) -> Iterator[None]:
+    """Fail fast while the model's breaker is open, else track the call."""
+    breaker = model_breaker(settings, model)
+    if breaker is None:
+        yield
+        return
+    if not breaker.allow():
+        raise CircuitOpenError(f"circuit open for model {model}")
+    with breaker.track():
+        yield
+
+
 async def generate_persona_reply(
     persona: MonsterPersona,
-    history: Iterable[ChatMessage],
+    history: Iterable[MessageRecord],
     settings: Settings | None = None,
 ) -> str:
     """Generate a reply from a monster persona.
 
     Fallback strategy (in order):
     1. Try the persona's configured LLM model
-    2. If that fails, try the DEFAULT_MODEL
-    3. If that fails (or demo_mode=true), use canned responses
+    2. If that fails, or has not answered within the persona's
+       ``hedge_after_seconds``, also try the DEFAULT_MODEL; the first
+       reply wins and the other request is cancelled
+    3. If both fail, the persona's ``reply_deadline_seconds`` pass first,
+       or demo_mode=true, use canned responses
 
-    This ensures the chatroom always works, even if APIs are down.
+    This ensures the chatroom always works, even if APIs are down or hang.
     """
     if settings is None:
         settings = get_settings()
     # Convert iterable to list for multiple iterations and length checks
-    history_list: list[ChatMessage] = list(history)
+    history_list: list[MessageRecord] = list(history)
     if settings.demo_mode or litellm is None:
         logger.info(
             "🎭 DEMO MODE: persona=%s (demo_mode=%s, litellm_available=%s)",
@@ -58,70 +502,138 @@ async def generate_persona_reply(
         )
         return _demo_reply(persona, history_list)
     try:
-        reply = await _llm_reply(persona, history_list, settings)
-        logger.info("🤖 LLM RESPONSE: persona=%s", persona.key)
-        return reply
+        return await asyncio.wait_for(
+            _hedged_reply(persona, history_list, settings),
+            timeout=persona.reply_deadline_seconds,
+        )
+    except asyncio.TimeoutError:
+        _reply_counters["deadline_expired"] += 1
+        logger.warning(
+            "No LLM reply for persona=%s within %.1fs. Using demo response.",
+            persona.key,
+            persona.reply_deadline_seconds,
+        )
     except LiteLLMException as exc:
-        model = settings.model_routing.for_persona(persona.key)
-        fallback_model = settings.model_routing.default_model
+        logger.warning(
+            "LLM call failed for persona=%s: %s. Using demo response.",
+            persona.key,
+            exc,
+        )
+    return _demo_reply(persona, history_list)
 
-        # Try fallback to default model if the persona-specific model failed
-        if model != fallback_model:
-            logger.warning(
-                "LLM call failed for persona=%s model=%s: %s. "
-                "Trying fallback to default model=%s",
-                persona.key,
-                model,
-                exc,
-                fallback_model,
+
+# How often a reply needed the default model as a hedge or fallback, which
+# model answered first, and how often the deadline forced a canned reply
+_reply_counters = dict.fromkeys(
+    ("hedged", "hedge_won", "fallback", "deadline_expired"), 0
+)
+
+
+def reply_stats() -> dict[str, int]:
+    """Hedging, fallback and deadline counters of replies."""
+    return dict(_reply_counters)
+
+
+async def _hedged_reply(
+    persona: MonsterPersona,
+    history: list[MessageRecord],
+    settings: Settings,
+) -> str:
+    """Ask the persona's model, racing the default model once it lags.
+
+    Raises the last ``LiteLLMException`` when every model failed.
+    """
+    model = settings.model_routing.for_persona(persona.key)
+    backups = [
+        name
+        for name in (settings.model_routing.default_model,)
+        if name != model
+    ]
+    pending: dict[asyncio.Task[str], str] = {}
+
+    def ask(model_name: str) -> None:
+        task = asyncio.create_task(
+            _llm_reply(persona, history, settings, model_name)
+        )
+        pending[task] = model_name
+
+    ask(model)
+    error: BaseException | None = None
+    try:
+        while pending:
+            hedge_after = persona.hedge_after_seconds if backups else None
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=hedge_after,
+                return_when=asyncio.FIRST_COMPLETED,
             )
-            try:
-                # Create temporary settings with fallback model
-                fallback_settings = Settings(
-                    demo_mode=False,
-                    bus=settings.bus,
-                    model_routing=ModelRouting(
-                        default_model=fallback_model,
-                        persona_model_map={},
-                    ),
-                )
-                reply = await _llm_reply(persona, history_list, fallback_settings)
-                logger.info(
-                    "✅ Fallback LLM success: persona=%s model=%s",
-                    persona.key,
-                    fallback_model,
-                )
-                return reply
-            except LiteLLMException as fallback_exc:
+            if not done:
+                _reply_counters["hedged"] += 1
                 logger.warning(
-                    "Fallback LLM also failed for persona=%s model=%s: %s. "
-                    "Using demo response.",
+                    "LLM for persona=%s model=%s is slow (>%.1fs). "
+                    "Hedging with default model=%s",
                     persona.key,
-                    fallback_model,
-                    fallback_exc,
+                    model,
+                    hedge_after,
+                    backups[0],
                 )
-        else:
-            logger.warning(
-                "LLM call failed for persona=%s model=%s: %s. "
-                "No fallback available (already using default). "
-                "Using demo response.",
-                persona.key,
-                model,
-                exc,
-            )
-
-        return _demo_reply(persona, history_list)
+                ask(backups.pop(0))
+                continue
+            for task in done:
+                model_name = pending.pop(task)
+                error = task.exception()
+                if error is None:
+                    if model_name != model:
+                        _reply_counters[
+                            "hedge_won" if pending else "fallback"
+                        ] += 1
+                        logger.info(
+                            "✅ Fallback LLM success: persona=%s model=%s",
+                            persona.key,
+                            model_name,
+                        )
+                    else:
+                        logger.info("🤖 LLM RESPONSE: persona=%s", persona.key)
+                    return task.result()
+                if not isinstance(error, LiteLLMException):
+                    raise error
+                if isinstance(error, CircuitOpenError):
+                    logger.info(
+                        "Skipping model=%s for persona=%s: circuit open",
+                        model_name,
+                        persona.key,
+                    )
+                else:
+                    logger.warning(
+                        "LLM call failed for persona=%s model=%s: %s",
+                        persona.key,
+                        model_name,
+                        error,
+                    )
+            # A failure before the hedge threshold moves on right away
+            if not pending and backups:
+                ask(backups.pop(0))
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    assert error is not None
+    raise error
 
 
-def _demo_reply(persona: MonsterPersona, history: Iterable[ChatMessage]) -> str:
+def _demo_reply(
+    persona: MonsterPersona, history: Iterable[MessageRecord]
+) -> str:
     """Generate a deterministic demo reply without calling an LLM."""
     as_list = list(history)
     latest = as_list[-1] if as_list else None
     if latest is None:
-        placeholder = ChatMessage(
-            author="Narrator",
-            role="human",
-            content="...",
+        placeholder = MessageRecord.from_message(
+            ChatMessage(
+                author="Narrator",
+                role="human",
+                content="...",
+            )
         )
         reply = persona.format_demo_reply(placeholder)
         logger.debug(
@@ -147,34 +659,544 @@ def _demo_reply(persona: MonsterPersona, history: Iterable[ChatMessage]) -> str:
     return random.choice(templates)
 
 
-async def _llm_reply(
-    persona: MonsterPersona,
-    history: Iterable[ChatMessage],
-    settings: Settings,
+def estimate_tokens(text: str) -> int:
+    """Rough token count of ``text``: about four characters per token.
+
+    Close enough for budgeting across providers, and far cheaper than
+    running a model's tokenizer on every message.
+    """
+    return len(text) // 4 + 1
+
+
+# Role and separator tokens every chat message costs on top of its text
+_MESSAGE_OVERHEAD = 4
+# A prompt over budget drops its oldest turns down to this share of it, so
+# the next replies append to an unchanged prefix that providers can cache
+_TRIM_TO = 0.6
+
+
+def backlog_depth(settings: Settings) -> int:
+    """Messages per room a worker keeps so every prompt can fill its budget.
+
+    A ``PromptBuilder`` starts over from the backlog when the room moved on
+    by more than the backlog between two replies. A backlog holding a full
+    budget of the shortest possible turns loses nothing when that happens.
+    """
+    routing = settings.model_routing
+    budget = max(
+        limits.max_prompt_tokens
+        for limits in (routing.default_limits, *routing.model_limits.values())
+    )
+    return budget // (_MESSAGE_OVERHEAD + 1)
+
+
+@dataclass(slots=True)
+class _Turn:
+    id: str
+    message: dict[str, str]
+    tokens: int
+    # "Author: text", as the turn reads in a transcript to summarize
+    line: str
+
+
+# Sentences of a summary or a chat message, for extractive summaries
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_WORD = re.compile(r"[a-z']{4,}")
+
+
+def extractive_summary(
+    previous: str | None, lines: Sequence[str], max_tokens: int
 ) -> str:
-    """Call the LLM with persona prompt and conversation history to generate a reply."""
-    if litellm is None:  # pragma: no cover - defensive guard
-        raise LiteLLMException("LiteLLM is not available")
-    model_name = settings.model_routing.for_persona(persona.key)
-    logger.info(
-        "🔮 Calling LLM: persona=%s model=%s",
-        persona.key,
-        model_name,
+    """Summarize a transcript by picking its most telling sentences.
+
+    Sentences of the previous summary and of every ``lines`` entry score by
+    how many of their words other sentences share (a sentence about what
+    the chat keeps coming back to ranks high), normalized for length. The
+    best fit ``max_tokens`` and are joined in their original order.
+    """
+    candidates: list[str] = []
+    words: list[list[str]] = []
+    if previous:
+        for sentence in _SENTENCE_END.split(previous.strip()):
+            candidates.append(sentence)
+            words.append(_WORD.findall(sentence.lower()))
+    for line in lines:
+        speaker, _, text = line.partition(": ")
+        for sentence in _SENTENCE_END.split(text.strip()):
+            if sentence:
+                candidates.append(f"{speaker}: {sentence}")
+                words.append(_WORD.findall(sentence.lower()))
+    frequency: dict[str, int] = {}
+    for found in words:
+        for word in set(found):
+            frequency[word] = frequency.get(word, 0) + 1
+    ranked = sorted(
+        range(len(candidates)),
+        key=lambda index: -sum(frequency[word] - 1 for word in words[index])
+        / max(len(words[index]), 1) ** 0.5,
     )
-    messages = [
-        {
-            "role": "system",
-            "content": persona.system_prompt,
-        }
-    ]
-    # Build conversation history for LLM context
-    for message in history:
+    chosen: list[int] = []
+    budget = max_tokens
+    for index in ranked:
+        cost = estimate_tokens(candidates[index])
+        if cost <= budget:
+            chosen.append(index)
+            budget -= cost
+    return " ".join(candidates[index] for index in sorted(chosen))
+
+
+class ConversationSummarizer:
+    """Folds a conversation's older turns into one rolling summary.
+
+    Uses ``llm_summary.model`` (by default the default model) at low
+    priority, and the extractive summary when that is set to
+    ``"extractive"``, LiteLLM is missing, or the model call fails.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        config = settings.llm_summary
+        self.after_messages = config.after_messages
+        self.keep_recent = min(config.keep_recent, config.after_messages - 1)
+        self._max_tokens = config.max_tokens
+        self._model = config.model or settings.model_routing.default_model
+        self._settings = settings
+
+    async def summarize(
+        self,
+        persona: MonsterPersona,
+        previous: str | None,
+        lines: Sequence[str],
+    ) -> str:
+        if self._model != "extractive" and litellm is not None:
+            try:
+                return await self._llm_summary(persona, previous, lines)
+            except LiteLLMException as exc:
+                logger.warning(
+                    "Summary by model=%s failed for persona=%s: %s. "
+                    "Summarizing extractively.",
+                    self._model,
+                    persona.key,
+                    exc,
+                )
+        # Keep about a third of the transcript, so the summary pays off
+        transcript = estimate_tokens(previous or "") + sum(
+            estimate_tokens(line) for line in lines
+        )
+        budget = min(self._max_tokens, max(transcript // 3, 32))
+        return extractive_summary(previous, lines, budget)
+
+    async def _llm_summary(
+        self,
+        persona: MonsterPersona,
+        previous: str | None,
+        lines: Sequence[str],
+    ) -> str:
+        transcript = "\n".join(lines)
+        if previous:
+            transcript = f"Summary so far: {previous}\n\n{transcript}"
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You keep notes on a group chat for "
+                    f"{persona.display_name}. Summarize the conversation in "
+                    f"at most {self._max_tokens * 3 // 4} words: who said "
+                    "what, open questions and running jokes. Reply with the "
+                    "summary only."
+                ),
+            },
+            {"role": "user", "content": transcript},
+        ]
+        with _guarded(self._settings, self._model):
+            # Summaries are never urgent: replies to anyone go first
+            async with model_slot(
+                self._settings, self._model, Priority.MONSTER
+            ):
+                completion = await litellm.acompletion(
+                    model=self._model,
+                    messages=messages,
+                    max_tokens=self._max_tokens,
+                )
+        return completion["choices"][0]["message"]["content"].strip()
+
+
+class PromptBuilder:
+    """A persona's prompt for one room and model, extended message by message.
+
+    Each backlog message is rendered once, when it first shows up, and
+    appended after the turns rendered before. Conversation older than the
+    backlog is kept for as long as it fits ``max_tokens``. Going over
+    drops the oldest turns in one go, well below the budget, rather than one
+    per reply, keeping the prompt's prefix stable between trims. A single
+    message longer than half the budget is cut short.
+
+    With a ``summarizer``, a prompt past ``after_messages`` turns has its
+    older turns summarized in the background. They stay in the prompt
+    verbatim until the summary is ready, which then takes their place right
+    after the persona prompt.
+    """
+
+    def __init__(
+        self,
+        persona: MonsterPersona,
+        max_tokens: int,
+        summarizer: ConversationSummarizer | None = None,
+    ) -> None:
+        self._persona = persona
+        self._system = {"role": "system", "content": persona.system_prompt}
+        self._system_tokens = (
+            estimate_tokens(persona.system_prompt) + _MESSAGE_OVERHEAD
+        )
+        # What the conversation itself may use, never less than a message
+        self._budget = max(max_tokens - self._system_tokens, 64)
+        self._turns: deque[_Turn] = deque()
+        self._tokens = 0
+        self._summarizer = summarizer
+        self._summary: dict[str, str] | None = None
+        self._summarizing: asyncio.Task[None] | None = None
+
+    @property
+    def tokens(self) -> int:
+        return self._system_tokens + self._tokens
+
+    @property
+    def summary(self) -> str | None:
+        return self._summary["content"] if self._summary else None
+
+    def messages(
+        self, history: Sequence[MessageRecord]
+    ) -> list[dict[str, str]]:
+        """The prompt for a reply to the backlog ``history`` ends with."""
+        new = self._unseen(history)
+        _prompt_counters["reused"] += len(history) - len(new)
+        for message in new:
+            self._append(message)
+        if self._tokens > self._budget:
+            self._trim()
+        if (
+            self._summarizer is not None
+            and self._summarizing is None
+            and len(self._turns) > self._summarizer.after_messages
+        ):
+            older = list(self._turns)[: -self._summarizer.keep_recent]
+            self._summarizing = asyncio.get_running_loop().create_task(
+                self._summarize(older)
+            )
+        _prompt_counters["prompts"] += 1
+        _prompt_counters["tokens"] += self.tokens
+        head = (
+            [self._system, self._summary] if self._summary else [self._system]
+        )
+        return [*head, *(turn.message for turn in self._turns)]
+
+    def _unseen(
+        self, history: Sequence[MessageRecord]
+    ) -> Sequence[MessageRecord]:
+        if not self._turns:
+            return history
+        last = self._turns[-1].id
+        for index in range(len(history) - 1, -1, -1):
+            if history[index].id == last:
+                return history[index + 1 :]
+        # Nothing in common with what was rendered (the backlog moved on
+        # entirely): start over from this backlog
+        self._turns.clear()
+        self._tokens = self._summary_tokens()
+        return history
+
+    def _append(self, message: MessageRecord) -> None:
         role = "assistant" if message.role == AuthorKind.MONSTER else "user"
         content = message.content
+        cap = self._budget // 2
+        if estimate_tokens(content) > cap:
+            content = content[: cap * 4].rstrip() + "…"
+        line = f"{message.author}: {content}"
         # Prefix other monsters' messages so LLM can distinguish speakers
         # Without this, LLM might confuse other monsters' words with its own
-        if message.persona and message.persona != persona.key:
+        if message.persona and message.persona != self._persona.key:
             content = f"[{message.persona}] {content}"
-        messages.append({"role": role, "content": content})
-    completion = await litellm.acompletion(model=model_name, messages=messages)
-    return completion["choices"][0]["message"]["content"].strip()
+        tokens = estimate_tokens(content) + _MESSAGE_OVERHEAD
+        self._turns.append(
+            _Turn(message.id, {"role": role, "content": content}, tokens, line)
+        )
+        self._tokens += tokens
+        _prompt_counters["rendered"] += 1
+
+    def _trim(self) -> None:
+        target = self._budget * _TRIM_TO
+        # The newest turn, the one being answered, always stays
+        while len(self._turns) > 1 and self._tokens > target:
+            self._tokens -= self._turns.popleft().tokens
+            _prompt_counters["trimmed"] += 1
+
+    def _summary_tokens(self) -> int:
+        if self._summary is None:
+            return 0
+        return estimate_tokens(self._summary["content"]) + _MESSAGE_OVERHEAD
+
+    async def _summarize(self, older: list[_Turn]) -> None:
+        assert self._summarizer is not None
+        try:
+            summary = await self._summarizer.summarize(
+                self._persona, self.summary, [turn.line for turn in older]
+            )
+        except Exception:
+            logger.exception(
+                "Summary failed for persona=%s", self._persona.key
+            )
+            return
+        finally:
+            self._summarizing = None
+        # Turns trimmed for the budget meanwhile are already gone
+        folded = {turn.id for turn in older}
+        self._tokens -= self._summary_tokens()
+        while self._turns and self._turns[0].id in folded:
+            self._tokens -= self._turns.popleft().tokens
+        self._summary = {
+            "role": "system",
+            "content": f"Earlier in this conversation: {summary}",
+        }
+        self._tokens += self._summary_tokens()
+        _prompt_counters["summaries"] += 1
+        _prompt_counters["summarized"] += len(older)
+
+
+# Builders of the rooms most recently replied in, per persona and model
+_prompt_builders: OrderedDict[tuple[str, str, str], PromptBuilder] = (
+    OrderedDict()
+)
+_MAX_PROMPT_BUILDERS = 512
+# Prompts built, their estimated tokens, messages rendered, re-used from
+# earlier prompts or trimmed away for the budget, and summaries written
+# with the turns folded into them
+_prompt_counters = dict.fromkeys(
+    (
+        "prompts",
+        "tokens",
+        "rendered",
+        "reused",
+        "trimmed",
+        "summaries",
+        "summarized",
+    ),
+    0,
+)
+
+
+def prompt_stats() -> dict[str, int]:
+    """Prompt assembly counters, with the mean estimated tokens per prompt."""
+    stats = dict(_prompt_counters)
+    stats["tokens_per_prompt"] = stats["tokens"] // max(stats["prompts"], 1)
+    return stats
+
+
+def _prompt_messages(
+    persona: MonsterPersona,
+    history: Sequence[MessageRecord],
+    settings: Settings,
+    model_name: str,
+) -> list[dict[str, str]]:
+    room = history[-1].room if history else ""
+    key = (persona.key, room, model_name)
+    builder = _prompt_builders.get(key)
+    if builder is None:
+        max_tokens = settings.model_routing.limits_for(
+            model_name
+        ).max_prompt_tokens
+        summarizer = None
+        if settings.llm_summary.enabled:
+            summarizer = ConversationSummarizer(settings)
+        builder = _prompt_builders[key] = PromptBuilder(
+            persona, max_tokens, summarizer
+        )
+        if len(_prompt_builders) > _MAX_PROMPT_BUILDERS:
+            _prompt_builders.popitem(last=False)
+    else:
+        _prompt_builders.move_to_end(key)
+    return builder.messages(history)
+
+
+async def _llm_reply(
+    persona: MonsterPersona,
+    history: Iterable[MessageRecord],
+    settings: Settings,
+    model_name: str,
+) -> str:
+    """Ask one model for the persona's reply to the conversation history."""
+    if litellm is None:  # pragma: no cover - defensive guard
+        raise LiteLLMException("LiteLLM is not available")
+    history = list(history)
+    messages = _prompt_messages(persona, history, settings, model_name)
+    # Replayed messages, duplicate deliveries and scripted load tests send
+    # the very same prompt again; answer those without a network call
+    cache = response_cache(settings)
+    if cache is not None:
+        cache_key = ResponseCache.key(model_name, messages)
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            logger.info(
+                "🔮 LLM cache hit: persona=%s model=%s",
+                persona.key,
+                model_name,
+            )
+            return cached
+    with _guarded(settings, model_name):
+        logger.info(
+            "🔮 Calling LLM: persona=%s model=%s",
+            persona.key,
+            model_name,
+        )
+        async with model_slot(settings, model_name, _priority(history)):
+            completion = await litellm.acompletion(
+                model=model_name, messages=messages
+            )
+    reply = completion["choices"][0]["message"]["content"].strip()
+    if cache is not None:
+        await cache.put(cache_key, reply)
+    return reply
+
+
+async def stream_persona_reply(
+    persona: MonsterPersona,
+    history: Iterable[MessageRecord],
+    settings: Settings | None = None,
+) -> AsyncIterator[str]:
+    """Yield a persona's reply piece by piece as the model writes it.
+
+    Follows the fallback chain of ``generate_persona_reply``: a model that
+    fails before its first token hands over to the next, and the demo reply
+    comes last, or as soon as ``reply_deadline_seconds`` pass without a
+    first token. A stream that breaks off midway, or stalls that long
+    between two pieces, ends the reply there. Demo
+    replies are typed out word by word over the persona's typing delay.
+    """
+    if settings is None:
+        settings = get_settings()
+    history_list: list[MessageRecord] = list(history)
+    if settings.demo_mode or litellm is None:
+        reply = _demo_reply(persona, history_list)
+        words = reply.split(" ")
+        pause = persona.typing_delay_seconds(reply) / len(words)
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(pause)
+                word = " " + word
+            yield word
+        return
+    routing = settings.model_routing
+    models = dict.fromkeys(
+        [routing.for_persona(persona.key), routing.default_model]
+    )
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + persona.reply_deadline_seconds
+    for model_name in models:
+        stream = _llm_stream(persona, history_list, settings, model_name)
+        streamed = False
+        try:
+            try:
+                piece = await asyncio.wait_for(
+                    stream.__anext__(), timeout=max(deadline - loop.time(), 0)
+                )
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                _reply_counters["deadline_expired"] += 1
+                logger.warning(
+                    "No LLM stream for persona=%s started within %.1fs. "
+                    "Using demo response.",
+                    persona.key,
+                    persona.reply_deadline_seconds,
+                )
+                break
+            streamed = True
+            yield piece
+            while True:
+                # A stream stalling midway would hold the persona's reply
+                # and the model's slot; the deadline bounds every gap too
+                try:
+                    piece = await asyncio.wait_for(
+                        stream.__anext__(),
+                        timeout=persona.reply_deadline_seconds,
+                    )
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    _reply_counters["deadline_expired"] += 1
+                    logger.warning(
+                        "LLM stream for persona=%s model=%s stalled for "
+                        "%.1fs. Ending the reply early.",
+                        persona.key,
+                        model_name,
+                        persona.reply_deadline_seconds,
+                    )
+                    return
+                yield piece
+        except LiteLLMException as exc:
+            if streamed:
+                logger.warning(
+                    "LLM stream broke off for persona=%s model=%s: %s. "
+                    "Ending the reply early.",
+                    persona.key,
+                    model_name,
+                    exc,
+                )
+                return
+            if isinstance(exc, CircuitOpenError):
+                logger.info(
+                    "Skipping model=%s for persona=%s: circuit open",
+                    model_name,
+                    persona.key,
+                )
+                continue
+            logger.warning(
+                "LLM stream failed for persona=%s model=%s: %s",
+                persona.key,
+                model_name,
+                exc,
+            )
+        finally:
+            await stream.aclose()
+    else:
+        logger.warning(
+            "No model streamed a reply for persona=%s. Using demo response.",
+            persona.key,
+        )
+    yield _demo_reply(persona, history_list)
+
+
+async def _llm_stream(
+    persona: MonsterPersona,
+    history: Iterable[MessageRecord],
+    settings: Settings,
+    model_name: str,
+) -> AsyncIterator[str]:
+    """Stream one model's reply, served whole from the cache when possible."""
+    if litellm is None:  # pragma: no cover - defensive guard
+        raise LiteLLMException("LiteLLM is not available")
+    history = list(history)
+    messages = _prompt_messages(persona, history, settings, model_name)
+    cache = response_cache(settings)
+    if cache is not None:
+        cache_key = ResponseCache.key(model_name, messages)
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    pieces: list[str] = []
+    with _guarded(settings, model_name):
+        logger.info(
+            "🔮 Streaming LLM: persona=%s model=%s",
+            persona.key,
+            model_name,
+        )
+        async with model_slot(settings, model_name, _priority(history)):
+            stream = await litellm.acompletion(
+                model=model_name, messages=messages, stream=True
+            )
+            async for chunk in stream:
+                piece = chunk.choices[0].delta.content
+                if piece:
+                    pieces.append(piece)
+                    yield piece
+    if cache is not None:
+        await cache.put(cache_key, "".join(pieces).strip())
@@ -0,0 +1,423 @@
+"""Single-host message broker over a Unix domain socket.
+
+One process per machine wins an ``fcntl`` lock next to the socket and hosts
+the broker in its event loop; every process, the host included, connects to
+it as a client. Frames are a 4-byte big-endian length followed by a one-byte
+kind and the body. If the host dies the OS releases its lock, the other
+processes lose their connection, and whichever grabs the lock first starts
+a new broker. Clients greet every broker with the last sequence number they
+saw per room, so numbering carries on across failovers, and re-send any
+publish the old broker never echoed back. Streamed reply deltas are relayed
+as they come: never sequenced, retained, acknowledged or re-sent.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import struct
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+try:  # pragma: no cover - platform-specific import
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+from .codec import decode_delta, decode_message, encode_delta, encode_message
+from .config import CodecBackend, LocalBusSettings
+from .models import ChatMessage, ReplyDelta
+
+logger = logging.getLogger(__name__)
+
+_LENGTH = struct.Struct(">I")
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+# Frame kinds
+HELLO = b"H"  # client -> broker: {"last_seq": {room: seq}}
+PUBLISH = b"P"  # client -> broker: encoded message without a seq
+MESSAGE = b"M"  # broker -> client: sequenced encoded message
+DELTA = b"D"  # both ways: encoded reply delta, relayed unchanged
+
+
+def pack_frame(kind: bytes, body: bytes) -> bytes:
+    return _LENGTH.pack(len(body) + 1) + kind + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[bytes, bytes]:
+    """Read one frame and split it into (kind, body)."""
+    header = await reader.readexactly(_LENGTH.size)
+    (length,) = _LENGTH.unpack(header)
+    if not 0 < length <= MAX_FRAME_BYTES:
+        raise ValueError(f"Invalid local bus frame length {length}")
+    payload = await reader.readexactly(length)
+    return payload[:1], payload[1:]
+
+
+class LocalBroker:
+    """Sequences published messages and relays them to every connection.
+
+    The last ``retained_per_room`` frames of each room are replayed to new
+    connections so a restarted process can rebuild its history. Each
+    connection gets a bounded outbox; one that cannot keep up is dropped
+    and recovers through that replay when it reconnects. For the first
+    ``settle_seconds`` publishes are only held, so numbering resumes after
+    the highest seq any reconnecting process reports.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        retained_per_room: int,
+        client_queue_size: int,
+        codec: CodecBackend = CodecBackend.JSON,
+        settle_seconds: float = 0.0,
+    ) -> None:
+        self._path = Path(path)
+        self._codec = codec
+        self._settle_seconds = settle_seconds
+        # Publish bodies held until the settle window closes
+        self._held: list[bytes] | None = [] if settle_seconds > 0 else None
+        self._settle_timer: asyncio.TimerHandle | None = None
+        self._retained_per_room = max(1, retained_per_room)
+        self._client_queue_size = max(1, client_queue_size)
+        self._history: dict[str, deque[bytes]] = {}
+        self._last_seq: dict[str, int] = {}
+        self._clients: dict[asyncio.Queue[bytes], asyncio.StreamWriter] = {}
+        self._handlers: set[asyncio.Task[Any]] = set()
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> None:
+        # Only the lock holder gets here, so a leftover socket is stale
+        self._path.unlink(missing_ok=True)
+        self._server = await asyncio.start_unix_server(
+            self._serve, path=str(self._path)
+        )
+        logger.info("Local bus broker listening on %s", self._path)
+        if self._held is not None:
+            self._settle_timer = asyncio.get_running_loop().call_later(
+                self._settle_seconds, self._settle
+            )
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        if self._settle_timer is not None:
+            self._settle_timer.cancel()
+        self._server.close()
+        # Closing the transports ends each handler's read loop; cancelling
+        # the handlers instead trips asyncio's stream callback
+        for writer in list(self._clients.values()):
+            writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        with contextlib.suppress(Exception):
+            await self._server.wait_closed()
+        self._server = None
+        self._path.unlink(missing_ok=True)
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        handler = asyncio.current_task()
+        assert handler is not None
+        self._handlers.add(handler)
+        outbox: asyncio.Queue[bytes] = asyncio.Queue(
+            maxsize=self._client_queue_size
+        )
+        # Register and snapshot the replay in one step so no frame is missed
+        self._clients[outbox] = writer
+        replay = b"".join(
+            frame for frames in self._history.values() for frame in frames
+        )
+        if replay:
+            writer.write(replay)
+        sender = asyncio.create_task(self._send_loop(outbox, writer))
+        try:
+            while True:
+                kind, body = await read_frame(reader)
+                if kind == PUBLISH:
+                    self._publish(body)
+                elif kind == DELTA:
+                    self._relay_delta(pack_frame(DELTA, body))
+                elif kind == HELLO:
+                    self._greet(body)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._clients.pop(outbox, None)
+            sender.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await sender
+            writer.close()
+            self._handlers.discard(handler)
+
+    async def _send_loop(
+        self, outbox: asyncio.Queue[bytes], writer: asyncio.StreamWriter
+    ) -> None:
+        with contextlib.suppress(ConnectionError):
+            while True:
+                frames = [await outbox.get()]
+                while not outbox.empty():
+                    frames.append(outbox.get_nowait())
+                writer.write(b"".join(frames))
+                await writer.drain()
+
+    def _greet(self, body: bytes) -> None:
+        try:
+            last_seq: dict[str, Any] = json.loads(body).get("last_seq", {})
+        except ValueError:
+            logger.warning("Ignoring malformed local bus hello")
+            return
+        for room, seq in last_seq.items():
+            if isinstance(seq, int) and seq > self._last_seq.get(room, 0):
+                self._last_seq[room] = seq
+
+    def _settle(self) -> None:
+        held, self._held = self._held or [], None
+        for body in held:
+            self._publish(body)
+
+    def _publish(self, body: bytes) -> None:
+        if self._held is not None:
+            self._held.append(body)
+            return
+        try:
+            message = decode_message(body)
+        except ValueError as exc:
+            logger.warning("Dropping malformed local bus message: %s", exc)
+            return
+        room = message.room
+        message.seq = self._last_seq.get(room, 0) + 1
+        self._last_seq[room] = message.seq
+        frame = pack_frame(MESSAGE, encode_message(message, self._codec))
+        history = self._history.get(room)
+        if history is None:
+            history = deque(maxlen=self._retained_per_room)
+            self._history[room] = history
+        history.append(frame)
+        for outbox, writer in list(self._clients.items()):
+            try:
+                outbox.put_nowait(frame)
+            except asyncio.QueueFull:
+                logger.warning("Dropping local bus client that fell behind")
+                self._clients.pop(outbox, None)
+                writer.close()
+
+    def _relay_delta(self, frame: bytes) -> None:
+        # Best effort: a client too busy for a delta just misses it
+        for outbox in self._clients:
+            with contextlib.suppress(asyncio.QueueFull):
+                outbox.put_nowait(frame)
+
+
+class LocalBusClient:
+    """A process's connection to the host broker, hosting it when elected.
+
+    ``on_message`` is called with every sequenced message, in order and
+    without duplicates (by seq and by id), including the broker's replay
+    after (re)connecting.
+    ``on_delta``, when given, gets the reply deltas as they pass; without
+    it they are dropped undecoded.
+    """
+
+    def __init__(
+        self,
+        settings: LocalBusSettings,
+        retained_per_room: int,
+        on_message: Callable[[ChatMessage], None],
+        codec: CodecBackend = CodecBackend.JSON,
+        on_delta: Callable[[ReplyDelta], None] | None = None,
+    ) -> None:
+        self._settings = settings
+        self._codec = codec
+        self._on_delta = on_delta
+        self._path = Path(settings.socket_path)
+        self._lock_path = self._path.with_name(self._path.name + ".lock")
+        self._retained_per_room = retained_per_room
+        self._on_message = on_message
+        self._last_seq: dict[str, int] = {}
+        # Ids of each room's latest messages. A publish the old broker
+        # sequenced just before dying comes back from the new one under a
+        # fresh seq when its sender re-sends it
+        self._recent_ids: dict[str, OrderedDict[str, None]] = {}
+        # Published but not yet echoed: message id -> (delivery, frame)
+        self._pending: dict[str, tuple[asyncio.Future[Any], bytes]] = {}
+        self._lock_fd: int | None = None
+        self._broker: LocalBroker | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._connected = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._broker is not None
+
+    async def start(self) -> None:
+        """Connect (electing and hosting a broker if needed) or raise."""
+        if fcntl is None:
+            raise OSError("The local bus backend needs fcntl (Unix only)")
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(
+                self._connected.wait(), timeout=self._settings.connect_timeout
+            )
+        except asyncio.TimeoutError as exc:
+            await self.stop()
+            raise ConnectionError(
+                f"No local bus broker reachable at {self._path}"
+            ) from exc
+
+    async def stop(self) -> None:
+        self._fail_pending()
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._broker is not None:
+            await self._broker.stop()
+            self._broker = None
+        if self._lock_fd is not None:
+            # Closing the descriptor releases the lock for the next leader
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def publish(self, message: ChatMessage) -> asyncio.Future[Any]:
+        """Send a message; the future resolves when the broker echoes it."""
+        if not self._connected.is_set():
+            # Ride out a failover instead of failing the request outright
+            await asyncio.wait_for(
+                self._connected.wait(), timeout=self._settings.connect_timeout
+            )
+        assert self._writer is not None
+        delivery: asyncio.Future[Any] = (
+            asyncio.get_running_loop().create_future()
+        )
+        frame = pack_frame(PUBLISH, encode_message(message, self._codec))
+        self._pending[message.id] = (delivery, frame)
+        self._writer.write(frame)
+        with contextlib.suppress(ConnectionError):
+            # A dead broker is handled by the reconnect, which resends
+            await self._writer.drain()
+        return delivery
+
+    async def publish_delta(self, delta: ReplyDelta) -> None:
+        """Relay a reply delta; lost if the broker is down at the time."""
+        if self._writer is None:
+            return
+        self._writer.write(pack_frame(DELTA, encode_delta(delta, self._codec)))
+        with contextlib.suppress(ConnectionError):
+            await self._writer.drain()
+
+    async def _run(self) -> None:
+        backoff = 0.05
+        while True:
+            if self._broker is None and self._try_lead():
+                broker = LocalBroker(
+                    self._path,
+                    self._retained_per_room,
+                    self._settings.client_queue_size,
+                    self._codec,
+                    self._settings.failover_settle_seconds,
+                )
+                await broker.start()
+                self._broker = broker
+            try:
+                reader, writer = await asyncio.open_unix_connection(
+                    str(self._path)
+                )
+            except OSError:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 1.0)
+                continue
+            backoff = 0.05
+            hello = json.dumps({"last_seq": self._last_seq}).encode("utf-8")
+            writer.write(pack_frame(HELLO, hello))
+            # Anything the previous broker never echoed is sent again
+            for _, frame in self._pending.values():
+                writer.write(frame)
+            self._writer = writer
+            self._connected.set()
+            logger.info(
+                "Connected to local bus at %s (leader=%s)",
+                self._path,
+                self.is_leader,
+            )
+            try:
+                await self._read_loop(reader)
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                logger.warning("Lost local bus broker; re-electing")
+            finally:
+                self._connected.clear()
+                self._writer = None
+                writer.close()
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            kind, body = await read_frame(reader)
+            if kind == DELTA and self._on_delta is not None:
+                try:
+                    self._on_delta(decode_delta(body))
+                except ValueError as exc:
+                    logger.warning(
+                        "Skipping malformed local bus delta: %s", exc
+                    )
+                continue
+            if kind != MESSAGE:
+                continue
+            try:
+                message = decode_message(body)
+            except ValueError as exc:
+                logger.warning("Skipping malformed local bus message: %s", exc)
+                continue
+            assert message.seq is not None
+            # Sequenced is delivered as far as the publisher is concerned,
+            # even if this process already saw that seq from a late peer
+            pending = self._pending.pop(message.id, None)
+            if pending is not None and not pending[0].done():
+                pending[0].set_result(None)
+            last = self._last_seq.get(message.room)
+            if last is not None and message.seq <= last:
+                continue  # replayed after a reconnect
+            self._last_seq[message.room] = message.seq
+            if self._seen(message):
+                continue  # re-sent across a failover
+            self._on_message(message)
+
+    def _seen(self, message: ChatMessage) -> bool:
+        """Remember a message id; True if the room had it already."""
+        recent = self._recent_ids.get(message.room)
+        if recent is None:
+            recent = self._recent_ids[message.room] = OrderedDict()
+        if message.id in recent:
+            return True
+        recent[message.id] = None
+        if len(recent) > self._retained_per_room:
+            recent.popitem(last=False)
+        return False
+
+    def _try_lead(self) -> bool:
+        if self._lock_fd is None:
+            self._lock_fd = os.open(
+                self._lock_path, os.O_RDWR | os.O_CREAT, 0o600
+            )
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        logger.info("Elected local bus leader for %s", self._path)
+        return True
+
+    def _fail_pending(self) -> None:
+        pending, self._pending = self._pending, {}
+        for delivery, _ in pending.values():
+            if not delivery.done():
+                delivery.set_exception(
+                    ConnectionError("Local bus stopped before delivery")
+                )
@@ -2,12 +2,22 @@
 
 from __future__ import annotations
 
+import sys
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import Enum
+from functools import cached_property
 from typing import Literal
 from uuid import uuid4
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
+
+from .wire import pack_message, pack_notice
+
+
+DEFAULT_ROOM = "lobby"
+# Room ids travel in URLs, Kafka keys and file names, so keep them tame
+ROOM_PATTERN = r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}$"
 
 
 class AuthorKind(str, Enum):
@@ -22,14 +32,181 @@ class ChatMessage(BaseModel):
     content: str
     persona: str | None = None
     persona_emoji: str | None = None
+    room: str = Field(default=DEFAULT_ROOM, pattern=ROOM_PATTERN)
+    # Monotonic per room, assigned by the bus when the message is delivered
+    seq: int | None = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+    @cached_property
+    def json_frame(self) -> str:
+        """JSON text frame for this message, encoded once and then shared.
+
+        Every WebSocket subscriber sends the same cached string, so fan-out
+        never re-serializes a message. Messages are treated as immutable
+        once published.
+        """
+        return self.model_dump_json()
+
+    @cached_property
+    def msgpack_frame(self) -> bytes:
+        """Compact MessagePack record, encoded once like ``json_frame``."""
+        return pack_message(self)
+
+
+@dataclass(slots=True)
+class MessageRecord:
+    """Compact in-process form of a chat message.
+
+    History rings, subscriber queues and worker backlogs hold these instead
+    of ``ChatMessage``: a slotted record skips the per-instance ``__dict__``
+    and fields-set of a pydantic model, and the names, rooms and emoji that
+    repeat from message to message are interned. ``ChatMessage`` stays the
+    type at the edges where input is validated. Fields are in the same order
+    as ``ChatMessage``, so both encode to the same JSON.
+    """
+
+    id: str
+    author: str
+    role: AuthorKind
+    content: str
+    persona: str | None
+    persona_emoji: str | None
+    room: str
+    seq: int | None
+    created_at: datetime
+    # Encoded frames, filled on first use like ChatMessage's cached properties
+    json_cache: str | None = field(default=None, repr=False, compare=False)
+    msgpack_cache: bytes | None = field(
+        default=None, repr=False, compare=False
+    )
+
+    @classmethod
+    def from_message(cls, message: ChatMessage) -> MessageRecord:
+        return cls(
+            message.id,
+            sys.intern(message.author),
+            message.role,
+            message.content,
+            _intern(message.persona),
+            _intern(message.persona_emoji),
+            sys.intern(message.room),
+            message.seq,
+            message.created_at,
+        )
+
+    @classmethod
+    def from_json(cls, frame: bytes) -> MessageRecord:
+        """Rebuild a record from its encoded JSON, keeping it as the frame.
+
+        Used for pages read back from disk, which are served and dropped,
+        so the strings are not interned.
+        """
+        record = _RECORD_ADAPTER.validate_json(frame)
+        record.json_cache = frame.decode("utf-8")
+        return record
+
+    def to_message(self) -> ChatMessage:
+        return ChatMessage.model_construct(
+            id=self.id,
+            author=self.author,
+            role=self.role,
+            content=self.content,
+            persona=self.persona,
+            persona_emoji=self.persona_emoji,
+            room=self.room,
+            seq=self.seq,
+            created_at=self.created_at,
+        )
+
+    @property
+    def json_frame(self) -> str:
+        """Same JSON as ``ChatMessage.json_frame``, escaped to pure ASCII.
+
+        A single emoji makes CPython store a whole string at four bytes per
+        character, and this frame stays cached for as long as the record is
+        retained, so the escapes pay for themselves.
+        """
+        if self.json_cache is None:
+            self.json_cache = _RECORD_ADAPTER.dump_json(
+                self, exclude=_CACHE_FIELDS, ensure_ascii=True
+            ).decode("ascii")
+        return self.json_cache
+
+    @property
+    def msgpack_frame(self) -> bytes:
+        if self.msgpack_cache is None:
+            self.msgpack_cache = pack_message(self)
+        return self.msgpack_cache
+
+
+_RECORD_ADAPTER = TypeAdapter(MessageRecord)
+_CACHE_FIELDS = {"json_cache", "msgpack_cache"}
+
+
+def _intern(value: str | None) -> str | None:
+    return None if value is None else sys.intern(value)
+
+
+class StreamNotice(BaseModel):
+    """Control frame sent on /stream between chat messages.
+
+    ``history_truncated`` tells a resuming client that its gap reaches past
+    the retained history. ``missed`` tells a slow client that ``count`` live
+    messages after ``since`` were dropped from its queue and it should
+    resync.
+    """
+
+    type: Literal["history_truncated", "missed"]
+    room: str
+    since: int | None = None
+    oldest_seq: int | None = None
+    count: int | None = None
+
+    @cached_property
+    def json_frame(self) -> str:
+        return self.model_dump_json()
+
+    @cached_property
+    def msgpack_frame(self) -> bytes:
+        return pack_notice(self)
+
+
+class ReplyDelta(BaseModel):
+    """A piece of a persona reply that is still being written.
+
+    Deltas are live-only: they reach the sockets watching the room but are
+    never sequenced, kept in history, logged or replayed. ``id`` is the id
+    the finished reply will be published under, so a client grows one
+    bubble from the deltas and then swaps in the committed message. A
+    ``done`` delta means the reply was abandoned and no message follows.
+    """
+
+    type: Literal["delta"] = "delta"
+    id: str
+    room: str = Field(default=DEFAULT_ROOM, pattern=ROOM_PATTERN)
+    author: str
+    persona: str | None = None
+    persona_emoji: str | None = None
+    # Position of this piece in the reply, from 0
+    index: int
+    text: str = ""
+    done: bool = False
+
+    @cached_property
+    def json_frame(self) -> str:
+        return self.model_dump_json()
+
+    @cached_property
+    def msgpack_frame(self) -> bytes:
+        return pack_notice(self)
+
 
 class SendMessageRequest(BaseModel):
     author: str | None = Field(default="Human Visitor")
     content: str
     role: Literal[AuthorKind.HUMAN, AuthorKind.MONSTER] = AuthorKind.HUMAN
     persona: str | None = None
+    room: str = Field(default=DEFAULT_ROOM, pattern=ROOM_PATTERN)
 
     def to_chat_message(self) -> ChatMessage:
         """Convert the request to a ChatMessage with metadata."""
@@ -39,4 +216,5 @@ class SendMessageRequest(BaseModel):
             content=self.content,
             persona=self.persona,
             persona_emoji=None,
+            room=self.room,
         )
@@ -6,7 +6,7 @@ import random
 from collections.abc import Sequence
 from dataclasses import dataclass, field
 
-from monster_mash_chatroom.models import AuthorKind, ChatMessage
+from monster_mash_chatroom.models import AuthorKind, MessageRecord
 
 
 @dataclass(slots=True)
@@ -21,9 +21,17 @@ class MonsterPersona:
     max_monster_streak: int = 6
     reading_delay_range: tuple[float, float] = (0.6, 1.4)
     typing_delay_range: tuple[float, float] = (0.8, 1.6)
+    # Triggers within this many seconds of the first one in a room are
+    # answered together, once, in light of the latest message (0 = off)
+    reply_debounce_seconds: float = 1.0
+    # Latency budget of an LLM reply: still waiting on the persona's model
+    # after hedge_after_seconds, the default model is asked too and the
+    # first answer wins; past reply_deadline_seconds a canned reply is used
+    hedge_after_seconds: float | None = 4.0
+    reply_deadline_seconds: float = 12.0
 
     def should_respond(
-        self, message: ChatMessage, backlog: Sequence[ChatMessage]
+        self, message: MessageRecord, backlog: Sequence[MessageRecord]
     ) -> bool:
         """Decide whether this persona should respond based on triggers, probability, and conversation flow."""
         if message.persona == self.key:
@@ -52,7 +60,7 @@ class MonsterPersona:
 
         return random.random() < monster_probability
 
-    def format_demo_reply(self, message: ChatMessage) -> str:
+    def format_demo_reply(self, message: MessageRecord) -> str:
         """Generate a canned demo reply for this persona."""
         template = (
             "{name} senses spectral winds in '{snippet}'"
@@ -62,7 +70,7 @@ class MonsterPersona:
         return template.format(name=self.display_name, snippet=snippet)
 
     def reading_delay_seconds(
-        self, message: ChatMessage, backlog: Sequence[ChatMessage]
+        self, message: MessageRecord, backlog: Sequence[MessageRecord]
     ) -> float:
         """Calculate reading delay based on message length and conversation context."""
         base = random.uniform(*self.reading_delay_range)
@@ -34,4 +34,5 @@ GHOST = MonsterPersona(
     max_monster_streak=5,
     reading_delay_range=(1.5, 2.8),
     typing_delay_range=(1.2, 2.5),
+    reply_debounce_seconds=1.5,
 )
@@ -35,4 +35,7 @@ WEREWOLF = MonsterPersona(
     max_monster_streak=7,
     reading_delay_range=(0.4, 1.0),
     typing_delay_range=(0.6, 1.3),
+    reply_debounce_seconds=0.5,
+    hedge_after_seconds=2.5,
+    reply_deadline_seconds=8.0,
 )
@@ -38,4 +38,7 @@ ZOMBIE = MonsterPersona(
     max_monster_streak=5,
     reading_delay_range=(1.8, 3.2),
     typing_delay_range=(1.5, 3.0),
+    reply_debounce_seconds=2.0,
+    hedge_after_seconds=6.0,
+    reply_deadline_seconds=20.0,
 )
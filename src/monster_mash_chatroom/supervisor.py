@@ -0,0 +1,411 @@
+"""Supervisor that shards the personas across persona worker processes."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import signal
+import sys
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from aiokafka import AIOKafkaConsumer, TopicPartition
+from aiokafka.admin import AIOKafkaAdminClient
+from aiokafka.errors import KafkaError
+
+from .agent_runner import _persona_list, consumer_group
+from .config import BusBackend, Settings, get_settings
+from .personas import PERSONA_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class WorkerSpec:
+    """One worker process: the personas it hosts and its replica number."""
+
+    personas: tuple[str, ...]
+    replica: int = 0
+
+    @property
+    def name(self) -> str:
+        return f"{'+'.join(sorted(self.personas))}#{self.replica}"
+
+
+def plan_workers(
+    persona_keys: Sequence[str],
+    workers: int,
+    scale: Mapping[str, int] | None = None,
+    partitions: int | None = None,
+) -> list[WorkerSpec]:
+    """Shard personas round-robin over ``workers`` processes.
+
+    A persona scaled to several replicas gets workers of its own, all in
+    one consumer group. Kafka gives each group member whole partitions, so
+    replicas beyond the partition count would sit idle and are not started.
+    """
+    scale = scale or {}
+    scaled = [key for key in persona_keys if scale.get(key, 1) > 1]
+    shared = [key for key in persona_keys if key not in scaled]
+    shards: list[list[str]] = [[] for _ in range(max(workers, 1))]
+    for index, key in enumerate(shared):
+        shards[index % len(shards)].append(key)
+    specs = [WorkerSpec(tuple(shard)) for shard in shards if shard]
+    for key in scaled:
+        replicas = scale[key]
+        if partitions is not None and replicas > partitions:
+            logger.warning(
+                "Scaling %s to %d replica(s), not %d: the topic has %d "
+                "partition(s)",
+                key,
+                partitions,
+                replicas,
+                partitions,
+            )
+            replicas = partitions
+        specs.extend(
+            WorkerSpec((key,), replica) for replica in range(replicas)
+        )
+    return specs
+
+
+def worker_command(spec: WorkerSpec) -> list[str]:
+    return [
+        sys.executable,
+        "-m",
+        "monster_mash_chatroom.agent_runner",
+        "--personas",
+        ",".join(spec.personas),
+    ]
+
+
+@dataclass(slots=True)
+class _Worker:
+    spec: WorkerSpec
+    process: asyncio.subprocess.Process | None = None
+    started_at: float = 0.0
+    restarts: int = 0
+    # Crashes in a row, each doubling the restart delay
+    failures: int = 0
+    last_exit: int | None = None
+    finished: bool = False
+
+
+class ConsumerLagProbe:
+    """Reads committed offsets of the worker groups against the topic end."""
+
+    def __init__(self, settings: Settings) -> None:
+        self._namespace = settings.bus.namespace
+        self._kafka = settings.bus.kafka
+        self._admin = AIOKafkaAdminClient(
+            bootstrap_servers=self._kafka.brokers
+        )
+        self._consumer = AIOKafkaConsumer(
+            bootstrap_servers=self._kafka.brokers,
+            group_id=None,
+            enable_auto_commit=False,
+        )
+
+    async def start(self) -> None:
+        await self._admin.start()
+        await self._consumer.start()
+
+    async def stop(self) -> None:
+        await self._consumer.stop()
+        await self._admin.close()
+
+    async def partition_count(self) -> int | None:
+        # topics() forces a metadata refresh for a group-less consumer
+        await self._consumer.topics()
+        partitions = self._consumer.partitions_for_topic(self._kafka.topic)
+        return len(partitions) if partitions else None
+
+    async def lag(self, spec: WorkerSpec) -> int | None:
+        """Records the spec's consumer group has yet to commit, if known."""
+        group = consumer_group(self._namespace, spec.personas)
+        try:
+            committed = await self._admin.list_consumer_group_offsets(group)
+            partitions = [
+                TopicPartition(self._kafka.topic, partition)
+                for partition in self._consumer.partitions_for_topic(
+                    self._kafka.topic
+                )
+                or ()
+            ]
+            end_offsets = await self._consumer.end_offsets(partitions)
+        except KafkaError as exc:
+            logger.debug("Lag lookup failed for group %s: %s", group, exc)
+            return None
+        # Partitions without a commit yet start at the end (offset reset
+        # "latest"), so they count as caught up
+        return sum(
+            max(end - committed[partition].offset, 0)
+            for partition, end in end_offsets.items()
+            if partition in committed and committed[partition].offset >= 0
+        )
+
+
+class Supervisor:
+    """Runs persona worker processes and restarts them when they crash.
+
+    A worker exiting cleanly (status 0) has shut itself down, for instance
+    because its bus backend is unavailable, and is not restarted.
+    """
+
+    def __init__(
+        self,
+        specs: Sequence[WorkerSpec],
+        settings: Settings,
+        command: Callable[[WorkerSpec], list[str]] = worker_command,
+        lag_probe: ConsumerLagProbe | None = None,
+    ) -> None:
+        self._settings = settings.supervisor
+        self._command = command
+        self._lag_probe = lag_probe
+        self._workers = [_Worker(spec) for spec in specs]
+        self._tasks: list[asyncio.Task[None]] = []
+        self._stopping = False
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._watch(worker))
+            for worker in self._workers
+        ]
+
+    async def wait(self) -> None:
+        await asyncio.gather(*self._tasks)
+
+    async def stop(self) -> None:
+        self._stopping = True
+        running = [
+            worker.process
+            for worker in self._workers
+            if worker.process is not None and worker.process.returncode is None
+        ]
+        # SIGINT lets a worker's asyncio.run() unwind and flush its producer
+        for process in running:
+            process.send_signal(signal.SIGINT)
+        if running:
+            _done, late = await asyncio.wait(
+                [asyncio.create_task(process.wait()) for process in running],
+                timeout=self._settings.shutdown_grace_seconds,
+            )
+            if late:
+                logger.warning(
+                    "Killing %d worker(s) after grace period", len(late)
+                )
+                for process in running:
+                    if process.returncode is None:
+                        process.kill()
+                await asyncio.gather(*late)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def status(self) -> list[dict[str, Any]]:
+        """Liveness, restarts and consumer lag of every worker."""
+        now = asyncio.get_running_loop().time()
+        report = []
+        for worker in self._workers:
+            process = worker.process
+            alive = process is not None and process.returncode is None
+            uptime = lag = None
+            if alive:
+                uptime = round(now - worker.started_at, 1)
+                if self._lag_probe is not None:
+                    lag = await self._lag_probe.lag(worker.spec)
+            report.append(
+                {
+                    "worker": worker.spec.name,
+                    "personas": list(worker.spec.personas),
+                    "pid": process.pid if alive else None,
+                    "alive": alive,
+                    "uptime_seconds": uptime,
+                    "restarts": worker.restarts,
+                    "last_exit": worker.last_exit,
+                    "finished": worker.finished,
+                    "lag": lag,
+                }
+            )
+        return report
+
+    async def _watch(self, worker: _Worker) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            # A session of its own keeps a terminal's Ctrl+C away from the
+            # workers; the supervisor stops them in order instead
+            worker.process = await asyncio.create_subprocess_exec(
+                *self._command(worker.spec), start_new_session=True
+            )
+            worker.started_at = loop.time()
+            logger.info(
+                "Started worker %s (pid %d)",
+                worker.spec.name,
+                worker.process.pid,
+            )
+            code = await worker.process.wait()
+            worker.last_exit = code
+            if self._stopping:
+                return
+            if code == 0:
+                worker.finished = True
+                logger.info("Worker %s exited cleanly", worker.spec.name)
+                return
+            max_backoff = self._settings.restart_backoff_max_seconds
+            if loop.time() - worker.started_at >= max_backoff:
+                worker.failures = 0
+            delay = min(
+                self._settings.restart_backoff_seconds * 2**worker.failures,
+                max_backoff,
+            )
+            worker.failures += 1
+            worker.restarts += 1
+            logger.warning(
+                "Worker %s exited with status %d; restarting in %.1fs",
+                worker.spec.name,
+                code,
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+
+async def _report(
+    supervisor: Supervisor, interval: float, path: Path | None
+) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        report = await supervisor.status()
+        for entry in report:
+            logger.info(
+                "worker=%s alive=%s pid=%s restarts=%d lag=%s",
+                entry["worker"],
+                entry["alive"],
+                entry["pid"],
+                entry["restarts"],
+                entry["lag"],
+            )
+        if path is not None:
+            staging = path.with_suffix(path.suffix + ".tmp")
+            staging.write_text(json.dumps(report, indent=2))
+            staging.replace(path)
+
+
+def _scale(value: str) -> tuple[str, int]:
+    key, _, count = value.partition("=")
+    if key not in PERSONA_REGISTRY or not count.isdigit() or int(count) < 1:
+        raise argparse.ArgumentTypeError(
+            f"expected KEY=REPLICAS with KEY in {sorted(PERSONA_REGISTRY)}, "
+            f"got {value!r}"
+        )
+    return key, int(count)
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run persona workers as supervised processes"
+    )
+    parser.add_argument(
+        "--personas",
+        type=_persona_list,
+        metavar="KEY,KEY",
+        help="personas to run (default: all)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="processes to shard the personas over (default: CPU count)",
+    )
+    parser.add_argument(
+        "--scale",
+        type=_scale,
+        action="append",
+        default=[],
+        metavar="KEY=REPLICAS",
+        help="run a persona as several replicas in one consumer group (Kafka)",
+    )
+    parser.add_argument(
+        "--status-file",
+        type=Path,
+        help="also write the periodic worker status to this JSON file",
+    )
+    return parser.parse_args(argv)
+
+
+async def main_async(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    settings = get_settings()
+    backend = settings.bus.backend
+    if backend not in (BusBackend.KAFKA, BusBackend.LOCAL):
+        logger.error(
+            "Persona workers need BUS__BACKEND=kafka or local, not '%s'",
+            backend.value,
+        )
+        return
+    keys = args.personas or list(PERSONA_REGISTRY)
+    workers = args.workers or min(os.cpu_count() or 1, len(keys))
+    scale = dict(args.scale)
+
+    probe = None
+    partitions: int | None = None
+    if backend == BusBackend.KAFKA and settings.bus.kafka.brokers:
+        probe = ConsumerLagProbe(settings)
+        try:
+            await probe.start()
+            partitions = await probe.partition_count()
+        except KafkaError as exc:
+            logger.warning("Consumer lag unavailable: %s", exc)
+            with contextlib.suppress(KafkaError):
+                await probe.stop()
+            probe = None
+    elif scale:
+        # The local bus delivers every message to every client, so
+        # replicas would each answer it
+        logger.warning("Replicas need the Kafka backend; running one of each")
+        scale = {}
+    specs = plan_workers(keys, workers, scale, partitions)
+
+    supervisor = Supervisor(specs, settings, lag_probe=probe)
+    stop_requested = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(
+        signal.SIGTERM, stop_requested.set
+    )
+    supervisor.start()
+    tasks = [
+        asyncio.create_task(supervisor.wait()),
+        asyncio.create_task(stop_requested.wait()),
+        asyncio.create_task(
+            _report(
+                supervisor,
+                settings.supervisor.status_interval_seconds,
+                args.status_file,
+            )
+        ),
+    ]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await supervisor.stop()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if probe is not None:
+            await probe.stop()
+
+
+def main() -> None:
+    """CLI entry point for the persona worker supervisor."""
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main_async())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
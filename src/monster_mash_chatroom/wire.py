@@ -0,0 +1,138 @@
+"""Wire formats for /stream, negotiated per socket through subprotocols."""
+
+from __future__ import annotations
+
+import struct
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from enum import Enum
+from typing import TYPE_CHECKING, Any
+
+try:  # pragma: no cover - optional dependency import
+    import msgpack  # type: ignore[import-untyped]
+except ImportError:  # pragma: no cover - optional dependency missing
+    msgpack = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from .models import ChatMessage, MessageRecord, ReplyDelta, StreamNotice
+
+
+class WireFormat(str, Enum):
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+
+# Sec-WebSocket-Protocol names; clients without one get plain JSON
+SUBPROTOCOLS: dict[str, WireFormat] = {
+    "monster-mash.v1.json": WireFormat.JSON,
+    "monster-mash.v1.msgpack": WireFormat.MSGPACK,
+}
+
+# Field order of the compact MessagePack message record. Ids go out as
+# 16 raw bytes, roles as 0 (human) / 1 (monster) and timestamps as epoch ms.
+MESSAGE_FIELDS = (
+    "seq",
+    "id",
+    "author",
+    "role",
+    "content",
+    "persona",
+    "persona_emoji",
+    "room",
+    "created_at",
+)
+_ROLE_CODES = {"human": 0, "monster": 1}
+_ROLE_NAMES = {code: name for name, code in _ROLE_CODES.items()}
+
+
+def negotiate(offered: Sequence[str]) -> tuple[str | None, WireFormat]:
+    """Pick the first subprotocol the client offered that we can serve."""
+    for name in offered:
+        wire_format = SUBPROTOCOLS.get(name)
+        if wire_format is None:
+            continue
+        if wire_format == WireFormat.MSGPACK and msgpack is None:
+            continue
+        return name, wire_format
+    return None, WireFormat.JSON
+
+
+def pack_message(message: ChatMessage | MessageRecord) -> bytes:
+    """Encode a message as a positional MessagePack record."""
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    try:
+        message_id: bytes | str = bytes.fromhex(message.id)
+    except ValueError:
+        message_id = message.id
+    return msgpack.packb(
+        [
+            message.seq,
+            message_id,
+            message.author,
+            _ROLE_CODES[message.role.value],
+            message.content,
+            message.persona,
+            message.persona_emoji,
+            message.room,
+            int(message.created_at.timestamp() * 1000),
+        ]
+    )
+
+
+def unpack_message(data: bytes) -> dict[str, Any]:
+    """Decode a compact record back into ChatMessage field values."""
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    fields = dict(zip(MESSAGE_FIELDS, msgpack.unpackb(data), strict=True))
+    if isinstance(fields["id"], bytes):
+        fields["id"] = fields["id"].hex()
+    fields["role"] = _ROLE_NAMES[fields["role"]]
+    fields["created_at"] = datetime.fromtimestamp(
+        fields["created_at"] / 1000, timezone.utc
+    )
+    return fields
+
+
+def pack_notice(notice: StreamNotice | ReplyDelta) -> bytes:
+    """Encode a notice or reply delta as a MessagePack map, not an array."""
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    fields = notice.model_dump()
+    return msgpack.packb(
+        {key: value for key, value in fields.items() if value is not None}
+    )
+
+
+def json_batch(
+    items: Sequence[MessageRecord | StreamNotice | ReplyDelta],
+) -> str:
+    """Join already-encoded JSON frames into one JSON array frame."""
+    return "[" + ",".join(item.json_frame for item in items) + "]"
+
+
+def encode_frame(
+    items: Sequence[MessageRecord | StreamNotice | ReplyDelta],
+    wire_format: WireFormat,
+) -> str | bytes:
+    """Build one WebSocket frame from per-message cached encodings.
+
+    JSON sends a lone item as an object and several as an array.
+    MessagePack frames are always an array of records, which is just an
+    array header in front of the cached record bytes.
+    """
+    if wire_format == WireFormat.MSGPACK:
+        return _array_header(len(items)) + b"".join(
+            item.msgpack_frame for item in items
+        )
+    if len(items) == 1:
+        return items[0].json_frame
+    return json_batch(items)
+
+
+def _array_header(length: int) -> bytes:
+    if length < 16:
+        return bytes((0x90 | length,))
+    if length < 1 << 16:
+        return b"\xdc" + struct.pack(">H", length)
+    return b"\xdd" + struct.pack(">I", length)
@@ -0,0 +1,229 @@
+"""Tests for the persona worker's message dispatch."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from monster_mash_chatroom.agent_runner import (
+    PersonaDispatcher,
+    _report_stats,
+    parse_args,
+    selected_personas,
+)
+from monster_mash_chatroom.config import Settings, WorkerSettings
+from monster_mash_chatroom.models import AuthorKind, ChatMessage, ReplyDelta
+from monster_mash_chatroom.personas import PERSONA_REGISTRY, MonsterPersona
+
+
+def _eager(key: str) -> MonsterPersona:
+    """A persona that always answers, without reading or typing delays."""
+    return replace(
+        PERSONA_REGISTRY[key],
+        respond_probability=1.0,
+        reading_delay_range=(0.0, 0.0),
+        typing_delay_range=(0.0, 0.0),
+        reply_debounce_seconds=0.0,
+    )
+
+
+def test_parse_args_selects_personas() -> None:
+    chosen = selected_personas(parse_args(["witch"]))
+    assert [p.key for p in chosen] == ["witch"]
+    everyone = selected_personas(parse_args(["--all"]))
+    assert len(everyone) == len(PERSONA_REGISTRY)
+    chosen = selected_personas(parse_args(["--personas", "ghost,witch,ghost"]))
+    assert [p.key for p in chosen] == ["ghost", "witch"]
+    with pytest.raises(SystemExit):
+        parse_args(["--personas", "witch,mothman"])
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_shares_one_decode_across_personas() -> None:
+    replies: list[ChatMessage] = []
+    done = asyncio.Event()
+
+    async def publish(response: ChatMessage) -> None:
+        replies.append(response)
+        if len(replies) == 2:
+            done.set()
+
+    personas = [_eager("witch"), _eager("vampire")]
+    dispatcher = PersonaDispatcher(personas, Settings(demo_mode=True), publish)
+    dispatcher.dispatch(
+        ChatMessage(author="Tester", role=AuthorKind.HUMAN, content="Hello?")
+    )
+    await asyncio.wait_for(done.wait(), timeout=2)
+    await dispatcher.stop()
+
+    assert sorted(reply.persona for reply in replies) == ["vampire", "witch"]
+    # Both personas saw the very same record in one shared backlog
+    assert len(dispatcher._backlogs["lobby"]) == 1
+
+
+def _human(content: str, room: str = "lobby") -> ChatMessage:
+    return ChatMessage(
+        author="Tester", role=AuthorKind.HUMAN, content=content, room=room
+    )
+
+
+@pytest.mark.asyncio
+async def test_newer_messages_cancel_stale_replies(monkeypatch) -> None:
+    release = asyncio.Event()
+
+    async def slow_reply(persona, history, settings) -> str:
+        await release.wait()
+        return f"re: {history[-1].content}"
+
+    monkeypatch.setattr(
+        "monster_mash_chatroom.agent_runner.generate_persona_reply", slow_reply
+    )
+    replies: list[ChatMessage] = []
+    both = asyncio.Event()
+
+    async def publish(response: ChatMessage) -> None:
+        replies.append(response)
+        if len(replies) == 2:
+            both.set()
+
+    settings = Settings(
+        demo_mode=True, worker=WorkerSettings(stale_after_messages=2)
+    )
+    dispatcher = PersonaDispatcher([_eager("witch")], settings, publish)
+    # Dispatch never waits on the slow LLM
+    dispatcher.dispatch(_human("first"))
+    dispatcher.dispatch(_human("second"))
+    dispatcher.dispatch(_human("elsewhere", room="crypt"))
+    counters = dispatcher.stats()["witch"]
+    assert counters["superseded"] == 1
+    assert counters["pending"] == 2  # one per room
+
+    release.set()
+    await asyncio.wait_for(both.wait(), timeout=2)
+    await dispatcher.stop()
+    assert sorted(reply.content for reply in replies) == [
+        "re: elsewhere",
+        "re: second",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_replies_go_stale_without_a_newer_trigger(monkeypatch) -> None:
+    async def never(persona, history, settings) -> str:
+        await asyncio.Event().wait()
+        return ""
+
+    monkeypatch.setattr(
+        "monster_mash_chatroom.agent_runner.generate_persona_reply", never
+    )
+
+    async def publish(response: ChatMessage) -> None:  # pragma: no cover
+        raise AssertionError("stale reply was published")
+
+    settings = Settings(
+        demo_mode=True, worker=WorkerSettings(stale_after_messages=2)
+    )
+    witch = _eager("witch")
+    dispatcher = PersonaDispatcher([witch], settings, publish)
+    dispatcher.dispatch(_human("trigger"))
+    # Later chatter the witch ignores still ages the pending reply
+    monkeypatch.setattr(witch, "respond_probability", 0.0)
+    for text in ("one", "two"):
+        dispatcher.dispatch(_human(text))
+    await asyncio.sleep(0)
+    assert dispatcher.stats()["witch"]["stale"] == 1
+    assert dispatcher.stats()["witch"]["pending"] == 0
+    await dispatcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_bursts_are_answered_once() -> None:
+    replies: list[ChatMessage] = []
+    done = asyncio.Event()
+
+    async def publish(response: ChatMessage) -> None:
+        replies.append(response)
+        done.set()
+
+    witch = replace(_eager("witch"), reply_debounce_seconds=0.05)
+    dispatcher = PersonaDispatcher([witch], Settings(demo_mode=True), publish)
+    for text in ("Hello?", "Anyone there?", "Witch, are you around?"):
+        dispatcher.dispatch(_human(text))
+    assert dispatcher.stats()["witch"]["debouncing"] == 1
+
+    await asyncio.wait_for(done.wait(), timeout=2)
+    await asyncio.sleep(0.1)
+    counters = dispatcher.stats()["witch"]
+    await dispatcher.stop()
+    assert len(replies) == 1
+    assert counters["debounced"] == 2
+    assert counters["llm_calls_avoided"] == 2
+    assert counters["superseded"] == 0
+
+
+@pytest.mark.asyncio
+async def test_streamed_replies_end_in_the_committed_message() -> None:
+    deltas: list[ReplyDelta] = []
+    replies: list[ChatMessage] = []
+    done = asyncio.Event()
+
+    async def publish(response: ChatMessage) -> None:
+        replies.append(response)
+        done.set()
+
+    async def publish_delta(delta: ReplyDelta) -> None:
+        deltas.append(delta)
+
+    settings = Settings(
+        demo_mode=True, worker=WorkerSettings(stream_replies=True)
+    )
+    dispatcher = PersonaDispatcher(
+        [_eager("werewolf")], settings, publish, publish_delta
+    )
+    dispatcher.dispatch(_human("Howl at the moon!"))
+    await asyncio.wait_for(done.wait(), timeout=2)
+    await dispatcher.stop()
+
+    (reply,) = replies
+    assert {delta.id for delta in deltas} == {reply.id}
+    assert [delta.index for delta in deltas] == list(range(len(deltas)))
+    assert "".join(delta.text for delta in deltas).strip() == reply.content
+    assert "first_token_ms" in dispatcher.stats()["werewolf"]
+
+
+@pytest.mark.asyncio
+async def test_worker_reports_its_counters_periodically(
+    tmp_path: Path,
+) -> None:
+    async def publish(response: ChatMessage) -> None:
+        pass
+
+    # Reported even with the breakers off: the other counters still matter
+    settings = Settings(
+        demo_mode=True,
+        llm_breaker={
+            "enabled": False,
+            "state_dir": str(tmp_path),
+            "report_interval_seconds": 0.01,
+        },
+    )
+    dispatcher = PersonaDispatcher([_eager("witch")], settings, publish)
+    reporter = asyncio.create_task(
+        _report_stats(settings, "witch", dispatcher)
+    )
+    await asyncio.sleep(0.05)
+    (path,) = tmp_path.glob("witch-*.json")
+    report = json.loads(path.read_text())
+    assert report["worker"] == "witch"
+    assert set(report["personas"]) == {"witch"}
+    expected = {"limiters", "cache", "replies", "prompts", "breakers"}
+    assert expected <= set(report)
+
+    reporter.cancel()
+    await asyncio.gather(reporter, return_exceptions=True)
+    await dispatcher.stop()
+    assert not path.exists()
@@ -0,0 +1,54 @@
+import pytest
+
+from monster_mash_chatroom.codec import (
+    available_backends,
+    decode_message,
+    encode_message,
+)
+from monster_mash_chatroom.config import CodecBackend
+from monster_mash_chatroom.models import AuthorKind, ChatMessage
+
+
+def _message() -> ChatMessage:
+    return ChatMessage(
+        author="Mummy",
+        role=AuthorKind.MONSTER,
+        content="Wrapped and ready 🧻",
+        persona="mummy",
+        persona_emoji="🧟",
+        room="crypt",
+        seq=7,
+    )
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_round_trip(backend: CodecBackend) -> None:
+    message = _message()
+    decoded = decode_message(encode_message(message, backend))
+    assert decoded.role is AuthorKind.MONSTER
+    # MessagePack keeps timestamps to the millisecond
+    assert abs(decoded.created_at - message.created_at).total_seconds() < 0.001
+    assert decoded.model_dump(exclude={"created_at"}) == message.model_dump(
+        exclude={"created_at"}
+    )
+
+
+def test_decoders_read_every_backend() -> None:
+    message = _message()
+    payloads = {encode_message(message, b) for b in available_backends()}
+    for payload in payloads:
+        assert decode_message(payload).id == message.id
+
+
+def test_rejects_bad_payloads() -> None:
+    with pytest.raises(ValueError):
+        decode_message(b'{"author": "x", "role": "ghoul", "content": "hi"}')
+    with pytest.raises(ValueError):
+        decode_message(
+            b'{"author": "x", "role": "human", "content": "hi", '
+            b'"room": "../etc"}'
+        )
+    with pytest.raises(ValueError):
+        decode_message(b'{"author": "x", "role": "human"}')
+    with pytest.raises(ValueError):
+        decode_message(b"[1, 2")
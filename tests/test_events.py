@@ -1,11 +1,33 @@
+import asyncio
+import json
+
 import pytest
+from aiokafka import ConsumerRecord, TopicPartition
 
 from monster_mash_chatroom.config import (
     BusBackend,
     KafkaBusSettings,
     MessageBusSettings,
+    RelayMode,
+    SlowSubscriberPolicy,
+)
+from monster_mash_chatroom.events import (
+    DELTA_HEADER,
+    InMemoryEventBus,
+    KafkaEventBus,
+    SubscriberOverflow,
+    build_event_bus,
+    build_topics,
+    decode_batches,
+    decode_events,
+)
+from monster_mash_chatroom.models import (
+    AuthorKind,
+    ChatMessage,
+    MessageRecord,
+    ReplyDelta,
+    StreamNotice,
 )
-from monster_mash_chatroom.events import InMemoryEventBus, build_event_bus
 
 
 def test_kafka_bus_settings_default_to_empty(monkeypatch: pytest.MonkeyPatch) -> None:
@@ -73,3 +95,411 @@ def test_message_bus_history_limit_fallback(monkeypatch: pytest.MonkeyPatch) ->
     settings = MessageBusSettings(history_limit=None)
     assert settings.history_limit == 321
     monkeypatch.delenv("MONSTER_HISTORY_LIMIT", raising=False)
+
+
+@pytest.mark.asyncio
+async def test_in_memory_publish_shares_encoded_frame() -> None:
+    bus = InMemoryEventBus(history_limit=10)
+    first = bus.subscribe()
+    second = bus.subscribe()
+    # Prime both generators so their queues are registered
+    first_task = asyncio.ensure_future(first.__anext__())
+    second_task = asyncio.ensure_future(second.__anext__())
+    await asyncio.sleep(0)
+
+    message = ChatMessage(
+        author="Tester", role=AuthorKind.HUMAN, content="Boo"
+    )
+    await bus.publish(message)
+    received = [await first_task, await second_task]
+
+    frames = [item.json_frame for item in received]
+    assert frames[0] is frames[1]
+    assert json.loads(frames[0])["content"] == "Boo"
+    await first.aclose()
+    await second.aclose()
+    await bus.stop()
+
+
+def test_kafka_bus_settings_producer_options() -> None:
+    settings = KafkaBusSettings(
+        acks="ALL", compression_type="none", linger_ms="20"
+    )
+    assert settings.acks == "all"
+    assert settings.compression_type is None
+    assert settings.linger_ms == 20
+    assert KafkaBusSettings(acks="0").acks == 0
+    with pytest.raises(ValueError):
+        KafkaBusSettings(compression_type="brotli")
+
+
+@pytest.mark.asyncio
+async def test_in_memory_enqueue_returns_completed_delivery() -> None:
+    bus = InMemoryEventBus(history_limit=5)
+    message = ChatMessage(
+        author="Tester", role=AuthorKind.HUMAN, content="Batched?"
+    )
+    delivery = await bus.enqueue(message)
+    assert delivery.done()
+    assert [record.to_message() for record in await bus.get_recent()] == [
+        message
+    ]
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_kafka_relay_consumer_group_per_mode() -> None:
+    def group_for(mode: RelayMode) -> str | None:
+        settings = KafkaBusSettings(
+            brokers=["localhost:9092"], relay_mode=mode, instance_id="web-1"
+        )
+        bus = KafkaEventBus(settings, "spooky", 10, None)
+        return bus._build_relay_consumer()._group_id
+
+    assert group_for(RelayMode.ASSIGN) is None
+    assert (
+        group_for(RelayMode.INSTANCE_GROUP) == "spooky.websocket-relay.web-1"
+    )
+    assert group_for(RelayMode.SHARED_GROUP) == "spooky.websocket-relay"
+
+
+@pytest.mark.asyncio
+async def test_kafka_reply_deltas_get_their_own_topic() -> None:
+    settings = KafkaBusSettings(
+        brokers=["localhost:9092"], relay_mode=RelayMode.SHARED_GROUP
+    )
+    assert [t.name for t in build_topics(settings)] == [
+        "monster.chat",
+        "monster.chat.deltas",
+    ]
+    # Only the relay reads them; the warm-up depth counts chat records only
+    bus = KafkaEventBus(settings, "spooky", 10, None)
+    assert bus._build_relay_consumer().subscription() == {
+        "monster.chat",
+        "monster.chat.deltas",
+    }
+
+
+@pytest.mark.asyncio
+async def test_in_memory_rooms_are_isolated() -> None:
+    bus = InMemoryEventBus(history_limit=5)
+    crypt = bus.subscribe("crypt")
+    pending = asyncio.ensure_future(crypt.__anext__())
+    await asyncio.sleep(0)
+
+    await bus.publish(
+        ChatMessage(author="A", role=AuthorKind.HUMAN, content="lobby hi")
+    )
+    await bus.publish(
+        ChatMessage(
+            author="B", role=AuthorKind.HUMAN, content="crypt hi", room="crypt"
+        )
+    )
+    received = await pending
+    assert received.content == "crypt hi"
+    assert [m.content for m in await bus.get_recent()] == ["lobby hi"]
+    assert [m.content for m in await bus.get_recent("crypt")] == ["crypt hi"]
+    await crypt.aclose()
+    await bus.stop()
+
+
+def test_chat_message_rejects_unsafe_room() -> None:
+    with pytest.raises(ValueError):
+        ChatMessage(
+            author="A", role=AuthorKind.HUMAN, content="x", room="../etc"
+        )
+
+
+@pytest.mark.asyncio
+async def test_subscription_replays_only_the_gap() -> None:
+    bus = InMemoryEventBus(history_limit=3)
+    for index in range(5):
+        await bus.publish(
+            ChatMessage(author="A", role=AuthorKind.HUMAN, content=str(index))
+        )
+    # seq 1..5 published, ring keeps 3..5
+    with bus.open_subscription(since=3) as subscription:
+        assert [m.seq for m in subscription.backlog] == [4, 5]
+        assert subscription.truncated is False
+    with bus.open_subscription(since=1) as subscription:
+        assert [m.seq for m in subscription.backlog] == [3, 4, 5]
+        assert subscription.truncated is True
+    with bus.open_subscription() as subscription:
+        assert len(subscription.backlog) == 3
+        assert subscription.truncated is False
+        await bus.publish(
+            ChatMessage(author="B", role=AuthorKind.HUMAN, content="live")
+        )
+        live = await subscription.__anext__()
+        assert live.seq == 6
+    # A client from before a restart is ahead of the new numbering
+    with bus.open_subscription(since=500) as subscription:
+        assert [m.seq for m in subscription.backlog] == [4, 5, 6]
+        assert subscription.truncated is True
+    await bus.stop()
+
+
+async def _publish_many(bus: InMemoryEventBus, count: int) -> None:
+    for index in range(count):
+        await bus.publish(
+            ChatMessage(author="A", role=AuthorKind.HUMAN, content=str(index))
+        )
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_drop_oldest_keeps_newest() -> None:
+    bus = InMemoryEventBus(
+        history_limit=10,
+        subscriber_queue_size=2,
+        slow_subscriber_policy=SlowSubscriberPolicy.DROP_OLDEST,
+    )
+    with bus.open_subscription() as subscription:
+        await _publish_many(bus, 5)
+        received = [await subscription.__anext__() for _ in range(2)]
+    assert [m.seq for m in received] == [4, 5]
+    assert bus.stats()["slow_subscriber_overflows"]["drop-oldest"] == 3
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_coalesces_into_missed_notice() -> None:
+    bus = InMemoryEventBus(history_limit=10, subscriber_queue_size=2)
+    with bus.open_subscription() as subscription:
+        await _publish_many(bus, 6)
+        notice = await subscription.__anext__()
+        live = await subscription.__anext__()
+    # 1-2 filled the queue, 3 and 5 overflowed; the second notice absorbs
+    # the first so the client sees one gap starting after seq 0
+    assert isinstance(notice, StreamNotice)
+    assert notice.type == "missed"
+    assert (notice.since, notice.count) == (0, 5)
+    assert live.seq == 6
+    assert bus.stats()["slow_subscriber_overflows"]["coalesce"] == 5
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_close_policy_ends_subscription() -> None:
+    bus = InMemoryEventBus(
+        history_limit=10,
+        subscriber_queue_size=2,
+        slow_subscriber_policy=SlowSubscriberPolicy.CLOSE,
+    )
+    # An idle reader takes a batch larger than its queue without being
+    # treated as slow
+    with bus.open_subscription() as subscription:
+        reader = asyncio.create_task(subscription.__anext__())
+        await asyncio.sleep(0)
+        bus._rooms.deliver_many(
+            [
+                ChatMessage(author="A", role=AuthorKind.HUMAN, content=str(i))
+                for i in range(3)
+            ]
+        )
+        assert (await asyncio.wait_for(reader, timeout=1)).seq == 1
+        seqs = [(await subscription.__anext__()).seq for _ in range(2)]
+        assert seqs == [2, 3]
+        assert bus.stats()["subscribers"] == 1
+    # A reader that falls behind is closed
+    with bus.open_subscription() as subscription:
+        await _publish_many(bus, 3)
+        with pytest.raises(SubscriberOverflow):
+            await subscription.__anext__()
+    stats = bus.stats()
+    assert stats["subscribers"] == 0
+    assert stats["slow_subscriber_overflows"]["close"] == 1
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_build_event_bus_uses_subscriber_queue_size() -> None:
+    bus = await build_event_bus(
+        MessageBusSettings(history_limit=500, subscriber_queue_size=8)
+    )
+    assert bus.stats()["subscriber_queue_size"] == 8
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_subscription_batches_queued_burst() -> None:
+    bus = InMemoryEventBus(history_limit=10)
+    with bus.open_subscription() as subscription:
+        await _publish_many(bus, 5)
+        first = await subscription.next_batch(max_items=3, max_bytes=1 << 20)
+        rest = await subscription.next_batch(max_items=3, max_bytes=1 << 20)
+        await _publish_many(bus, 2)
+        # One frame's worth of bytes is enough to stop after the first item
+        tiny = await subscription.next_batch(max_items=10, max_bytes=1)
+    assert [m.seq for m in first] == [1, 2, 3]
+    assert [m.seq for m in rest] == [4, 5]
+    assert [m.seq for m in tiny] == [6]
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_deliver_many_touches_each_room_once() -> None:
+    bus = InMemoryEventBus(history_limit=3, subscriber_queue_size=10)
+    with (
+        bus.open_subscription() as lobby,
+        bus.open_subscription("crypt") as crypt,
+    ):
+        bus._rooms.deliver_many(
+            [
+                ChatMessage(
+                    author="A",
+                    role=AuthorKind.HUMAN,
+                    content=str(index),
+                    room="crypt" if index == 2 else "lobby",
+                )
+                for index in range(6)
+            ]
+        )
+        assert [m.seq for m in lobby.queue] == [1, 2, 3, 4, 5]
+        assert [m.content for m in crypt.queue] == ["2"]
+    # Ring keeps lobby seqs 3..5, so the horizon moved to 2
+    with bus.open_subscription(since=2) as subscription:
+        assert subscription.truncated is False
+    with bus.open_subscription(since=1) as subscription:
+        assert subscription.truncated is True
+    await bus.stop()
+
+
+class _RecordedConsumer:
+    """Stand-in for AIOKafkaConsumer serving a fixed partition log."""
+
+    def __init__(
+        self, records: list[ConsumerRecord], end: int | None = None
+    ) -> None:
+        self._partition = TopicPartition("monster.chat", 0)
+        self._records = records
+        self._position = len(records)
+        # Records from ``end`` on arrive after the end offsets were read
+        self._end = len(records) if end is None else end
+
+    def assignment(self) -> set[TopicPartition]:
+        return {self._partition}
+
+    async def end_offsets(self, partitions):
+        return {self._partition: self._end}
+
+    async def beginning_offsets(self, partitions):
+        return {self._partition: 0}
+
+    def seek(self, partition, offset: int) -> None:
+        self._position = offset
+
+    async def position(self, partition) -> int:
+        return self._position
+
+    async def getmany(
+        self, *partitions, timeout_ms: int = 0, max_records=None
+    ):
+        batch = self._records[self._position : self._position + 2]
+        self._position += len(batch)
+        return {self._partition: batch} if batch else {}
+
+
+def _record(offset: int, content: str) -> ConsumerRecord:
+    message = ChatMessage(author="A", role=AuthorKind.HUMAN, content=content)
+    value = message.json_frame.encode("utf-8")
+    return ConsumerRecord(
+        "monster.chat.deltas", 0, offset, 0, 0, b"lobby", value, None, 5,
+        len(value), []
+    )
+
+
+@pytest.mark.asyncio
+async def test_kafka_warm_up_restores_tail_of_history() -> None:
+    settings = KafkaBusSettings(brokers=["localhost:9092"])
+    bus = KafkaEventBus(settings, "spooky", 3, None)
+    bus._consumer = _RecordedConsumer(
+        [_record(i, f"m{i}") for i in range(5)]
+    )
+    assert bus.stats()["warmup_complete"] is False
+
+    await bus._warm_up()
+
+    # /diagnostics reports whether the history is complete
+    assert bus.stats()["warmup_complete"] is True
+    recent = await bus.get_recent()
+    assert [(m.seq, m.content) for m in recent] == [
+        (2, "m2"),
+        (3, "m3"),
+        (4, "m4"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_kafka_warm_up_keeps_messages_published_meanwhile() -> None:
+    settings = KafkaBusSettings(brokers=["localhost:9092"])
+    bus = KafkaEventBus(settings, "spooky", 3, None)
+    # m3 onwards land after the warm-up read the end offsets; the batch
+    # that reaches the end returns m3 as well
+    consumer = _RecordedConsumer(
+        [_record(i, f"m{i}") for i in range(6)], end=3
+    )
+
+    restored = await bus._replay_tail(consumer)
+
+    assert restored == 3
+    recent = await bus.get_recent()
+    assert [m.content for m in recent] == ["m1", "m2", "m3"]
+    # The consume loop goes on with m4
+    assert await consumer.position(None) == 4
+
+    # A group-mode relay picks up right after the last record read
+    bus._consumer = relay = _RecordedConsumer([])
+    bus._resume_from_warm_up(relay.assignment())
+    assert await relay.position(None) == 4
+
+
+def _delta_record(offset: int, reply_id: str, text: str) -> ConsumerRecord:
+    delta = ReplyDelta(id=reply_id, author="Wolfman", index=offset, text=text)
+    value = delta.json_frame.encode("utf-8")
+    return ConsumerRecord(
+        "monster.chat", 0, offset, 0, 0, b"lobby", value, None, 5, len(value),
+        [DELTA_HEADER],
+    )
+
+
+@pytest.mark.asyncio
+async def test_reply_deltas_stream_live_but_stay_out_of_history() -> None:
+    final = _record(2, "Awoo!")
+    reply_id = json.loads(final.value)["id"]
+    partition = TopicPartition("monster.chat", 0)
+    batches = {
+        partition: [
+            _delta_record(0, reply_id, "Aw"),
+            _delta_record(1, reply_id, "oo!"),
+            final,
+        ]
+    }
+    # Workers never see the deltas
+    assert [m.content for m in decode_batches(batches)] == ["Awoo!"]
+
+    bus = InMemoryEventBus(history_limit=10, subscriber_queue_size=10)
+    with bus.open_subscription() as subscription:
+        bus._rooms.deliver_many(decode_events(batches))
+        queued = list(subscription.queue)
+    assert [type(item) for item in queued] == [
+        ReplyDelta,
+        ReplyDelta,
+        MessageRecord,
+    ]
+    assert {item.id for item in queued} == {reply_id}
+    assert [m.content for m in await bus.get_recent()] == ["Awoo!"]
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_reply_deltas_never_overflow_a_queue() -> None:
+    bus = InMemoryEventBus(history_limit=10, subscriber_queue_size=1)
+    with bus.open_subscription() as subscription:
+        for index in range(3):
+            bus._rooms.deliver_delta(
+                ReplyDelta(id="r", author="Wolfman", index=index, text="a")
+            )
+        assert len(subscription.queue) == 1
+    assert bus.stats()["deltas_dropped"] == 2
+    assert bus.stats()["slow_subscriber_overflows"]["coalesce"] == 0
+    await bus.stop()
@@ -2,14 +2,53 @@
 
 from __future__ import annotations
 
+import asyncio
+import time
+from collections import OrderedDict, deque
+from itertools import pairwise
+from dataclasses import replace
+from types import SimpleNamespace
+
 import pytest
 
-from monster_mash_chatroom.config import Settings
-from monster_mash_chatroom.llm import generate_persona_reply
+from monster_mash_chatroom.config import (
+    CircuitBreakerSettings,
+    LLMCacheSettings,
+    ModelLimits,
+    Settings,
+    SummarySettings,
+)
+from monster_mash_chatroom.llm import (
+    BreakerState,
+    CircuitBreaker,
+    ConversationSummarizer,
+    LiteLLMException,
+    backlog_depth,
+    breaker_stats,
+    estimate_tokens,
+    extractive_summary,
+    ModelLimiter,
+    PromptBuilder,
+    Priority,
+    ResponseCache,
+    generate_persona_reply,
+    limiter_stats,
+    reply_stats,
+    response_cache,
+    stream_persona_reply,
+)
 from monster_mash_chatroom.models import AuthorKind, ChatMessage
 from monster_mash_chatroom.personas import PERSONA_REGISTRY
 
 
+@pytest.fixture(autouse=True)
+def _fresh_llm_state(monkeypatch) -> None:
+    monkeypatch.setattr("monster_mash_chatroom.llm._model_breakers", {})
+    monkeypatch.setattr(
+        "monster_mash_chatroom.llm._prompt_builders", OrderedDict()
+    )
+
+
 @pytest.mark.asyncio
 async def test_generate_persona_reply_demo_mode() -> None:
     persona = PERSONA_REGISTRY["witch"]
@@ -42,3 +81,494 @@ async def test_demo_response_fallback(monkeypatch):
     reply = await generate_persona_reply(persona, history, settings)
     assert reply
     assert persona.display_name.split()[0] in reply
+
+
+def _completions(monkeypatch) -> list[str]:
+    """Replace LiteLLM with a fake recording the models it was called with."""
+    calls: list[str] = []
+
+    async def acompletion(model: str, messages: list[dict[str, str]]) -> dict:
+        calls.append(model)
+        return {"choices": [{"message": {"content": f" reply {len(calls)} "}}]}
+
+    monkeypatch.setattr(
+        "monster_mash_chatroom.llm.litellm",
+        SimpleNamespace(acompletion=acompletion),
+    )
+    monkeypatch.setattr("monster_mash_chatroom.llm._response_caches", {})
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_repeated_prompts_hit_the_cache(monkeypatch, tmp_path) -> None:
+    calls = _completions(monkeypatch)
+    persona = PERSONA_REGISTRY["witch"]
+    settings = Settings(
+        demo_mode=False,
+        llm_cache=LLMCacheSettings(path=str(tmp_path / "replies.db")),
+    )
+    message = ChatMessage(
+        author="Tester", role=AuthorKind.HUMAN, content="Any  potions left?"
+    )
+    first = await generate_persona_reply(persona, [message], settings)
+    # The same prompt up to whitespace, as a duplicate delivery would send
+    again = message.model_copy(update={"content": "Any potions left? "})
+    assert await generate_persona_reply(persona, [again], settings) == first
+    assert calls == ["gpt-4o-mini"]
+    assert response_cache(settings).stats()["hits"] == 1
+
+    # A fresh process finds the reply on disk
+    monkeypatch.setattr("monster_mash_chatroom.llm._response_caches", {})
+    assert await generate_persona_reply(persona, [message], settings) == first
+    assert response_cache(settings).stats()["disk_hits"] == 1
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_response_cache_evicts_by_size_and_age(monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("monster_mash_chatroom.llm.time.time", lambda: now[0])
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    for key in ("a", "b", "c"):
+        await cache.put(key, key.upper())
+    assert await cache.get("a") is None
+    assert await cache.get("c") == "C"
+    now[0] += 61
+    assert await cache.get("c") is None
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 2,
+        "disk_hits": 0,
+        "expired": 1,
+        "evictions": 1,
+        "entries": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_stream_falls_back_before_the_first_token(monkeypatch) -> None:
+    models: list[str] = []
+
+    async def pieces(*texts: str):
+        for text in texts:
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=text))]
+            )
+
+    async def acompletion(model: str, messages, stream: bool = False):
+        models.append(model)
+        if model == "broken/model":
+            raise LiteLLMException("provider down")
+        return pieces("Double, ", None, "double toil")
+
+    monkeypatch.setattr(
+        "monster_mash_chatroom.llm.litellm",
+        SimpleNamespace(acompletion=acompletion),
+    )
+    monkeypatch.setattr("monster_mash_chatroom.llm._response_caches", {})
+    settings = Settings(
+        demo_mode=False,
+        model_routing={"persona_model_map": {"witch": "broken/model"}},
+    )
+    persona = PERSONA_REGISTRY["witch"]
+    history = [
+        ChatMessage(author="Tester", role=AuthorKind.HUMAN, content="Stir it!")
+    ]
+    streamed = [
+        p async for p in stream_persona_reply(persona, history, settings)
+    ]
+    assert streamed == ["Double, ", "double toil"]
+    assert models == ["broken/model", "gpt-4o-mini"]
+    # The finished reply was cached for the model that wrote it, so the
+    # fallback after the broken model fails again is a cache hit
+    reply = await generate_persona_reply(persona, history, settings)
+    assert reply == "Double, double toil"
+    assert models[2:] == ["broken/model"]
+
+
+@pytest.mark.asyncio
+async def test_limiter_serves_humans_before_monster_chatter() -> None:
+    limiter = ModelLimiter(ModelLimits(max_concurrent=1))
+    order: list[str] = []
+    release = asyncio.Event()
+
+    async def request(name: str, priority: Priority) -> None:
+        async with limiter.slot(priority):
+            order.append(name)
+            await release.wait()
+
+    first = asyncio.create_task(request("first", Priority.MONSTER))
+    await asyncio.sleep(0)
+    queued = [
+        asyncio.create_task(request("chatter", Priority.MONSTER)),
+        asyncio.create_task(request("dropped", Priority.HUMAN)),
+        asyncio.create_task(request("human", Priority.HUMAN)),
+    ]
+    await asyncio.sleep(0)
+    assert limiter.stats()["waiting"] == 3
+    # A cancelled waiter gives up its place without taking a slot
+    queued[1].cancel()
+    release.set()
+    await asyncio.gather(first, queued[0], queued[2])
+    assert order == ["first", "human", "chatter"]
+    stats = limiter.stats()
+    assert stats["active"] == 0 and stats["waiting"] == 0
+    assert stats["human"]["queued"] == 2 and stats["monster"]["queued"] == 1
+
+
+@pytest.mark.asyncio
+async def test_limiter_paces_requests_with_its_token_bucket() -> None:
+    limiter = ModelLimiter(ModelLimits(requests_per_minute=1200, burst=2))
+
+    async def request() -> None:
+        async with limiter.slot(Priority.HUMAN):
+            pass
+
+    started = time.monotonic()
+    await asyncio.gather(*(request() for _ in range(4)))
+    # Two go at once from the burst, the others wait 50ms each for tokens
+    assert time.monotonic() - started >= 0.08
+    assert limiter.stats()["human"]["queued"] == 2
+    assert limiter.stats()["human"]["wait_ms_max"] >= 80
+
+
+def _slow_models(monkeypatch, delays: dict[str, float]) -> list[str]:
+    """Fake LiteLLM whose models answer after the given delays."""
+    cancelled: list[str] = []
+
+    async def acompletion(model: str, messages: list[dict[str, str]]) -> dict:
+        try:
+            await asyncio.sleep(delays[model])
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        return {"choices": [{"message": {"content": f"from {model}"}}]}
+
+    monkeypatch.setattr(
+        "monster_mash_chatroom.llm.litellm",
+        SimpleNamespace(acompletion=acompletion),
+    )
+    monkeypatch.setattr("monster_mash_chatroom.llm._response_caches", {})
+    return cancelled
+
+
+@pytest.mark.asyncio
+async def test_slow_models_are_hedged_with_the_default(monkeypatch) -> None:
+    cancelled = _slow_models(
+        monkeypatch, {"slow/model": 5.0, "gpt-4o-mini": 0.01}
+    )
+    settings = Settings(
+        demo_mode=False,
+        model_routing={"persona_model_map": {"witch": "slow/model"}},
+    )
+    persona = replace(PERSONA_REGISTRY["witch"], hedge_after_seconds=0.05)
+    history = [
+        ChatMessage(author="Tester", role=AuthorKind.HUMAN, content="Hi")
+    ]
+    before = reply_stats()
+
+    started = time.monotonic()
+    reply = await generate_persona_reply(persona, history, settings)
+    assert reply == "from gpt-4o-mini"
+    assert time.monotonic() - started < 1
+    # The losing request does not keep running in the background
+    assert cancelled == ["slow/model"]
+    after = reply_stats()
+    assert after["hedged"] == before["hedged"] + 1
+    assert after["hedge_won"] == before["hedge_won"] + 1
+
+
+@pytest.mark.asyncio
+async def test_hung_models_fall_back_at_the_deadline(monkeypatch) -> None:
+    cancelled = _slow_models(
+        monkeypatch, {"slow/model": 5.0, "gpt-4o-mini": 5.0}
+    )
+    settings = Settings(
+        demo_mode=False,
+        model_routing={"persona_model_map": {"witch": "slow/model"}},
+    )
+    persona = replace(
+        PERSONA_REGISTRY["witch"],
+        hedge_after_seconds=0.02,
+        reply_deadline_seconds=0.1,
+    )
+    history = [
+        ChatMessage(author="Tester", role=AuthorKind.HUMAN, content="Hi")
+    ]
+
+    started = time.monotonic()
+    reply = await generate_persona_reply(persona, history, settings)
+    assert time.monotonic() - started < 1
+    assert persona.display_name.split()[0] in reply
+    assert sorted(cancelled) == ["gpt-4o-mini", "slow/model"]
+
+
+@pytest.mark.asyncio
+async def test_hung_stream_falls_back_at_the_deadline(monkeypatch) -> None:
+    cancelled: list[str] = []
+
+    async def acompletion(model: str, messages, stream: bool = False):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+
+    monkeypatch.setattr(
+        "monster_mash_chatroom.llm.litellm",
+        SimpleNamespace(acompletion=acompletion),
+    )
+    monkeypatch.setattr("monster_mash_chatroom.llm._response_caches", {})
+    settings = Settings(
+        demo_mode=False,
+        model_routing={"persona_model_map": {"witch": "slow/model"}},
+    )
+    persona = replace(PERSONA_REGISTRY["witch"], reply_deadline_seconds=0.1)
+    history = [
+        ChatMessage(author="Tester", role=AuthorKind.HUMAN, content="Hi")
+    ]
+    expired = reply_stats()["deadline_expired"]
+
+    started = time.monotonic()
+    streamed = [
+        p async for p in stream_persona_reply(persona, history, settings)
+    ]
+    assert time.monotonic() - started < 1
+    assert len(streamed) == 1
+    assert persona.display_name.split()[0] in streamed[0]
+    # The deadline covers the whole chain, so the default model is not tried
+    assert cancelled == ["slow/model"]
+    assert reply_stats()["deadline_expired"] == expired + 1
+
+
+
+@pytest.mark.asyncio
+async def test_stalled_stream_ends_at_the_deadline(monkeypatch) -> None:
+    async def stall():
+        yield SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content="Awoo"))]
+        )
+        await asyncio.sleep(5)
+
+    async def acompletion(model: str, messages, stream: bool = False):
+        return stall()
+
+    monkeypatch.setattr(
+        "monster_mash_chatroom.llm.litellm",
+        SimpleNamespace(acompletion=acompletion),
+    )
+    monkeypatch.setattr("monster_mash_chatroom.llm._response_caches", {})
+    settings = Settings(
+        demo_mode=False,
+        model_routing={
+            "persona_model_map": {"werewolf": "stalling/model"},
+            "model_limits": {"stalling/model": {"max_concurrent": 1}},
+        },
+    )
+    persona = replace(PERSONA_REGISTRY["werewolf"], reply_deadline_seconds=0.1)
+    history = [
+        ChatMessage(author="Tester", role=AuthorKind.HUMAN, content="Hi")
+    ]
+    expired = reply_stats()["deadline_expired"]
+
+    started = time.monotonic()
+    streamed = [
+        p async for p in stream_persona_reply(persona, history, settings)
+    ]
+    assert time.monotonic() - started < 1
+    # The reply ends with what arrived, and the model's slot is free again
+    assert streamed == ["Awoo"]
+    assert reply_stats()["deadline_expired"] == expired + 1
+    assert limiter_stats()["stalling/model"]["active"] == 0
+
+def test_breaker_opens_and_probes_after_cooldown(monkeypatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr(
+        "monster_mash_chatroom.llm.time.monotonic", lambda: now[0]
+    )
+    breaker = CircuitBreaker(
+        CircuitBreakerSettings(failure_threshold=2, cooldown_seconds=10)
+    )
+
+    def fail() -> None:
+        with pytest.raises(LiteLLMException), breaker.track():
+            raise LiteLLMException("provider down")
+
+    for _ in range(2):
+        assert breaker.allow()
+        fail()
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.allow()
+
+    now[0] += 10
+    # Half-open: a single probe goes through, and its failure reopens
+    assert breaker.allow() and not breaker.allow()
+    fail()
+    assert breaker.state == BreakerState.OPEN
+
+    now[0] += 10
+    assert breaker.allow()
+    with breaker.track():
+        pass
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.stats()["opened"] == 2
+    assert breaker.stats()["short_circuited"] == 2
+
+
+@pytest.mark.asyncio
+async def test_open_breakers_route_straight_to_the_default(
+    monkeypatch,
+) -> None:
+    calls = _completions(monkeypatch)
+
+    async def acompletion(model: str, messages: list[dict[str, str]]) -> dict:
+        calls.append(model)
+        if model == "broken/model":
+            raise LiteLLMException("provider down")
+        return {"choices": [{"message": {"content": "fallback"}}]}
+
+    monkeypatch.setattr(
+        "monster_mash_chatroom.llm.litellm",
+        SimpleNamespace(acompletion=acompletion),
+    )
+    settings = Settings(
+        demo_mode=False,
+        llm_cache=LLMCacheSettings(enabled=False),
+        llm_breaker=CircuitBreakerSettings(failure_threshold=2),
+        model_routing={"persona_model_map": {"witch": "broken/model"}},
+    )
+    persona = PERSONA_REGISTRY["witch"]
+    history = [
+        ChatMessage(author="Tester", role=AuthorKind.HUMAN, content="Hi")
+    ]
+    for _ in range(4):
+        assert (
+            await generate_persona_reply(persona, history, settings)
+            == "fallback"
+        )
+    # After two failures the broken model is no longer called at all
+    assert calls.count("broken/model") == 2
+    assert calls.count("gpt-4o-mini") == 4
+    assert breaker_stats()["broken/model"]["state"] == "open"
+
+
+def test_prompt_builder_appends_and_trims_to_its_budget() -> None:
+    persona = PERSONA_REGISTRY["witch"]
+    builder = PromptBuilder(persona, max_tokens=800)
+    budget = 800 - estimate_tokens(persona.system_prompt)
+    backlog: list[ChatMessage] = []
+    prompts = []
+    for index in range(60):
+        backlog.append(
+            ChatMessage(
+                author="Vlad",
+                role=AuthorKind.MONSTER,
+                persona="vampire",
+                content=f"Message number {index} about the full moon.",
+            )
+        )
+        prompts.append(builder.messages(backlog[-20:]))
+
+    final = prompts[-1]
+    assert final[0]["role"] == "system"
+    assert (
+        final[-1]["content"]
+        == "[vampire] Message number 59 about the full moon."
+    )
+    assert builder.tokens <= 800
+    # Older turns than the 20-message backlog stay while they fit
+    assert len(final) - 1 > 20
+    # Between trims each prompt extends the previous one unchanged
+    extended = sum(
+        later[: len(earlier)] == earlier
+        for earlier, later in pairwise(prompts)
+    )
+    assert extended >= len(prompts) * 3 // 4
+
+    # A huge message is cut down instead of crowding out the conversation
+    essay = ChatMessage(
+        author="Tester", role=AuthorKind.HUMAN, content="boo " * 2000
+    )
+    prompt = builder.messages([*backlog[-5:], essay])
+    assert estimate_tokens(prompt[-1]["content"]) <= budget // 2 + 1
+    assert len(prompt) > 2
+
+
+def test_busy_rooms_do_not_reset_the_prompt() -> None:
+    settings = Settings(
+        model_routing={"default_limits": {"max_prompt_tokens": 800}}
+    )
+    persona = PERSONA_REGISTRY["witch"]
+    builder = PromptBuilder(persona, max_tokens=800)
+    backlog: deque[ChatMessage] = deque(maxlen=backlog_depth(settings))
+
+    def chat(count: int) -> None:
+        for _ in range(count):
+            backlog.append(
+                ChatMessage(
+                    author="Tester",
+                    role=AuthorKind.HUMAN,
+                    content=f"Message {len(backlog)}",
+                )
+            )
+
+    chat(5)
+    first = builder.messages(tuple(backlog))
+    # More messages between two replies than the old 20-message backlog
+    chat(30)
+    second = builder.messages(tuple(backlog))
+    assert second[: len(first)] == first
+    assert second[-1]["content"] == "Message 34"
+
+
+def test_extractive_summary_keeps_the_recurring_topics() -> None:
+    lines = [
+        "Tester: The full moon rises tonight. I brought snacks.",
+        "Wolfman: FULL MOON means HOWLING at the moon!",
+        "Dracula: I prefer the darkness of a moonless night.",
+        "Tester: Whatever. Anyone seen my keys?",
+    ]
+    summary = extractive_summary("Tester arrived at the graveyard.", lines, 30)
+    assert "Wolfman: FULL MOON means HOWLING at the moon!" in summary
+    assert "keys" not in summary
+    assert estimate_tokens(summary) <= 31
+
+
+@pytest.mark.asyncio
+async def test_long_chats_fold_older_turns_into_a_summary() -> None:
+    settings = Settings(
+        demo_mode=False,
+        llm_summary=SummarySettings(
+            enabled=True, after_messages=6, keep_recent=3, model="extractive"
+        ),
+    )
+    builder = PromptBuilder(
+        PERSONA_REGISTRY["witch"], 3000, ConversationSummarizer(settings)
+    )
+    backlog = [
+        ChatMessage(
+            author="Tester",
+            role=AuthorKind.HUMAN,
+            content=f"Potion number {index} needs more newt.",
+        )
+        for index in range(7)
+    ]
+    verbatim = builder.messages(backlog)
+    assert len(verbatim) == 8 and builder.summary is None
+    before = builder.tokens
+    # The summary is written off the reply path and used from then on
+    await asyncio.sleep(0)
+    assert builder.summary is not None
+    assert builder.tokens < before
+
+    backlog.append(
+        ChatMessage(author="Tester", role=AuthorKind.HUMAN, content="Stir it!")
+    )
+    prompt = builder.messages(backlog)
+    assert prompt[1]["content"].startswith("Earlier in this conversation:")
+    assert [m["content"] for m in prompt[2:]] == [
+        "Potion number 4 needs more newt.",
+        "Potion number 5 needs more newt.",
+        "Potion number 6 needs more newt.",
+        "Stir it!",
+    ]
@@ -0,0 +1,201 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from monster_mash_chatroom.codec import available_backends
+from monster_mash_chatroom.config import (
+    BusBackend,
+    CodecBackend,
+    LocalBusSettings,
+    MessageBusSettings,
+)
+from monster_mash_chatroom.events import LocalEventBus, build_event_bus
+from monster_mash_chatroom.local_bus import LocalBusClient
+from monster_mash_chatroom.models import AuthorKind, ChatMessage, ReplyDelta
+
+
+def _settings(tmp_path: Path, settle: float = 0.05) -> LocalBusSettings:
+    return LocalBusSettings(
+        socket_path=str(tmp_path / "bus.sock"),
+        connect_timeout=2,
+        failover_settle_seconds=settle,
+    )
+
+
+def _message(content: str) -> ChatMessage:
+    return ChatMessage(author="A", role=AuthorKind.HUMAN, content=content)
+
+
+@pytest.mark.asyncio
+async def test_local_bus_relays_between_processes(tmp_path: Path) -> None:
+    settings = _settings(tmp_path)
+    leader = LocalEventBus(
+        settings, history_limit=10, subscriber_queue_size=None
+    )
+    follower = LocalEventBus(
+        settings, history_limit=10, subscriber_queue_size=None
+    )
+    await leader.start()
+    await follower.start()
+    assert leader._client.is_leader
+    assert not follower._client.is_leader
+
+    with leader.open_subscription() as subscription:
+        await follower.publish(_message("hello from worker 2"))
+        received = await asyncio.wait_for(subscription.__anext__(), timeout=2)
+    assert received.content == "hello from worker 2"
+    assert received.seq == 1
+    # The publisher sees its own message too, with the broker's seq
+    assert [m.seq for m in await follower.get_recent()] == [1]
+
+    await follower.stop()
+    await leader.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(
+    CodecBackend.MSGPACK not in available_backends(), reason="msgpack missing"
+)
+async def test_local_bus_mixes_codecs(tmp_path: Path) -> None:
+    settings = _settings(tmp_path)
+    leader = LocalEventBus(
+        settings,
+        history_limit=10,
+        subscriber_queue_size=None,
+        codec=CodecBackend.MSGPACK,
+    )
+    follower = LocalEventBus(
+        settings, history_limit=10, subscriber_queue_size=None
+    )
+    await leader.start()
+    await follower.start()
+    await follower.publish(_message("json in, msgpack out"))
+    assert [m.content for m in await follower.get_recent()] == [
+        "json in, msgpack out"
+    ]
+    await follower.stop()
+    await leader.stop()
+
+
+@pytest.mark.asyncio
+async def test_local_bus_fails_over_to_a_new_leader(tmp_path: Path) -> None:
+    settings = _settings(tmp_path)
+    first = LocalEventBus(
+        settings, history_limit=10, subscriber_queue_size=None
+    )
+    second = LocalEventBus(
+        settings, history_limit=10, subscriber_queue_size=None
+    )
+    await first.start()
+    await second.start()
+    await first.publish(_message("before"))
+
+    await first.stop()
+    # The survivor grabs the lock, hosts a broker and keeps numbering
+    await second.publish(_message("after"))
+    assert second._client.is_leader
+    assert [m.seq for m in await second.get_recent()] == [1, 2]
+    await second.stop()
+
+
+@pytest.mark.asyncio
+async def test_build_event_bus_local_backend(tmp_path: Path) -> None:
+    settings = MessageBusSettings(
+        backend=BusBackend.LOCAL, local=_settings(tmp_path)
+    )
+    bus = await build_event_bus(settings)
+    assert isinstance(bus, LocalEventBus)
+    await bus.stop()
+    # The processes sharing the bus would all append to one on-disk log
+    with pytest.raises(ValidationError):
+        MessageBusSettings(
+            backend=BusBackend.LOCAL,
+            local=_settings(tmp_path),
+            history_log={"enabled": True, "directory": str(tmp_path)},
+        )
+
+
+@pytest.mark.asyncio
+async def test_local_bus_relays_deltas_without_retaining_them(
+    tmp_path: Path,
+) -> None:
+    settings = _settings(tmp_path)
+    app = LocalEventBus(settings, history_limit=10, subscriber_queue_size=None)
+    await app.start()
+    # A persona worker: messages only, deltas are dropped undecoded
+    seen: list[ChatMessage] = []
+    worker = LocalBusClient(settings, 10, seen.append)
+    await worker.start()
+
+    with app.open_subscription() as subscription:
+        delta = ReplyDelta(id="r1", author="Wolfman", index=0, text="Aw")
+        await worker.publish_delta(delta)
+        received = await asyncio.wait_for(subscription.__anext__(), timeout=2)
+    assert received == delta
+    assert await app.get_recent() == []
+    assert seen == []
+
+    await worker.stop()
+    await app.stop()
+
+
+@pytest.mark.asyncio
+async def test_local_bus_drops_a_publish_resent_after_failover(
+    tmp_path: Path,
+) -> None:
+    seen: list[ChatMessage] = []
+    client = LocalBusClient(_settings(tmp_path), 10, seen.append)
+    await client.start()
+    message = _message("sequenced just before the old broker died")
+    await (await client.publish(message))
+    # The re-send reaches the new broker, which numbers it again
+    await (await client.publish(message))
+    await (await client.publish(_message("next")))
+    assert [m.content for m in seen] == [message.content, "next"]
+    assert [m.seq for m in seen] == [1, 3]
+    await client.stop()
+
+
+@pytest.mark.asyncio
+async def test_new_broker_numbers_after_every_greeted_seq(
+    tmp_path: Path,
+) -> None:
+    settings = _settings(tmp_path, settle=0.3)
+    # Survivors of a dead broker that had seen different amounts of it
+    behind_seen: list[ChatMessage] = []
+    behind = LocalBusClient(settings, 10, behind_seen.append)
+    behind._last_seq = {"lobby": 2}
+    ahead_seen: list[ChatMessage] = []
+    ahead = LocalBusClient(settings, 10, ahead_seen.append)
+    ahead._last_seq = {"lobby": 5}
+
+    await behind.start()
+    assert behind.is_leader
+    delivery = await behind.publish(_message("re-sent after failover"))
+    # The better-informed peer greets only after the publish arrived
+    await ahead.start()
+    await asyncio.wait_for(delivery, timeout=2)
+    await asyncio.sleep(0.05)
+
+    assert [m.seq for m in behind_seen] == [6]
+    assert [m.seq for m in ahead_seen] == [6]
+    await ahead.stop()
+    await behind.stop()
+
+
+@pytest.mark.asyncio
+async def test_publish_resolves_even_when_its_seq_was_seen(
+    tmp_path: Path,
+) -> None:
+    settings = _settings(tmp_path, settle=0)
+    leader = LocalBusClient(settings, 10, lambda message: None)
+    await leader.start()
+    late = LocalBusClient(settings, 10, lambda message: None)
+    await late.start()
+    # As if it greeted after the new broker had numbered past its seqs
+    late._last_seq = {"lobby": 5}
+    await asyncio.wait_for(await late.publish(_message("mine")), timeout=2)
+    await late.stop()
+    await leader.stop()
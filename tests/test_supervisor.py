@@ -0,0 +1,99 @@
+"""Tests for the persona worker supervisor."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from collections.abc import Callable
+
+import pytest
+
+from monster_mash_chatroom.config import Settings, SupervisorSettings
+from monster_mash_chatroom.supervisor import (
+    Supervisor,
+    WorkerSpec,
+    parse_args,
+    plan_workers,
+)
+
+KEYS = ["witch", "vampire", "ghost", "werewolf", "zombie"]
+
+
+def test_plan_shards_personas_round_robin() -> None:
+    specs = plan_workers(KEYS, workers=2)
+    assert [spec.personas for spec in specs] == [
+        ("witch", "ghost", "zombie"),
+        ("vampire", "werewolf"),
+    ]
+    # More workers than personas leaves no empty shards
+    assert len(plan_workers(KEYS, workers=8)) == len(KEYS)
+
+
+def test_replicas_are_capped_by_partitions() -> None:
+    specs = plan_workers(KEYS, workers=1, scale={"witch": 4}, partitions=3)
+    assert specs[0].personas == ("vampire", "ghost", "werewolf", "zombie")
+    assert [spec.name for spec in specs[1:]] == [
+        "witch#0",
+        "witch#1",
+        "witch#2",
+    ]
+
+
+def test_parse_args_validates_scale() -> None:
+    args = parse_args(["--workers", "2", "--scale", "witch=3"])
+    assert args.workers == 2 and args.scale == [("witch", 3)]
+    with pytest.raises(SystemExit):
+        parse_args(["--scale", "witch=0"])
+
+
+def _script(code: str) -> Callable[[WorkerSpec], list[str]]:
+    return lambda spec: [sys.executable, "-c", code]
+
+
+@pytest.mark.asyncio
+async def test_crashed_workers_restart_with_backoff() -> None:
+    settings = Settings(
+        supervisor=SupervisorSettings(
+            restart_backoff_seconds=0.01, restart_backoff_max_seconds=0.05
+        )
+    )
+    supervisor = Supervisor(
+        [WorkerSpec(("witch",))],
+        settings,
+        command=_script("raise SystemExit(3)"),
+    )
+    supervisor.start()
+    for _ in range(200):
+        (entry,) = await supervisor.status()
+        if entry["restarts"] >= 3:
+            break
+        await asyncio.sleep(0.05)
+    await supervisor.stop()
+    assert entry["restarts"] >= 3
+    assert entry["last_exit"] == 3
+    assert not entry["finished"]
+
+
+@pytest.mark.asyncio
+async def test_clean_exits_and_stop() -> None:
+    supervisor = Supervisor(
+        [WorkerSpec(("witch",)), WorkerSpec(("ghost",))],
+        Settings(),
+        command=lambda spec: (
+            [sys.executable, "-c", "import time; time.sleep(60)"]
+            if spec.personas == ("ghost",)
+            else [sys.executable, "-c", "pass"]
+        ),
+    )
+    supervisor.start()
+    for _ in range(200):
+        witch, ghost = await supervisor.status()
+        if witch["finished"] and ghost["alive"]:
+            break
+        await asyncio.sleep(0.05)
+    assert witch["finished"] and witch["restarts"] == 0
+    assert ghost["alive"] and ghost["pid"] is not None
+
+    await supervisor.stop()
+    _, ghost = await supervisor.status()
+    assert not ghost["alive"]
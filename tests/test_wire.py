@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from monster_mash_chatroom.models import (
+    AuthorKind,
+    ChatMessage,
+    MessageRecord,
+    StreamNotice,
+)
+from monster_mash_chatroom.wire import (
+    MESSAGE_FIELDS,
+    WireFormat,
+    encode_frame,
+    negotiate,
+)
+
+
+def _message(seq: int) -> ChatMessage:
+    return ChatMessage(
+        author="Dracula",
+        role=AuthorKind.MONSTER,
+        content=f"boo {seq}",
+        persona="vampire",
+        seq=seq,
+    )
+
+
+def test_negotiate_defaults_to_json() -> None:
+    assert negotiate([]) == (None, WireFormat.JSON)
+    assert negotiate(["chat.v9"]) == (None, WireFormat.JSON)
+    assert negotiate(["chat.v9", "monster-mash.v1.json"]) == (
+        "monster-mash.v1.json",
+        WireFormat.JSON,
+    )
+
+
+def test_json_frames_unwrap_single_messages() -> None:
+    first, second = _message(1), _message(2)
+    assert encode_frame([first], WireFormat.JSON) == first.json_frame
+    batch = json.loads(encode_frame([first, second], WireFormat.JSON))
+    assert [item["seq"] for item in batch] == [1, 2]
+
+
+def test_msgpack_frames_use_compact_records() -> None:
+    msgpack = pytest.importorskip("msgpack")
+    assert negotiate(["monster-mash.v1.msgpack"])[1] == WireFormat.MSGPACK
+    messages = [_message(seq) for seq in range(1, 20)]
+    notice = StreamNotice(type="missed", room="lobby", since=3, count=2)
+
+    frame = encode_frame([notice, *messages], WireFormat.MSGPACK)
+    decoded = msgpack.unpackb(frame)
+
+    assert decoded[0] == {
+        "type": "missed",
+        "room": "lobby",
+        "since": 3,
+        "count": 2,
+    }
+    record = dict(zip(MESSAGE_FIELDS, decoded[1], strict=True))
+    assert record["seq"] == 1
+    assert record["id"] == bytes.fromhex(messages[0].id)
+    assert record["role"] == 1
+    assert len(decoded) == 20
+    assert len(messages[0].msgpack_frame) < len(messages[0].json_frame)
+
+
+def test_records_encode_like_messages() -> None:
+    message = _message(4)
+    message.persona_emoji = "🧛"
+    record = MessageRecord.from_message(message)
+
+    assert record.json_frame.isascii()
+    assert json.loads(record.json_frame) == json.loads(message.json_frame)
+    assert record.to_message() == message
+    restored = MessageRecord.from_json(record.json_frame.encode("utf-8"))
+    assert restored == record
+    pytest.importorskip("msgpack")
+    assert record.msgpack_frame == message.msgpack_frame